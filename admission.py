@@ -0,0 +1,232 @@
+import heapq
+import itertools
+import json
+import math
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+READ_METHODS = ('GET', 'HEAD', 'OPTIONS')
+# Endereço que o Werkzeug dá a pares de socket unix (o encaminhador de escritas do serve.py)
+LOCAL_PEERS = ('', '<local>')
+
+
+class RouteClass:
+    """Limites de uma classe de rotas: execuções simultâneas, fila e espera máxima.
+
+    `priority` menor é atendida primeiro quando uma vaga abre; `per_client`
+    (0 desliga) limita quantas requisições da classe um mesmo cliente tem
+    em execução ou na fila.
+    """
+
+    def __init__(self, name: str, limit: int, queue: int, deadline: float, priority: int = 0,
+                 per_client: int = 0):
+        self.name = name
+        self.limit = limit
+        self.queue = queue
+        self.deadline = deadline
+        self.priority = priority
+        self.per_client = per_client
+
+
+def default_classify(environ) -> Optional[str]:
+    """Leituras e escritas da API; o resto (frontend, /metrics) não passa pelo controle"""
+    if not environ.get('PATH_INFO', '').startswith('/api/'):
+        return None
+    return 'read' if environ.get('REQUEST_METHOD', 'GET') in READ_METHODS else 'write'
+
+
+def _client(environ) -> str:
+    # Atrás do serve.py as escritas chegam pelo socket unix do escritor, com X-Forwarded-For;
+    # o cabeçalho só vale quando quem conecta é o encaminhador local
+    remote = environ.get('REMOTE_ADDR', '')
+    forwarded = environ.get('HTTP_X_FORWARDED_FOR', '')
+    if forwarded and remote in LOCAL_PEERS:
+        return forwarded.rsplit(',', 1)[-1].strip()
+    return remote
+
+
+class _Waiter:
+    __slots__ = ('route_class', 'client', 'event', 'granted')
+
+    def __init__(self, route_class: RouteClass, client: str):
+        self.route_class = route_class
+        self.client = client
+        self.event = threading.Event()
+        self.granted = False
+
+
+class AdmissionController:
+    """Middleware WSGI de controle de admissão por classe de rota.
+
+    Cada classe tem um limite de requisições em execução e uma fila curta.
+    Uma requisição sem vaga entra na fila só se a espera estimada (posição
+    na fila x tempo médio de atendimento da classe / limite) couber no seu
+    prazo; fila cheia ou cliente acima de `per_client` recebem 429, prazo
+    estourado (estimado ou real) recebe 503, ambos com Retry-After.
+    Quando uma vaga abre, as filas são atendidas por prioridade: leituras
+    passam na frente de escritas em massa.
+
+    `max_in_flight` limita o total entre as classes (ex.: as threads do
+    servidor), para que escritas lentas não ocupem todas as vagas.
+    """
+
+    def __init__(self, wsgi_app, classes: Dict[str, RouteClass], max_in_flight: Optional[int] = None,
+                 classify: Callable = default_classify):
+        self.wsgi_app = wsgi_app
+        self.classes = classes
+        self.max_in_flight = max_in_flight or sum(route_class.limit for route_class in classes.values())
+        self.classify = classify
+
+        self._lock = threading.Lock()
+        self._in_flight = {name: 0 for name in classes}
+        self._total = 0
+        self._queued = {name: 0 for name in classes}
+        self._clients: Dict[tuple, int] = {}
+        self._heap = []
+        self._sequence = itertools.count()
+        # Média móvel do tempo de atendimento, para estimar a espera na fila
+        self._service_time = {name: 0.05 for name in classes}
+        self.stats = {name: {'admitted': 0, 'queued': 0, 'rejected_full': 0, 'rejected_deadline': 0}
+                      for name in classes}
+
+    def _fits(self, route_class: RouteClass) -> bool:
+        return self._in_flight[route_class.name] < route_class.limit and self._total < self.max_in_flight
+
+    def _start(self, route_class: RouteClass):
+        self._in_flight[route_class.name] += 1
+        self._total += 1
+        self.stats[route_class.name]['admitted'] += 1
+
+    def _estimate(self, route_class: RouteClass, position: int) -> float:
+        return position * self._service_time[route_class.name] / max(1, route_class.limit)
+
+    def _acquire(self, route_class: RouteClass, client: str):
+        """None se admitida; senão (status, segundos para o Retry-After)"""
+        key = (route_class.name, client)
+        with self._lock:
+            if route_class.per_client and self._clients.get(key, 0) >= route_class.per_client:
+                self.stats[route_class.name]['rejected_full'] += 1
+                return 429, self._estimate(route_class, self._queued[route_class.name] + 1)
+            # Entra direto se houver vaga e ninguém de prioridade igual ou maior na fila
+            ahead = any(self._queued[other.name] for other in self.classes.values()
+                        if other.priority <= route_class.priority)
+            if not ahead and self._fits(route_class):
+                self._start(route_class)
+                self._clients[key] = self._clients.get(key, 0) + 1
+                return None
+
+            position = self._queued[route_class.name] + 1
+            estimate = self._estimate(route_class, position)
+            if self._queued[route_class.name] >= route_class.queue:
+                self.stats[route_class.name]['rejected_full'] += 1
+                return 429, estimate
+            if estimate > route_class.deadline:
+                self.stats[route_class.name]['rejected_deadline'] += 1
+                return 503, estimate
+
+            waiter = _Waiter(route_class, client)
+            heapq.heappush(self._heap, (route_class.priority, next(self._sequence), waiter))
+            self._queued[route_class.name] += 1
+            self._clients[key] = self._clients.get(key, 0) + 1
+            self.stats[route_class.name]['queued'] += 1
+
+        if waiter.event.wait(route_class.deadline):
+            return None
+        with self._lock:
+            if waiter.granted:
+                # Vaga concedida no mesmo instante em que o prazo venceu
+                return None
+            waiter.granted = None
+            self._queued[route_class.name] -= 1
+            self._clients[key] -= 1
+            if not self._clients[key]:
+                del self._clients[key]
+            self.stats[route_class.name]['rejected_deadline'] += 1
+            return 503, self._estimate(route_class, self._queued[route_class.name] + 1)
+
+    def _dispatch_locked(self):
+        """Conceder as vagas livres aos primeiros da fila, por prioridade"""
+        skipped = []
+        while self._heap and self._total < self.max_in_flight:
+            entry = heapq.heappop(self._heap)
+            waiter = entry[2]
+            if waiter.granted is None:
+                continue
+            if not self._fits(waiter.route_class):
+                skipped.append(entry)
+                continue
+            waiter.granted = True
+            self._queued[waiter.route_class.name] -= 1
+            self._start(waiter.route_class)
+            waiter.event.set()
+        for entry in skipped:
+            heapq.heappush(self._heap, entry)
+
+    def _release(self, route_class: RouteClass, client: str, started: float):
+        key = (route_class.name, client)
+        with self._lock:
+            self._in_flight[route_class.name] -= 1
+            self._total -= 1
+            self._clients[key] -= 1
+            if not self._clients[key]:
+                del self._clients[key]
+            elapsed = time.monotonic() - started
+            self._service_time[route_class.name] += 0.2 * (elapsed - self._service_time[route_class.name])
+            self._dispatch_locked()
+
+    @staticmethod
+    def _reject(start_response, status: int, retry_after: float):
+        seconds = max(1, math.ceil(retry_after))
+        body = json.dumps({
+            'error': 'Muitas requisições, tente novamente' if status == 429 else 'Servidor sobrecarregado, tente novamente',
+            'retry_after': seconds
+        }).encode('utf-8')
+        start_response(f"{status} {'Too Many Requests' if status == 429 else 'Service Unavailable'}", [
+            ('Content-Type', 'application/json'),
+            ('Content-Length', str(len(body))),
+            ('Retry-After', str(seconds))
+        ])
+        return [body]
+
+    def __call__(self, environ, start_response):
+        name = self.classify(environ)
+        route_class = self.classes.get(name) if name else None
+        if route_class is None:
+            return self.wsgi_app(environ, start_response)
+
+        client = _client(environ)
+        rejected = self._acquire(route_class, client)
+        if rejected is not None:
+            return self._reject(start_response, *rejected)
+
+        started = time.monotonic()
+        try:
+            # Com o Flask a resposta já está pronta quando wsgi_app retorna (o contexto e a
+            # conexão com o banco já foram liberados); o envio do corpo não ocupa vaga
+            return self.wsgi_app(environ, start_response)
+        finally:
+            self._release(route_class, client, started)
+
+
+def install_from_env(app) -> Optional[AdmissionController]:
+    """Instalar o controle no app Flask conforme as variáveis GTEX_ADMISSION_*.
+
+    Desligado com GTEX_ADMISSION=0. O controlador fica em
+    app.extensions['admission'], onde o serve.py o encontra para encaixar
+    o encaminhador de escritas por dentro dele.
+    """
+    if os.environ.get('GTEX_ADMISSION', '1').lower() not in ('1', 'true', 'yes'):
+        return None
+    controller = AdmissionController(app.wsgi_app, {
+        'read': RouteClass('read', limit=int(os.environ.get('GTEX_ADMISSION_READS', 32)), queue=64,
+                           deadline=float(os.environ.get('GTEX_ADMISSION_READ_DEADLINE', 2.0)), priority=0),
+        'write': RouteClass('write', limit=int(os.environ.get('GTEX_ADMISSION_WRITES', 2)),
+                            queue=int(os.environ.get('GTEX_ADMISSION_WRITE_QUEUE', 16)),
+                            deadline=float(os.environ.get('GTEX_ADMISSION_WRITE_DEADLINE', 5.0)), priority=1,
+                            per_client=int(os.environ.get('GTEX_ADMISSION_PER_CLIENT', 4)))
+    }, max_in_flight=int(os.environ.get('GTEX_ADMISSION_MAX_IN_FLIGHT', 32)))
+    app.wsgi_app = controller
+    app.extensions['admission'] = controller
+    return controller
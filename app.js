@@ -401,10 +401,25 @@ async function createText() {
 }
 
 // Iniciar edição de texto
-function startEditText(textId) {
-  const text = texts.find(t => t.id === textId);
+async function startEditText(textId) {
+  let text = texts.find(t => t.id === textId);
   if (!text) return;
-  
+
+  // A listagem traz só a prévia de textos grandes: editar exige o conteúdo completo
+  if (text.content_truncated) {
+    try {
+      showLoader();
+      const response = await fetch(`${API_BASE_URL}/texts/${textId}`);
+      if (!response.ok) throw new Error('Erro ao carregar texto');
+      text = await response.json();
+    } catch (error) {
+      showNotification(error.message, 'error');
+      return;
+    } finally {
+      hideLoader();
+    }
+  }
+
   editingTextId = text.id;
   document.getElementById('edit-text-title').value = text.title;
   document.getElementById('edit-text-content').value = text.content;
@@ -1,63 +1,394 @@
+import atexit
 import os
 import sqlite3
-from flask import Flask, request, jsonify, g
+import threading
+import time
+from collections import Counter, OrderedDict
+from flask import Flask, Response, request, jsonify, g
 from flask_cors import CORS
-from datetime import datetime
+from datetime import date, datetime, timedelta
+from src.utils.admission import install_from_env as install_admission
+from src.utils import index_changes
+from src.utils.index_changes import SCHEMA as INDEX_CHANGES_SCHEMA
+from src.utils.large_content import SCHEMA as LARGE_CONTENT_SCHEMA, LargeContentStore, UploadError
+from src.utils.minhash_index import MinHashIndex
+from src.utils.revision_store import SCHEMA as REVISION_SCHEMA, RevisionPruner, RevisionStore
+from src.utils.suggest_index import SuggestIndex
+from src.utils.tag_stats import TagStats
 
 app = Flask(__name__)
 CORS(app)  # Habilita CORS para todas as rotas
 
 # Configuração do banco de dados
 DATABASE = os.path.abspath('gtex.db')
+# PRAGMAs aplicados a cada nova conexão (o serve.py ajusta por processo após o fork)
+SQLITE_PRAGMAS = ()
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS texts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    title TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS tags (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL UNIQUE,
+    color TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS text_tags (
+    text_id INTEGER,
+    tag_id INTEGER,
+    PRIMARY KEY (text_id, tag_id),
+    FOREIGN KEY (text_id) REFERENCES texts (id) ON DELETE CASCADE,
+    FOREIGN KEY (tag_id) REFERENCES tags (id) ON DELETE CASCADE
+);
+
+-- Quantas vezes cada texto foi aberto: ordena os títulos no autocompletar
+CREATE TABLE IF NOT EXISTS text_usage (
+    text_id INTEGER PRIMARY KEY,
+    opens INTEGER NOT NULL DEFAULT 0
+);
+''' + LARGE_CONTENT_SCHEMA + REVISION_SCHEMA + INDEX_CHANGES_SCHEMA
+
+# Conteúdos acima de GTEX_LARGE_CONTENT bytes ficam em text_blobs; `texts.content` guarda só
+# uma prévia, para que listagens e buscas não arrastem páginas de overflow pelo cache
+large_content = LargeContentStore(
+    threshold=int(os.environ.get('GTEX_LARGE_CONTENT', 256 * 1024)),
+    preview_chars=int(os.environ.get('GTEX_CONTENT_PREVIEW', 2000))
+)
+UPLOAD_CHUNK_MAX = int(os.environ.get('GTEX_UPLOAD_CHUNK_MAX', 8 * 1024 * 1024))
+CONTENT_SIZE_SQL = '(SELECT b.size FROM text_blobs b WHERE b.text_id = t.id AND b.complete = 1) AS content_size'
+
+def mark_large_content(text):
+    """Sinalizar em listagens que `content` é só a prévia de um texto grande"""
+    if text.pop('content_size', None) is not None:
+        text['content_truncated'] = True
+    return text
+
+def load_content(db, text):
+    """Trocar a prévia de um texto grande pelo conteúdo completo"""
+    content = large_content.read_text(db, text['id'])
+    if content is not None:
+        text['content'] = content
+    return text
+
+# Histórico de revisões: quadros-chave a cada GTEX_REVISION_KEYFRAME revisões e diffs entre eles
+revision_store = RevisionStore(keyframe_interval=int(os.environ.get('GTEX_REVISION_KEYFRAME', 32)))
+
+# Métricas opcionais (GTEX_METRICS=1): latência, consultas SQL por rota e /metrics para o Prometheus
+connection_factory = sqlite3.Connection
+if os.environ.get('GTEX_METRICS', '').lower() in ('1', 'true', 'yes'):
+    from src.utils.request_metrics import InstrumentedConnection, RequestMetrics
+    RequestMetrics(app, n_plus_one_threshold=int(os.environ.get('GTEX_N_PLUS_ONE_THRESHOLD', 20)))
+    connection_factory = InstrumentedConnection
+
+# Consultas acima de GTEX_SLOW_QUERY_MS são registradas com parâmetros e EXPLAIN QUERY PLAN
+if os.environ.get('GTEX_SLOW_QUERY_MS'):
+    from src.utils.profiling import SlowQueryLog
+    from src.utils.request_metrics import InstrumentedConnection
+    InstrumentedConnection.slow_query_log = SlowQueryLog(float(os.environ['GTEX_SLOW_QUERY_MS']))
+    connection_factory = InstrumentedConnection
+
+# Perfil sob demanda (GTEX_PROFILING=1): cabeçalho X-Gtex-Profile com GTEX_PROFILE_TOKEN
+# ou caminhos listados em GTEX_PROFILE_PATHS
+if os.environ.get('GTEX_PROFILING', '').lower() in ('1', 'true', 'yes'):
+    from src.utils.profiling import RequestProfiler
+    app.wsgi_app = RequestProfiler(
+        app.wsgi_app,
+        os.environ.get('GTEX_PROFILE_DIR', os.path.abspath('profiles')),
+        keep=int(os.environ.get('GTEX_PROFILE_KEEP', 50)),
+        token=os.environ.get('GTEX_PROFILE_TOKEN'),
+        allow_paths=os.environ.get('GTEX_PROFILE_PATHS', '').split(',')
+    )
+
+# Controle de admissão (desligado com GTEX_ADMISSION=0): vagas e filas curtas por classe de rota.
+# Sem vaga dentro do prazo a resposta é 429/503 com Retry-After, em vez de a thread esperar
+# o lock do SQLite; leituras são atendidas antes das escritas quando as vagas acabam
+install_admission(app)
+
+# Modo multi-tenant (GTEX_TENANT_DIR): cada tenant, indicado pelo cabeçalho X-Gtex-Tenant,
+# tem seu próprio arquivo SQLite; as conexões abertas ficam em um LRU limitado
+tenant_router = None
+if os.environ.get('GTEX_TENANT_DIR'):
+    from src.utils.tenant_router import TENANT_HEADER, TenantError, TenantRouter
+    tenant_router = TenantRouter(
+        os.environ['GTEX_TENANT_DIR'],
+        max_open=int(os.environ.get('GTEX_TENANT_MAX_OPEN', 256)),
+        schema=SCHEMA,
+        pragmas=SQLITE_PRAGMAS,
+        connection_factory=connection_factory,
+        on_connect=lambda db: setattr(db, 'row_factory', sqlite3.Row)
+    )
+
+    @app.before_request
+    def select_tenant():
+        if not request.path.startswith('/api/'):
+            return None
+        try:
+            g.tenant = TenantRouter.validate(request.headers.get(TENANT_HEADER, ''))
+        except TenantError as e:
+            return jsonify({'error': str(e)}), 400
 
 def get_db():
     db = getattr(g, '_database', None)
     if db is None:
-        db = g._database = sqlite3.connect(DATABASE)
+        if tenant_router is not None and g.get('tenant'):
+            db = g._database = tenant_router.checkout(g.tenant)
+            return db
+        db = g._database = sqlite3.connect(DATABASE, factory=connection_factory)
         db.row_factory = sqlite3.Row
+        for pragma in SQLITE_PRAGMAS:
+            db.execute(f'PRAGMA {pragma}')
     return db
 
 @app.teardown_appcontext
 def close_connection(exception):
     db = getattr(g, '_database', None)
     if db is not None:
-        db.close()
+        if tenant_router is not None and g.get('tenant'):
+            tenant_router.checkin(db)
+        else:
+            db.close()
+
+# Índices em memória derivados do banco (autocompletar, textos semelhantes, estatísticas de
+# etiquetas): um por banco
+# (principal ou tenant), montados no primeiro uso e atualizados pelas rotas de escrita deste
+# processo. Os leitores do serve.py não recebem escritas: a cada GTEX_INDEX_REFRESH segundos
+# conferem o PRAGMA data_version e, se o banco mudou, aplicam as mudanças publicadas em
+# index_changes desde a última sincronização. O índice só é remontado se não tiver atualização
+# incremental, se houver mais de GTEX_INDEX_DELTA_MAX mudanças ou se elas já tiverem sido podadas.
+INDEX_REFRESH = float(os.environ.get('GTEX_INDEX_REFRESH',
+                                     2 if os.environ.get('GTEX_SERVE_ROLE') == 'reader' else 0))
+INDEX_MAX = int(os.environ.get('GTEX_INDEX_MAX', 64))
+INDEX_DELTA_MAX = int(os.environ.get('GTEX_INDEX_DELTA_MAX', 5000))
+INDEX_CHANGES_KEEP = int(os.environ.get('GTEX_INDEX_CHANGES_KEEP', 20000))
+derived_indexes = OrderedDict()
+derived_lock = threading.Lock()
+
+TAG_USAGE_SQL = '''
+    SELECT tg.id, COUNT(t.id)
+    FROM tags tg
+    LEFT JOIN text_tags tt ON tt.tag_id = tg.id
+    LEFT JOIN texts t ON t.id = tt.text_id
+    GROUP BY tg.id
+'''
+
+def fetch_rows(db, sql, ids):
+    """Linhas de `sql` (com {} no lugar da lista do IN) para os ids, em lotes"""
+    rows = []
+    ids = list(ids)
+    # Lotes abaixo do limite de parâmetros do SQLite
+    for first in range(0, len(ids), 500):
+        chunk = ids[first:first + 500]
+        rows += db.execute(sql.format(','.join('?' * len(chunk))), chunk).fetchall()
+    return rows
+
+TEXT_USAGE_SQL = '''
+    SELECT t.id, t.title, COALESCE(u.opens, 0)
+    FROM texts t
+    LEFT JOIN text_usage u ON u.text_id = t.id
+'''
+
+def build_suggest_index(db):
+    cursor = db.cursor()
+    usage = dict(cursor.execute(TAG_USAGE_SQL).fetchall())
+    entries = [('tag', row[0], row[1], usage.get(row[0], 0))
+               for row in cursor.execute('SELECT id, name FROM tags').fetchall()]
+    # Uso de um título = quantas vezes o texto foi aberto (text_usage mais o que falta gravar)
+    pending = pending_usage.get(g.get('tenant'), {})
+    entries += [('text', row[0], row[1], row[2] + pending.get(row[0], 0))
+                for row in cursor.execute(TEXT_USAGE_SQL).fetchall()]
+    return SuggestIndex.build(entries)
+
+def update_suggest_index(index, db, changes):
+    pending = pending_usage.get(g.get('tenant'), {})
+    text_ids = {item_id for kind, item_id in changes if kind in ('text', 'usage')}
+    rows = fetch_rows(db, TEXT_USAGE_SQL + ' WHERE t.id IN ({})', text_ids)
+    for text_id, title, opens in rows:
+        index.add('text', text_id, title, opens + pending.get(text_id, 0))
+    for text_id in text_ids - {row[0] for row in rows}:
+        index.remove('text', text_id)
+
+    tag_ids = {item_id for kind, item_id in changes if kind == 'tag'}
+    rows = fetch_rows(db, 'SELECT id, name FROM tags WHERE id IN ({})', tag_ids)
+    for tag_id, name in rows:
+        index.add('tag', tag_id, name)
+    for tag_id in tag_ids - {row[0] for row in rows}:
+        index.remove('tag', tag_id)
+    # Textos alterados podem ter ganhado ou perdido etiquetas
+    if any(kind in ('text', 'tag') for kind, _ in changes):
+        refresh_tag_usage(index, db)
+
+def full_contents(db, rows):
+    """(id, conteúdo completo) de linhas (id, content, content_size): textos grandes vêm de text_blobs"""
+    for text_id, content, size in rows:
+        yield text_id, content if size is None else large_content.read_text(db, text_id)
+
+def build_similarity_index(db):
+    index = MinHashIndex()
+    index.update_many(full_contents(db, db.execute(f'SELECT t.id, t.content, {CONTENT_SIZE_SQL} FROM texts t')))
+    return index
+
+def update_tag_stats(stats, db, changes):
+    # Sem o estado anterior das etiquetas de cada texto: mudanças em textos e etiquetas remontam
+    return not any(kind in ('text', 'tag') for kind, _ in changes)
+
+def update_similarity_index(index, db, changes):
+    text_ids = {item_id for kind, item_id in changes if kind == 'text'}
+    rows = fetch_rows(db, f'SELECT t.id, t.content, {CONTENT_SIZE_SQL} FROM texts t WHERE t.id IN ({{}})', text_ids)
+    index.update_many(full_contents(db, rows))
+    for text_id in text_ids - {row[0] for row in rows}:
+        index.remove(text_id)
+
+def build_tag_stats(db):
+    tag_ids = [row[0] for row in db.execute('SELECT id FROM tags').fetchall()]
+    links = db.execute('''
+        SELECT tt.text_id, tt.tag_id, t.created_at
+        FROM text_tags tt
+        JOIN texts t ON t.id = tt.text_id
+        ORDER BY tt.text_id
+    ''')
+    return TagStats.build(tag_ids, links)
+
+def publish_change(db, kind, item_id):
+    """Registrar, na transação da escrita, que um texto ('text') ou etiqueta ('tag') mudou"""
+    index_changes.publish(db, kind, item_id, INDEX_CHANGES_KEEP)
+
+def apply_changes(state, updater, db):
+    """Aplicar ao índice as mudanças publicadas depois de state['seq']; False se for preciso remontar"""
+    delta = index_changes.changes_since(db, state['seq'], INDEX_DELTA_MAX)
+    if delta is None:
+        return False
+    state['seq'], changes = delta
+    return not changes or updater(state['index'], db, changes) is not False
+
+def get_derived_index(name, builder, build=True, updater=None):
+    """Índice `name` do banco da requisição; com build=False, None se ele ainda não foi montado.
+
+    `updater(index, db, changes)` aplica um conjunto de (kind, item_id) alterados e pode devolver
+    False para pedir a remontagem; sem ele, o índice é remontado quando outro processo grava no banco.
+    """
+    key = (name, g.get('tenant'))
+    with derived_lock:
+        state = derived_indexes.get(key)
+        if state is None:
+            if not build:
+                return None
+            state = derived_indexes[key] = {'index': None, 'watch': None, 'version': None, 'checked': 0.0,
+                                            'seq': 0, 'lock': threading.Lock()}
+            while len(derived_indexes) > INDEX_MAX:
+                _, evicted = derived_indexes.popitem(last=False)
+                if evicted['watch'] is not None:
+                    evicted['watch'].close()
+        derived_indexes.move_to_end(key)
+
+    # Montar um índice grande pode demorar: só quem usa o mesmo índice espera
+    with state['lock']:
+        if INDEX_REFRESH and time.monotonic() - state['checked'] >= INDEX_REFRESH:
+            if state['watch'] is None:
+                path = tenant_router.path(key[1]) if key[1] else DATABASE
+                state['watch'] = sqlite3.connect(path, check_same_thread=False)
+            # data_version muda quando outra conexão (outro processo) grava no banco
+            version = state['watch'].execute('PRAGMA data_version').fetchone()[0]
+            state['checked'] = time.monotonic()
+            if version != state['version']:
+                state['version'] = version
+                if state['index'] is not None and (updater is None or not apply_changes(state, updater, get_db())):
+                    state['index'] = None
+
+        hit = state['index'] is not None
+        if not hit:
+            db = get_db()
+            # Antes de montar: mudanças gravadas durante a montagem são reaplicadas (idempotente)
+            state['seq'] = index_changes.last_seq(db)
+            state['index'] = builder(db)
+        metrics = app.extensions.get('request_metrics')
+        if metrics is not None:
+            # Acerto: índice servido da memória (no máximo com as mudanças aplicadas); falha: remontado
+            metrics.record_cache(name, hit)
+        return state['index']
+
+def get_suggest_index(build=True):
+    return get_derived_index('suggest', build_suggest_index, build, update_suggest_index)
+
+def get_similarity_index(build=True):
+    return get_derived_index('similarity', build_similarity_index, build, update_similarity_index)
+
+def get_tag_stats(build=True):
+    return get_derived_index('tag_stats', build_tag_stats, build, update_tag_stats)
+
+def text_tag_ids(db, text_id):
+    """Data de criação e etiquetas atuais de um texto, para atualizar as estatísticas"""
+    row = db.execute('SELECT created_at FROM texts WHERE id = ?', (text_id,)).fetchone()
+    tag_ids = [r[0] for r in db.execute('SELECT tag_id FROM text_tags WHERE text_id = ?', (text_id,)).fetchall()]
+    return row[0], tag_ids
+
+# Aberturas de textos: contadas em memória por banco e gravadas em text_usage em lote, no máximo
+# a cada GTEX_USAGE_FLUSH segundos. No serve.py quem grava é o leitor que atendeu as aberturas
+# (um UPSERT curto por lote); a mudança é publicada para os outros leitores como 'usage'.
+USAGE_FLUSH = float(os.environ.get('GTEX_USAGE_FLUSH', 5))
+pending_usage = {}
+usage_flushed = {}
+usage_lock = threading.Lock()
+
+def write_usage(db, counts):
+    db.executemany('''
+        INSERT INTO text_usage (text_id, opens) VALUES (?, ?)
+        ON CONFLICT (text_id) DO UPDATE SET opens = opens + excluded.opens
+    ''', counts.items())
+    for text_id in counts:
+        publish_change(db, 'usage', text_id)
+    db.commit()
+
+def record_open(db, text_id):
+    tenant = g.get('tenant')
+    with usage_lock:
+        counts = pending_usage.setdefault(tenant, Counter())
+        counts[text_id] += 1
+        if time.monotonic() - usage_flushed.get(tenant, 0.0) < USAGE_FLUSH:
+            return
+        usage_flushed[tenant] = time.monotonic()
+        del pending_usage[tenant]
+    try:
+        write_usage(db, counts)
+    except sqlite3.OperationalError as e:
+        # Banco ocupado: as contagens voltam para o próximo lote
+        db.rollback()
+        print(f"⚠ Contagem de aberturas adiada: {e}")
+        with usage_lock:
+            pending_usage.setdefault(tenant, Counter()).update(counts)
+
+def flush_usage():
+    """Gravar as contagens pendentes de todos os bancos, com conexões próprias (ao sair)"""
+    with usage_lock:
+        pending = dict(pending_usage)
+        pending_usage.clear()
+    for tenant, counts in pending.items():
+        db = sqlite3.connect(tenant_router.path(tenant) if tenant else DATABASE, timeout=30)
+        try:
+            write_usage(db, counts)
+        except sqlite3.Error as e:
+            print(f"✗ Contagem de aberturas perdida: {e}")
+        finally:
+            db.close()
+
+atexit.register(flush_usage)
+
+def refresh_tag_usage(index, db):
+    for tag_id, usage in db.execute(TAG_USAGE_SQL).fetchall():
+        index.set_usage('tag', tag_id, usage)
 
 def init_db():
     with app.app_context():
         db = get_db()
         cursor = db.cursor()
         
-        # Criar tabela de textos
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS texts (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            title TEXT NOT NULL,
-            content TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-        ''')
-        
-        # Criar tabela de etiquetas
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS tags (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL UNIQUE,
-            color TEXT NOT NULL
-        )
-        ''')
-        
-        # Criar tabela de relacionamento entre textos e etiquetas
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS text_tags (
-            text_id INTEGER,
-            tag_id INTEGER,
-            PRIMARY KEY (text_id, tag_id),
-            FOREIGN KEY (text_id) REFERENCES texts (id) ON DELETE CASCADE,
-            FOREIGN KEY (tag_id) REFERENCES tags (id) ON DELETE CASCADE
-        )
-        ''')
+        # Criar tabelas de textos, etiquetas e relacionamento
+        cursor.executescript(SCHEMA)
         
         # Inserir dados iniciais se necessário
         cursor.execute("SELECT COUNT(*) FROM tags")
@@ -103,8 +434,8 @@ def get_texts():
     cursor = db.cursor()
     
     texts = []
-    for row in cursor.execute('SELECT * FROM texts ORDER BY created_at DESC'):
-        text = dict(row)
+    for row in cursor.execute(f'SELECT t.*, {CONTENT_SIZE_SQL} FROM texts t ORDER BY t.created_at DESC'):
+        text = mark_large_content(dict(row))
         
         # Buscar etiquetas associadas a este texto
         tags = []
@@ -131,11 +462,16 @@ def create_text():
     cursor = db.cursor()
     
     now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    is_large = large_content.is_large(data['content'])
     cursor.execute(
         'INSERT INTO texts (title, content, created_at, updated_at) VALUES (?, ?, ?, ?)',
-        (data['title'], data['content'], now, now)
+        (data['title'], large_content.preview(data['content']) if is_large else data['content'], now, now)
     )
     text_id = cursor.lastrowid
+    if is_large:
+        large_content.store(db, text_id, data['content'])
+    revision_store.record(db, text_id, data['title'], data['content'])
+    publish_change(db, 'text', text_id)
     
     # Associar etiquetas se fornecidas
     if 'tag_ids' in data and isinstance(data['tag_ids'], list):
@@ -147,6 +483,7 @@ def create_text():
     # Retornar o texto criado com suas etiquetas
     cursor.execute('SELECT * FROM texts WHERE id = ?', (text_id,))
     text = dict(cursor.fetchone())
+    text['content'] = data['content']
     
     # Buscar etiquetas associadas
     tags = []
@@ -160,6 +497,18 @@ def create_text():
     
     text['tags'] = tags
     
+    index = get_suggest_index(build=False)
+    if index is not None:
+        index.add('text', text_id, data['title'])
+        if data.get('tag_ids'):
+            refresh_tag_usage(index, db)
+    similarity = get_similarity_index(build=False)
+    if similarity is not None:
+        similarity.update(text_id, data['content'])
+    stats = get_tag_stats(build=False)
+    if stats is not None and data.get('tag_ids'):
+        stats.change_text(now, (), data['tag_ids'])
+    
     return jsonify(text), 201
 
 @app.route('/api/texts/<int:text_id>', methods=['GET'])
@@ -173,7 +522,12 @@ def get_text(text_id):
     if row is None:
         return jsonify({'error': 'Texto não encontrado'}), 404
     
-    text = dict(row)
+    text = load_content(db, dict(row))
+    
+    index = get_suggest_index(build=False)
+    if index is not None:
+        index.add_usage('text', text_id)
+    record_open(db, text_id)
     
     # Buscar etiquetas associadas
     tags = []
@@ -199,10 +553,17 @@ def update_text(text_id):
     cursor = db.cursor()
     
     # Verificar se o texto existe
-    cursor.execute('SELECT id FROM texts WHERE id = ?', (text_id,))
-    if cursor.fetchone() is None:
+    cursor.execute('SELECT id, title, content FROM texts WHERE id = ?', (text_id,))
+    previous = cursor.fetchone()
+    if previous is None:
         return jsonify({'error': 'Texto não encontrado'}), 404
     
+    # Estado anterior, para o diff da nova revisão
+    if 'title' in data or 'content' in data:
+        previous = load_content(db, dict(previous))
+        revision_store.record(db, text_id, data.get('title', previous['title']),
+                              data.get('content', previous['content']), previous['content'], previous['title'])
+    
     # Atualizar texto
     updates = []
     params = []
@@ -213,7 +574,11 @@ def update_text(text_id):
     
     if 'content' in data:
         updates.append('content = ?')
-        params.append(data['content'])
+        if large_content.is_large(data['content']):
+            params.append(large_content.store(db, text_id, data['content']))
+        else:
+            params.append(data['content'])
+            large_content.delete(db, text_id)
     
     updates.append('updated_at = ?')
     params.append(datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
@@ -224,9 +589,14 @@ def update_text(text_id):
         f'UPDATE texts SET {", ".join(updates)} WHERE id = ?',
         tuple(params)
     )
+    publish_change(db, 'text', text_id)
     
     # Atualizar etiquetas se fornecidas
+    stats = get_tag_stats(build=False)
     if 'tag_ids' in data and isinstance(data['tag_ids'], list):
+        if stats is not None:
+            created_at, old_tag_ids = text_tag_ids(db, text_id)
+        
         # Remover associações existentes
         cursor.execute('DELETE FROM text_tags WHERE text_id = ?', (text_id,))
         
@@ -239,6 +609,10 @@ def update_text(text_id):
     # Retornar o texto atualizado
     cursor.execute('SELECT * FROM texts WHERE id = ?', (text_id,))
     text = dict(cursor.fetchone())
+    if 'content' in data:
+        text['content'] = data['content']
+    else:
+        load_content(db, text)
     
     # Buscar etiquetas associadas
     tags = []
@@ -252,6 +626,18 @@ def update_text(text_id):
     
     text['tags'] = tags
     
+    index = get_suggest_index(build=False)
+    if index is not None:
+        if 'title' in data:
+            index.add('text', text_id, data['title'])
+        if 'tag_ids' in data:
+            refresh_tag_usage(index, db)
+    similarity = get_similarity_index(build=False)
+    if similarity is not None and 'content' in data:
+        similarity.update(text_id, data['content'])
+    if stats is not None and isinstance(data.get('tag_ids'), list):
+        stats.change_text(created_at, old_tag_ids, data['tag_ids'])
+    
     return jsonify(text)
 
 @app.route('/api/texts/<int:text_id>', methods=['DELETE'])
@@ -264,12 +650,204 @@ def delete_text(text_id):
     if cursor.fetchone() is None:
         return jsonify({'error': 'Texto não encontrado'}), 404
     
+    stats = get_tag_stats(build=False)
+    if stats is not None:
+        created_at, old_tag_ids = text_tag_ids(db, text_id)
+    
     # Excluir o texto (as associações com etiquetas serão excluídas automaticamente devido à restrição ON DELETE CASCADE)
     cursor.execute('DELETE FROM texts WHERE id = ?', (text_id,))
+    large_content.delete(db, text_id)
+    revision_store.delete(db, text_id)
+    cursor.execute('DELETE FROM text_usage WHERE text_id = ?', (text_id,))
+    publish_change(db, 'text', text_id)
     db.commit()
     
+    index = get_suggest_index(build=False)
+    if index is not None:
+        index.remove('text', text_id)
+        refresh_tag_usage(index, db)
+    similarity = get_similarity_index(build=False)
+    if similarity is not None:
+        similarity.remove(text_id)
+    if stats is not None:
+        stats.change_text(created_at, old_tag_ids, ())
+    
     return jsonify({'message': 'Texto excluído com sucesso'})
 
+# Conteúdo por faixas de bytes (UTF-8) e envio em partes de textos grandes
+@app.route('/api/texts/<int:text_id>/content', methods=['GET'])
+def get_text_content(text_id):
+    db = get_db()
+    if db.execute('SELECT id FROM texts WHERE id = ?', (text_id,)).fetchone() is None:
+        return jsonify({'error': 'Texto não encontrado'}), 404
+    
+    offset = request.args.get('offset', 0, type=int)
+    length = request.args.get('length', type=int)
+    if offset < 0 or (length is not None and length < 0):
+        return jsonify({'error': 'offset e length não podem ser negativos'}), 400
+    
+    size = large_content.size(db, text_id)
+    content = None
+    if size is None:
+        # Texto pequeno: o conteúdo está inteiro na linha de `texts`
+        content = db.execute('SELECT content FROM texts WHERE id = ?', (text_id,)).fetchone()[0].encode('utf-8')
+        size = len(content)
+    headers = {'Accept-Ranges': 'bytes', 'X-Content-Size': str(size)}
+    # Faixa vazia dentro de um conteúdo não vazio (offset no fim ou length=0) não é satisfazível
+    if offset > size or (size and (offset == size or length == 0)):
+        headers['Content-Range'] = f'bytes */{size}'
+        return jsonify({'error': 'Faixa fora do conteúdo'}), 416, headers
+    
+    if content is not None:
+        data = content[offset:size if length is None else offset + length]
+    else:
+        data = large_content.read(db, text_id, offset, length)
+    partial = offset > 0 or offset + len(data) < size
+    if partial:
+        headers['Content-Range'] = f'bytes {offset}-{offset + len(data) - 1}/{size}'
+    return Response(data, status=206 if partial else 200, headers=headers,
+                    content_type='text/plain; charset=utf-8')
+
+@app.route('/api/texts/<int:text_id>/content/uploads', methods=['POST'])
+def begin_content_upload(text_id):
+    data = request.json
+    if not data or not isinstance(data.get('size'), int) or data['size'] < 0:
+        return jsonify({'error': 'Tamanho (size) em bytes é obrigatório'}), 400
+    
+    db = get_db()
+    if db.execute('SELECT id FROM texts WHERE id = ?', (text_id,)).fetchone() is None:
+        return jsonify({'error': 'Texto não encontrado'}), 404
+    
+    large_content.prune_uploads(db)
+    upload = large_content.begin_upload(db, text_id, data['size'])
+    db.commit()
+    return jsonify(upload), 201
+
+@app.route('/api/texts/<int:text_id>/content/uploads/<int:upload_id>', methods=['GET'])
+def content_upload_status(text_id, upload_id):
+    upload = large_content.upload_status(get_db(), text_id, upload_id)
+    if upload is None:
+        return jsonify({'error': 'Envio não encontrado'}), 404
+    return jsonify(upload)
+
+@app.route('/api/texts/<int:text_id>/content/uploads/<int:upload_id>', methods=['PUT'])
+def upload_content_chunk(text_id, upload_id):
+    if (request.content_length or 0) > UPLOAD_CHUNK_MAX:
+        return jsonify({'error': f'Partes devem ter no máximo {UPLOAD_CHUNK_MAX} bytes'}), 413
+    
+    db = get_db()
+    if large_content.upload_status(db, text_id, upload_id) is None:
+        return jsonify({'error': 'Envio não encontrado'}), 404
+    
+    try:
+        upload = large_content.write_chunk(db, text_id, upload_id, request.args.get('offset', 0, type=int),
+                                           request.get_data())
+    except UploadError as e:
+        db.rollback()
+        return jsonify({'error': str(e), **large_content.upload_status(db, text_id, upload_id)}), 409
+    
+    content = None
+    if upload['complete']:
+        # Envio completo: um conteúdo pequeno volta para a linha de `texts`
+        if upload['size'] <= large_content.threshold:
+            stored = content = large_content.read_text(db, text_id)
+            large_content.delete(db, text_id)
+        else:
+            stored = large_content.read_preview(db, text_id)
+            content = large_content.read_text(db, text_id)
+        db.execute('UPDATE texts SET content = ?, updated_at = ? WHERE id = ?',
+                   (stored, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), text_id))
+        # Um envio substitui o conteúdo inteiro: a revisão é um quadro-chave
+        title = db.execute('SELECT title FROM texts WHERE id = ?', (text_id,)).fetchone()[0]
+        revision_store.record(db, text_id, title, content)
+        publish_change(db, 'text', text_id)
+    db.commit()
+    
+    similarity = get_similarity_index(build=False)
+    if similarity is not None and content is not None:
+        similarity.update(text_id, content)
+    
+    return jsonify(upload)
+
+# Histórico de revisões de um texto
+@app.route('/api/texts/<int:text_id>/revisions', methods=['GET'])
+def list_revisions(text_id):
+    db = get_db()
+    if db.execute('SELECT id FROM texts WHERE id = ?', (text_id,)).fetchone() is None:
+        return jsonify({'error': 'Texto não encontrado'}), 404
+    return jsonify(revision_store.list(db, text_id))
+
+@app.route('/api/texts/<int:text_id>/revisions/<int:revision>', methods=['GET'])
+def get_revision(text_id, revision):
+    result = revision_store.get(get_db(), text_id, revision)
+    if result is None:
+        return jsonify({'error': 'Revisão não encontrada'}), 404
+    return jsonify(result)
+
+def prune_revisions():
+    """Podar o histórico do banco principal e de cada tenant, com conexões próprias"""
+    options = {'keep_last': int(os.environ.get('GTEX_REVISION_KEEP', 50)),
+               'keep_daily_days': int(os.environ.get('GTEX_REVISION_KEEP_DAYS', 90))}
+    totals = {'texts': 0, 'removed': 0}
+    databases = [DATABASE] + ([tenant_router.path(t) for t in tenant_router.tenants()] if tenant_router else [])
+    for path in databases:
+        if not os.path.exists(path):
+            continue
+        db = sqlite3.connect(path, timeout=30)
+        try:
+            for pragma in SQLITE_PRAGMAS:
+                db.execute(f'PRAGMA {pragma}')
+            if db.execute("SELECT name FROM sqlite_master WHERE name = 'text_revisions'").fetchone():
+                for key, value in revision_store.prune(db, **options).items():
+                    totals[key] += value
+        finally:
+            db.close()
+    return totals
+
+# Poda em segundo plano a cada GTEX_REVISION_PRUNE_INTERVAL segundos (0 desliga); no serve.py
+# só o processo escritor poda
+revision_pruner = None
+if float(os.environ.get('GTEX_REVISION_PRUNE_INTERVAL', 3600)) > 0 and os.environ.get('GTEX_SERVE_ROLE') != 'reader':
+    revision_pruner = RevisionPruner(prune_revisions, float(os.environ.get('GTEX_REVISION_PRUNE_INTERVAL', 3600)))
+    atexit.register(revision_pruner.close)
+
+def fetch_titles(db, text_ids):
+    return dict(fetch_rows(db, 'SELECT id, title FROM texts WHERE id IN ({})', text_ids))
+
+@app.route('/api/texts/<int:text_id>/similar', methods=['GET'])
+def similar_texts(text_id):
+    threshold = request.args.get('threshold', 0.5, type=float)
+    limit = max(1, min(request.args.get('limit', 10, type=int), 100))
+    
+    index = get_similarity_index()
+    if text_id not in index:
+        return jsonify({'error': 'Texto não encontrado'}), 404
+    
+    matches = index.similar(text_id, threshold, limit)
+    titles = fetch_titles(get_db(), [match_id for match_id, _ in matches])
+    return jsonify([{'id': match_id, 'title': titles.get(match_id), 'similarity': round(score, 3)}
+                    for match_id, score in matches if match_id in titles])
+
+@app.route('/api/texts/duplicates', methods=['GET'])
+def duplicate_texts():
+    threshold = request.args.get('threshold', 0.8, type=float)
+    
+    index = get_similarity_index()
+    started = time.perf_counter()
+    groups = index.duplicate_groups(threshold)
+    titles = fetch_titles(get_db(), [text_id for group in groups for text_id in group['ids']])
+    
+    return jsonify({
+        'threshold': threshold,
+        'texts': len(index),
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 1),
+        'groups': [{
+            'texts': [{'id': text_id, 'title': titles.get(text_id)} for text_id in group['ids']],
+            'min_similarity': round(group['min_similarity'], 3),
+            'max_similarity': round(group['max_similarity'], 3)
+        } for group in groups]
+    })
+
 # Rotas para etiquetas
 @app.route('/api/tags', methods=['GET'])
 def get_tags():
@@ -303,6 +881,7 @@ def create_tag():
             (data['name'], data['color'])
         )
         tag_id = cursor.lastrowid
+        publish_change(db, 'tag', tag_id)
         db.commit()
     except sqlite3.IntegrityError:
         return jsonify({'error': 'Uma etiqueta com este nome já existe'}), 400
@@ -312,6 +891,13 @@ def create_tag():
     tag = dict(cursor.fetchone())
     tag['text_count'] = 0  # Nova etiqueta, ainda não associada a textos
     
+    index = get_suggest_index(build=False)
+    if index is not None:
+        index.add('tag', tag_id, data['name'], 0)
+    stats = get_tag_stats(build=False)
+    if stats is not None:
+        stats.add_tag(tag_id)
+    
     return jsonify(tag), 201
 
 @app.route('/api/tags/<int:tag_id>', methods=['PUT'])
@@ -347,6 +933,7 @@ def update_tag(tag_id):
             f'UPDATE tags SET {", ".join(updates)} WHERE id = ?',
             tuple(params)
         )
+        publish_change(db, 'tag', tag_id)
         db.commit()
     except sqlite3.IntegrityError:
         return jsonify({'error': 'Uma etiqueta com este nome já existe'}), 400
@@ -359,6 +946,10 @@ def update_tag(tag_id):
     cursor.execute('SELECT COUNT(*) FROM text_tags WHERE tag_id = ?', (tag_id,))
     tag['text_count'] = cursor.fetchone()[0]
     
+    index = get_suggest_index(build=False)
+    if index is not None and 'name' in data:
+        index.add('tag', tag_id, data['name'])
+    
     return jsonify(tag)
 
 @app.route('/api/tags/<int:tag_id>', methods=['DELETE'])
@@ -373,10 +964,48 @@ def delete_tag(tag_id):
     
     # Excluir a etiqueta (as associações com textos serão excluídas automaticamente devido à restrição ON DELETE CASCADE)
     cursor.execute('DELETE FROM tags WHERE id = ?', (tag_id,))
+    publish_change(db, 'tag', tag_id)
     db.commit()
     
+    index = get_suggest_index(build=False)
+    if index is not None:
+        index.remove('tag', tag_id)
+    stats = get_tag_stats(build=False)
+    if stats is not None:
+        stats.remove_tag(tag_id)
+    
     return jsonify({'message': 'Etiqueta excluída com sucesso'})
 
+# Estatísticas de etiquetas: totais, pares mais frequentes e textos criados por dia.
+# Respondidas só com os contadores em memória, sem varrer a tabela de textos.
+@app.route('/api/tags/stats', methods=['GET'])
+def tag_stats():
+    limit = max(1, min(request.args.get('limit', 50, type=int), 1000))
+    try:
+        tag_ids = [int(tag_id) for tag_id in request.args.getlist('tag_id')] or None
+        end = date.fromisoformat(request.args['to']) if 'to' in request.args else None
+        start = date.fromisoformat(request.args['from']) if 'from' in request.args else None
+    except ValueError:
+        return jsonify({'error': 'Datas devem estar no formato AAAA-MM-DD e tag_id deve ser inteiro'}), 400
+    
+    stats = get_tag_stats()
+    end = end or stats.last_day() or date.today()
+    start = start or end - timedelta(days=29)
+    if start > end or (end - start).days >= 366:
+        return jsonify({'error': 'Intervalo de datas inválido (máximo de 366 dias)'}), 400
+    
+    counts = stats.counts()
+    tags = [dict(row) for row in get_db().execute('SELECT id, name, color FROM tags').fetchall()]
+    for tag in tags:
+        tag['text_count'] = counts.get(tag['id'], 0)
+    tags.sort(key=lambda tag: (-tag['text_count'], tag['name']))
+    
+    return jsonify({
+        'tags': tags,
+        'pairs': stats.cooccurrence(limit),
+        'daily': stats.daily(start, end, tag_ids)
+    })
+
 # Rota para busca de textos
 @app.route('/api/search', methods=['GET'])
 def search_texts():
@@ -387,7 +1016,7 @@ def search_texts():
     cursor = db.cursor()
     
     # Construir a consulta SQL
-    sql = 'SELECT DISTINCT t.* FROM texts t'
+    sql = f'SELECT DISTINCT t.*, {CONTENT_SIZE_SQL} FROM texts t'
     params = []
     
     # Adicionar junção com etiquetas se necessário
@@ -402,14 +1031,18 @@ def search_texts():
             sql += ' AND'
         else:
             sql += ' WHERE'
-        sql += ' (t.title LIKE ? OR t.content LIKE ?)'
-        params.extend(['%' + query + '%', '%' + query + '%'])
+        # `texts.content` de um texto grande é só a prévia: o corpo completo é buscado em text_blobs
+        sql += ''' (t.title LIKE ? OR t.content LIKE ? OR EXISTS (
+            SELECT 1 FROM text_blobs b
+            WHERE b.text_id = t.id AND b.complete = 1 AND CAST(b.body AS TEXT) LIKE ?
+        ))'''
+        params.extend(['%' + query + '%'] * 3)
     
     sql += ' ORDER BY t.created_at DESC'
     
     texts = []
     for row in cursor.execute(sql, params):
-        text = dict(row)
+        text = mark_large_content(dict(row))
         
         # Buscar etiquetas associadas a este texto
         tags = []
@@ -426,6 +1059,17 @@ def search_texts():
     
     return jsonify(texts)
 
+# Rota de autocompletar títulos e nomes de etiquetas
+@app.route('/api/suggest', methods=['GET'])
+def suggest():
+    prefix = request.args.get('prefix', '')
+    limit = max(1, min(request.args.get('limit', 10, type=int), 50))
+    kind = request.args.get('type')
+    if kind not in (None, 'tag', 'text'):
+        return jsonify({'error': 'Tipo deve ser tag ou text'}), 400
+    
+    return jsonify(get_suggest_index().suggest(prefix, limit, kind))
+
 if __name__ == '__main__':
     # Inicializar o banco de dados
     init_db()
@@ -0,0 +1,107 @@
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+class DebouncedSaver:
+    """Agenda salvamentos agrupando rajadas de alterações.
+
+    Cada pedido adia o salvamento por `window` segundos, mas nunca além de
+    `max_delay` segundos desde o primeiro pedido pendente, o que limita o
+    atraso de durabilidade. Os dados podem vir no pedido (o mais recente
+    vence) ou de `snapshot_fn`, chamada no momento do salvamento; o que ela
+    devolver, (textos, etiquetas) ou com mais argumentos, vai para `save_fn`.
+    """
+
+    def __init__(self, save_fn: Callable[..., bool],
+                 snapshot_fn: Optional[Callable[[], Tuple]] = None,
+                 window: float = 2.0, max_delay: float = 10.0):
+        self.save_fn = save_fn
+        self.snapshot_fn = snapshot_fn
+        self.window = window
+        self.max_delay = max_delay
+
+        self._condition = threading.Condition()
+        self._save_lock = threading.Lock()
+        self._pending = False
+        self._payload = None
+        self._first_request = None
+        self._deadline = None
+        self._closed = False
+        self.stats = {'requests': 0, 'saves': 0, 'failures': 0}
+        # Resultado do último salvamento (nenhum salvamento ainda: nada falhou)
+        self._last_ok = True
+
+        self._thread = threading.Thread(target=self._run, name='gtex-autosave', daemon=True)
+        self._thread.start()
+
+    def request_save(self, texts: Optional[List[Dict]] = None, tags: Optional[List[Dict]] = None):
+        """Pedir um salvamento; pedidos dentro da janela viram um só"""
+        with self._condition:
+            if self._closed:
+                return
+            now = time.monotonic()
+            self.stats['requests'] += 1
+            if texts is not None or tags is not None:
+                self._payload = (texts or [], tags or [])
+            if not self._pending:
+                self._pending = True
+                self._first_request = now
+            self._deadline = min(now + self.window, self._first_request + self.max_delay)
+            self._condition.notify()
+
+    def _take_pending(self):
+        payload = self._payload
+        self._pending = False
+        self._payload = None
+        self._first_request = None
+        self._deadline = None
+        return payload
+
+    def _save(self, payload):
+        with self._save_lock:
+            try:
+                ok = self.save_fn(*(payload if payload is not None else self.snapshot_fn()))
+            except Exception as e:
+                print(f"✗ Erro no salvamento automático: {e}")
+                ok = False
+            self.stats['saves' if ok else 'failures'] += 1
+            self._last_ok = ok
+            return ok
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._closed and (not self._pending or time.monotonic() < self._deadline):
+                    timeout = None if not self._pending else self._deadline - time.monotonic()
+                    self._condition.wait(timeout)
+                if self._closed:
+                    return
+                payload = self._take_pending()
+            self._save(payload)
+
+    def flush(self) -> bool:
+        """Salvar agora, de forma síncrona, o que estiver pendente.
+
+        Retorna o resultado desse salvamento; sem nada pendente, o do último
+        salvamento (esperando o que estiver em andamento na thread de fundo).
+        """
+        with self._condition:
+            if not self._pending:
+                pending = False
+            else:
+                pending = True
+                payload = self._take_pending()
+        if not pending:
+            # Esperar um salvamento que esteja em andamento na thread de fundo
+            with self._save_lock:
+                return self._last_ok
+        return self._save(payload)
+
+    def close(self):
+        """Encerrar a thread de fundo após gravar o que estiver pendente"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+        self.flush()
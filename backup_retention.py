@@ -0,0 +1,177 @@
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set
+
+TIMESTAMP_FORMAT = "%Y%m%d_%H%M%S"
+MANIFEST_FILE = 'backups_manifest.json'
+
+
+def parse_backup_name(name: str, prefix: str = 'backup_', suffix: str = '.json') -> Optional[datetime]:
+    """Extrair o horário de um nome como backup_20250101_120000.json"""
+    if not (name.startswith(prefix) and name.endswith(suffix)):
+        return None
+    try:
+        return datetime.strptime(name[len(prefix):-len(suffix)], TIMESTAMP_FORMAT)
+    except ValueError:
+        return None
+
+
+class RetentionPolicy:
+    """Manter os N últimos backups e afinar os antigos: um por hora, por dia e por semana"""
+
+    def __init__(self, keep_last: int = 10, hourly: int = 24, daily: int = 7, weekly: int = 4):
+        self.keep_last = keep_last
+        self.hourly = hourly
+        self.daily = daily
+        self.weekly = weekly
+
+    def select(self, entries: List[Dict]) -> Set[str]:
+        """Nomes a manter; `entries` vem ordenado do mais antigo para o mais recente"""
+        newest_first = list(reversed(entries))
+        keep = {entry['name'] for entry in newest_first[:self.keep_last]}
+
+        buckets = (
+            (self.hourly, lambda ts: ts.strftime('%Y%m%d%H')),
+            (self.daily, lambda ts: ts.strftime('%Y%m%d')),
+            (self.weekly, lambda ts: ts.strftime('%G%V')),
+        )
+        for limit, bucket_of in buckets:
+            seen = set()
+            for entry in newest_first:
+                if len(seen) >= limit:
+                    break
+                bucket = bucket_of(datetime.strptime(entry['timestamp'], TIMESTAMP_FORMAT))
+                if bucket not in seen:
+                    # O mais recente de cada período representa o período
+                    seen.add(bucket)
+                    keep.add(entry['name'])
+        return keep
+
+
+class BackupManifest:
+    """Índice dos backups em um pequeno arquivo JSON; o mais recente sai em O(1)"""
+
+    def __init__(self, directory: str, prefix: str = 'backup_', suffix: str = '.json'):
+        self.directory = directory
+        self.prefix = prefix
+        self.suffix = suffix
+        self.path = os.path.join(directory, MANIFEST_FILE)
+        self._lock = threading.Lock()
+        self.entries = self._load()
+
+    def _load(self) -> List[Dict]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)['entries']
+        except (OSError, ValueError, KeyError):
+            return self._scan()
+
+    def _scan(self) -> List[Dict]:
+        entries = []
+        for name in os.listdir(self.directory):
+            timestamp = parse_backup_name(name, self.prefix, self.suffix)
+            if timestamp is not None:
+                entries.append({'name': name, 'timestamp': timestamp.strftime(TIMESTAMP_FORMAT)})
+        entries.sort(key=lambda entry: entry['timestamp'])
+        return entries
+
+    def _write(self):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'entries': self.entries, 'updated_at': datetime.utcnow().isoformat()},
+                      f, separators=(',', ':'))
+        os.replace(tmp_path, self.path)
+
+    def add(self, name: str, timestamp: datetime):
+        with self._lock:
+            stamp = timestamp.strftime(TIMESTAMP_FORMAT)
+            out_of_order = bool(self.entries) and self.entries[-1]['timestamp'] > stamp
+            self.entries = [entry for entry in self.entries if entry['name'] != name]
+            self.entries.append({'name': name, 'timestamp': stamp})
+            if out_of_order:
+                self.entries.sort(key=lambda entry: entry['timestamp'])
+            self._write()
+
+    def remove(self, names: Iterable[str]):
+        names = set(names)
+        with self._lock:
+            self.entries = [entry for entry in self.entries if entry['name'] not in names]
+            self._write()
+
+    def latest(self) -> Optional[str]:
+        with self._lock:
+            return self.entries[-1]['name'] if self.entries else None
+
+    def rebuild(self):
+        """Reconstruir o índice a partir do diretório (arquivo perdido ou desatualizado)"""
+        with self._lock:
+            self.entries = self._scan()
+            self._write()
+
+    def snapshot(self) -> List[Dict]:
+        with self._lock:
+            return list(self.entries)
+
+
+class BackupRetentionEngine:
+    """Registra backups no manifesto e remove os excedentes em segundo plano"""
+
+    def __init__(self, directory: str, policy: RetentionPolicy = None, prefix: str = 'backup_',
+                 suffix: str = '.json'):
+        self.directory = directory
+        self.policy = policy or RetentionPolicy()
+        self.manifest = BackupManifest(directory, prefix, suffix)
+        self._prune_lock = threading.Lock()
+        self._worker_lock = threading.Lock()
+        self._prune_requested = False
+        self._worker = None
+
+    def register(self, name: str, timestamp: datetime):
+        self.manifest.add(name, timestamp)
+
+    def latest_path(self) -> Optional[str]:
+        name = self.manifest.latest()
+        if name is not None and not os.path.exists(os.path.join(self.directory, name)):
+            self.manifest.rebuild()
+            name = self.manifest.latest()
+        return os.path.join(self.directory, name) if name else None
+
+    def prune(self) -> int:
+        """Aplicar a política e apagar os backups descartados"""
+        with self._prune_lock:
+            entries = self.manifest.snapshot()
+            keep = self.policy.select(entries)
+            doomed = [entry['name'] for entry in entries if entry['name'] not in keep]
+            for name in doomed:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    print(f"✗ Erro ao remover backup antigo {name}: {e}")
+            if doomed:
+                self.manifest.remove(doomed)
+            return len(doomed)
+
+    def prune_async(self):
+        """Agendar uma limpeza; pedidos simultâneos são agrupados em uma única execução"""
+        with self._worker_lock:
+            self._prune_requested = True
+            if self._worker is not None:
+                return
+            self._worker = threading.Thread(target=self._run_worker, name='gtex-backup-retention', daemon=True)
+            self._worker.start()
+
+    def _run_worker(self):
+        while True:
+            with self._worker_lock:
+                if not self._prune_requested:
+                    self._worker = None
+                    return
+                self._prune_requested = False
+            try:
+                self.prune()
+            except Exception as e:
+                print(f"✗ Erro na limpeza de backups: {e}")
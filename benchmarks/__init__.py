@@ -0,0 +1,4 @@
+"""Benchmarks reproduzíveis do Gtex.
+
+Uso: python -m benchmarks --texts 2000 --baseline benchmarks/baseline.json
+"""
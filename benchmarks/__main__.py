@@ -0,0 +1,106 @@
+import argparse
+import json
+import platform
+import sys
+import tempfile
+from datetime import datetime
+
+from benchmarks.generator import DatasetSpec, generate_dataset
+from benchmarks.harness import DEFAULT_THRESHOLDS, compare, quiet, run_scenario
+from benchmarks.scenarios import GROUPS
+
+
+def _range(value: str):
+    low, _, high = value.partition('-')
+    return int(low), int(high or low)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='Benchmarks do Gtex')
+    parser.add_argument('--texts', type=int, default=1000)
+    parser.add_argument('--tags', type=int, default=50)
+    parser.add_argument('--content-median', type=int, default=400, help='mediana do tamanho do conteúdo')
+    parser.add_argument('--content-sigma', type=float, default=0.8, help='dispersão (log-normal) do tamanho')
+    parser.add_argument('--tags-per-text', type=_range, default=(0, 5), help='faixa, ex.: 0-5')
+    parser.add_argument('--tag-skew', type=float, default=1.1, help='expoente de Zipf da popularidade')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--iterations', type=int, default=30)
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--groups', default=','.join(GROUPS), help='grupos de cenários: ' + ', '.join(GROUPS))
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--baseline', help='resultado anterior para comparação')
+    parser.add_argument('--threshold', action='append', default=[], metavar='METRICA=FRACAO',
+                        help='limite de regressão, ex.: p95_ms=0.1 (padrão: %s)' % DEFAULT_THRESHOLDS)
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    spec = DatasetSpec(args.texts, args.tags, args.content_median, args.content_sigma,
+                       tags_per_text=args.tags_per_text, tag_skew=args.tag_skew, seed=args.seed)
+    texts, tags = generate_dataset(spec)
+    print(f"Conjunto sintético: {len(texts)} textos, {len(tags)} etiquetas (semente {spec.seed})")
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='gtex-bench-') as workdir:
+        for group in args.groups.split(','):
+            group = group.strip()
+            try:
+                with quiet():
+                    scenarios, teardown = GROUPS[group](texts, tags, workdir, spec.seed)
+            except Exception as e:
+                print(f"✗ Grupo {group} indisponível: {e}")
+                results[group] = {'error': f'{type(e).__name__}: {e}'}
+                continue
+
+            try:
+                for scenario in scenarios:
+                    result = run_scenario(scenario, args.iterations, args.warmup)
+                    results[scenario.name] = result
+                    if 'error' in result:
+                        print(f"✗ {scenario.name}: {result['error']}")
+                    else:
+                        print(f"  {scenario.name:<40} {result['ops_per_sec']:>9.1f} op/s  "
+                              f"p50 {result['p50_ms']:>8.2f} ms  p95 {result['p95_ms']:>8.2f} ms  "
+                              f"p99 {result['p99_ms']:>8.2f} ms  pico {result['peak_memory_kb']:>9.0f} KiB")
+            finally:
+                with quiet():
+                    teardown()
+
+    report = {
+        'meta': {
+            'timestamp': datetime.utcnow().isoformat(),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'spec': spec.to_dict(),
+            'iterations': args.iterations
+        },
+        'scenarios': results
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"✓ Resultados salvos em {args.output}")
+
+    if not args.baseline:
+        return 0
+
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    if baseline.get('meta', {}).get('spec') != report['meta']['spec']:
+        print("⚠ O baseline foi gerado com outro conjunto de dados; a comparação pode não ser justa")
+
+    thresholds = {}
+    for item in args.threshold:
+        metric, _, value = item.partition('=')
+        thresholds[metric] = float(value)
+    regressions = compare(results, baseline.get('scenarios', {}), thresholds)
+    for regression in regressions:
+        print(f"✗ Regressão em {regression['scenario']} / {regression['metric']}: "
+              f"{regression['baseline']:.2f} -> {regression['current']:.2f} ({regression['change']:+.0%})")
+    if not regressions:
+        print("✓ Nenhuma regressão em relação ao baseline")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,114 @@
+import math
+import random
+import sqlite3
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+
+_SYLLABLES = ('ba', 'ca', 'da', 'fe', 'ga', 'li', 'ma', 'ne', 'po', 'ra', 'sa', 'te', 'vi', 'xo', 'zu',
+              'lu', 'mo', 'ri', 'so', 'ta', 'ce', 'di', 'pe', 'qui', 'nho', 'ção', 'ões', 'ém')
+
+
+class DatasetSpec:
+    """Parâmetros do conjunto sintético; a mesma semente gera sempre os mesmos dados"""
+
+    def __init__(self, texts: int = 1000, tags: int = 50, content_median: int = 400,
+                 content_sigma: float = 0.8, content_max: int = 20000,
+                 tags_per_text: Tuple[int, int] = (0, 5), tag_skew: float = 1.1, seed: int = 42):
+        self.texts = texts
+        self.tags = tags
+        # Tamanho do conteúdo segue uma log-normal: muitos textos curtos, alguns longos
+        self.content_median = content_median
+        self.content_sigma = content_sigma
+        self.content_max = content_max
+        self.tags_per_text = tags_per_text
+        # Popularidade das etiquetas segue Zipf: poucas etiquetas em muitos textos
+        self.tag_skew = tag_skew
+        self.seed = seed
+
+    def to_dict(self) -> Dict:
+        return {
+            'texts': self.texts,
+            'tags': self.tags,
+            'content_median': self.content_median,
+            'content_sigma': self.content_sigma,
+            'content_max': self.content_max,
+            'tags_per_text': list(self.tags_per_text),
+            'tag_skew': self.tag_skew,
+            'seed': self.seed
+        }
+
+
+def _vocabulary(rng: random.Random, size: int = 2000) -> List[str]:
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rng.choice(_SYLLABLES) for _ in range(rng.randint(1, 4))))
+    return sorted(words)
+
+
+def _content(rng: random.Random, vocabulary: List[str], length: int) -> str:
+    words = []
+    size = 0
+    while size < length:
+        word = rng.choice(vocabulary)
+        words.append(word)
+        size += len(word) + 1
+    return ' '.join(words)[:length]
+
+
+def generate_dataset(spec: DatasetSpec) -> Tuple[List[Dict], List[Dict]]:
+    """Gerar (textos, etiquetas) no formato de dicionários dos gerenciadores"""
+    rng = random.Random(spec.seed)
+    vocabulary = _vocabulary(rng)
+
+    tags = [{
+        'id': i + 1,
+        'name': f'tag-{i + 1:04d}',
+        'color': '#{:06x}'.format(rng.randrange(0x1000000))
+    } for i in range(spec.tags)]
+    weights = [1.0 / (rank + 1) ** spec.tag_skew for rank in range(spec.tags)]
+
+    base_time = datetime(2025, 1, 1)
+    low, high = spec.tags_per_text
+    texts = []
+    for i in range(spec.texts):
+        length = int(min(spec.content_max, max(1, rng.lognormvariate(math.log(spec.content_median),
+                                                                       spec.content_sigma))))
+        wanted = min(rng.randint(low, high), spec.tags)
+        chosen = set()
+        while len(chosen) < wanted:
+            chosen.add(rng.choices(range(spec.tags), weights)[0])
+        timestamp = (base_time + timedelta(seconds=i * 37)).isoformat()
+        texts.append({
+            'id': i + 1,
+            'title': ' '.join(rng.choice(vocabulary) for _ in range(rng.randint(2, 6))).capitalize(),
+            'content': _content(rng, vocabulary, length),
+            'tags': [tags[position]['name'] for position in sorted(chosen)],
+            'created_at': timestamp,
+            'updated_at': timestamp
+        })
+    return texts, tags
+
+
+def populate_sqlite(db_path: str, texts: List[Dict], tags: List[Dict]) -> Tuple[int, int]:
+    """Carregar o conjunto em um banco com o esquema do app.py (tabelas já criadas).
+
+    Os ids sintéticos são deslocados para depois dos registros existentes
+    (dados iniciais do app); devolve os deslocamentos (textos, etiquetas).
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        text_offset = conn.execute('SELECT COALESCE(MAX(id), 0) FROM texts').fetchone()[0]
+        tag_offset = conn.execute('SELECT COALESCE(MAX(id), 0) FROM tags').fetchone()[0]
+        tag_ids = {tag['name']: tag['id'] + tag_offset for tag in tags}
+        conn.executemany('INSERT INTO tags (id, name, color) VALUES (?, ?, ?)',
+                         [(tag_ids[tag['name']], tag['name'], tag['color']) for tag in tags])
+        conn.executemany(
+            'INSERT INTO texts (id, title, content, created_at, updated_at) VALUES (?, ?, ?, ?, ?)',
+            [(t['id'] + text_offset, t['title'], t['content'], t['created_at'].replace('T', ' '),
+              t['updated_at'].replace('T', ' ')) for t in texts])
+        conn.executemany('INSERT INTO text_tags (text_id, tag_id) VALUES (?, ?)',
+                         [(t['id'] + text_offset, tag_ids[name]) for t in texts for name in t['tags']])
+        conn.commit()
+    finally:
+        conn.close()
+    return text_offset, tag_offset
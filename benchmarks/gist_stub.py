@@ -0,0 +1,152 @@
+import gzip
+import json
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+
+class GistStub:
+    """API de Gists mínima em 127.0.0.1, para medir e conferir os backups sem rede.
+
+    Guarda os Gists em memória e registra cada requisição em `log` como
+    (método, caminho, Content-Encoding). `fail()` agenda respostas de erro
+    para as próximas requisições de um método; com `after_apply` a operação
+    é aplicada antes do erro, como um servidor que processou o pedido e
+    perdeu a resposta. Com `reject_gzip` corpos comprimidos recebem 400.
+    """
+
+    def __init__(self):
+        self.gists: Dict[str, Dict[str, str]] = {}
+        self.log: List[Tuple[str, str, Optional[str]]] = []
+        self.reject_gzip = False
+        self._faults: List[Tuple[str, int, bool]] = []
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self.server.daemon_threads = True
+        self._thread = threading.Thread(target=self.server.serve_forever, name='gtex-gist-stub', daemon=True)
+        self._thread.start()
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self.server.server_address[1]}'
+
+    def fail(self, method: str, status: int, times: int = 1, after_apply: bool = False):
+        with self._lock:
+            self._faults.extend([(method, status, after_apply)] * times)
+
+    def requests(self, method: str) -> int:
+        with self._lock:
+            return sum(1 for logged, _, _ in self.log if logged == method)
+
+    def reset_log(self):
+        with self._lock:
+            self.log.clear()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    # Operações
+
+    def _take_fault(self, method: str) -> Optional[Tuple[int, bool]]:
+        with self._lock:
+            for position, (fault_method, status, after_apply) in enumerate(self._faults):
+                if fault_method == method:
+                    del self._faults[position]
+                    return status, after_apply
+        return None
+
+    def _gist_json(self, gist_id: str) -> Dict:
+        files = self.gists[gist_id]
+        return {
+            'id': gist_id,
+            'html_url': f'{self.url}/gists/{gist_id}',
+            'files': {name: {'filename': name, 'content': content, 'truncated': False,
+                             'raw_url': f'{self.url}/raw/{gist_id}/{name}'}
+                      for name, content in files.items()}
+        }
+
+    def _apply(self, method: str, path: str, payload) -> Tuple[int, Dict]:
+        parts = path.strip('/').split('/')
+        with self._lock:
+            if method == 'POST' and parts == ['gists']:
+                if not isinstance(payload, dict) or not isinstance(payload.get('files'), dict):
+                    return 400, {'message': 'Invalid request'}
+                gist_id = uuid.uuid4().hex
+                self.gists[gist_id] = {name: item['content'] for name, item in payload['files'].items()
+                                       if item is not None}
+                return 201, self._gist_json(gist_id)
+
+            if len(parts) != 2 or parts[0] != 'gists' or parts[1] not in self.gists:
+                return 404, {'message': 'Not Found'}
+            gist_id = parts[1]
+            if method == 'GET':
+                return 200, self._gist_json(gist_id)
+            if method == 'PATCH':
+                if not isinstance(payload, dict) or not isinstance(payload.get('files'), dict):
+                    return 400, {'message': 'Invalid request'}
+                files = self.gists[gist_id]
+                for name, item in payload['files'].items():
+                    if item is None:
+                        files.pop(name, None)
+                    else:
+                        files[name] = item['content']
+                return 200, self._gist_json(gist_id)
+            return 405, {'message': 'Method Not Allowed'}
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def _respond(self, status: int, data: Dict):
+                body = json.dumps(data).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _handle(self):
+                encoding = self.headers.get('Content-Encoding')
+                with stub._lock:
+                    stub.log.append((self.command, self.path, encoding))
+                body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+
+                if encoding == 'gzip':
+                    if stub.reject_gzip:
+                        return self._respond(400, {'message': 'Problems parsing JSON'})
+                    body = gzip.decompress(body)
+                try:
+                    payload = json.loads(body) if body else None
+                except ValueError:
+                    return self._respond(400, {'message': 'Problems parsing JSON'})
+
+                if self.command == 'GET' and self.path.startswith('/raw/'):
+                    _, _, gist_id, name = self.path.split('/', 3)
+                    content = stub.gists.get(gist_id, {}).get(name)
+                    if content is None:
+                        return self._respond(404, {'message': 'Not Found'})
+                    data = content.encode('utf-8')
+                    self.send_response(200)
+                    self.send_header('Content-Length', str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                    return None
+
+                fault = stub._take_fault(self.command)
+                if fault is not None and not fault[1]:
+                    return self._respond(fault[0], {'message': 'Injected failure'})
+                status, data = stub._apply(self.command, self.path, payload)
+                if fault is not None:
+                    return self._respond(fault[0], {'message': 'Injected failure'})
+                return self._respond(status, data)
+
+            do_GET = do_POST = do_PATCH = _handle
+
+        return Handler
@@ -0,0 +1,114 @@
+import contextlib
+import gc
+import os
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+# Variação máxima tolerada em relação ao baseline antes de acusar regressão
+DEFAULT_THRESHOLDS = {
+    'p50_ms': 0.20,
+    'p95_ms': 0.30,
+    'p99_ms': 0.50,
+    'ops_per_sec': 0.20,
+    'peak_memory_kb': 0.25
+}
+# Métricas em que um valor maior é melhor
+HIGHER_IS_BETTER = {'ops_per_sec'}
+
+
+class Scenario:
+    """Uma operação medida repetidamente"""
+
+    def __init__(self, name: str, fn: Callable[[], object], iterations: Optional[int] = None,
+                 memory_iterations: int = 3):
+        self.name = name
+        self.fn = fn
+        self.iterations = iterations
+        self.memory_iterations = memory_iterations
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Percentil com interpolação linear sobre valores já ordenados"""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * q
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+@contextlib.contextmanager
+def quiet():
+    """Descartar os prints dos gerenciadores durante a medição"""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def run_scenario(scenario: Scenario, iterations: int = 30, warmup: int = 3) -> Dict:
+    """Medir latência e vazão (sem tracemalloc) e, em passada separada, o pico de memória"""
+    iterations = scenario.iterations or iterations
+    try:
+        with quiet():
+            for _ in range(warmup):
+                scenario.fn()
+
+            latencies = []
+            gc.collect()
+            started = time.perf_counter()
+            for _ in range(iterations):
+                call_started = time.perf_counter()
+                scenario.fn()
+                latencies.append(time.perf_counter() - call_started)
+            elapsed = time.perf_counter() - started
+
+            # tracemalloc deixa as chamadas mais lentas: por isso a passada é separada
+            gc.collect()
+            tracemalloc.start()
+            try:
+                for _ in range(scenario.memory_iterations):
+                    scenario.fn()
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+    except Exception as e:
+        return {'error': f'{type(e).__name__}: {e}'}
+
+    latencies.sort()
+    return {
+        'iterations': iterations,
+        'ops_per_sec': iterations / elapsed if elapsed else 0.0,
+        'mean_ms': sum(latencies) / len(latencies) * 1000,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'max_ms': latencies[-1] * 1000,
+        'peak_memory_kb': peak / 1024
+    }
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict],
+            thresholds: Optional[Dict[str, float]] = None) -> List[Dict]:
+    """Listar as métricas que pioraram além do limite em relação ao baseline"""
+    thresholds = dict(DEFAULT_THRESHOLDS, **(thresholds or {}))
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous or 'error' in current or 'error' in previous:
+            continue
+        for metric, limit in thresholds.items():
+            before, after = previous.get(metric), current.get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            worse = -change if metric in HIGHER_IS_BETTER else change
+            if worse > limit:
+                regressions.append({
+                    'scenario': name,
+                    'metric': metric,
+                    'baseline': before,
+                    'current': after,
+                    'change': change,
+                    'threshold': limit
+                })
+    return regressions
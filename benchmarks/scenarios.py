@@ -0,0 +1,261 @@
+import importlib
+import os
+import random
+from typing import Callable, Dict, List, Tuple
+
+from benchmarks.generator import populate_sqlite
+from benchmarks.harness import Scenario
+
+ScenarioGroup = Tuple[List[Scenario], Callable[[], None]]
+
+
+def _checked(client, method: str, url: str, **kwargs):
+    response = client.open(url, method=method, **kwargs)
+    if response.status_code >= 400:
+        raise RuntimeError(f'{method} {url} -> {response.status_code}')
+    return response
+
+
+def _http_scenarios(prefix: str, client, texts: List[Dict], tag_ids: List[int], seed: int) -> List[Scenario]:
+    rng = random.Random(seed)
+    words = [word for text in texts[:200] for word in text['title'].split()] or ['texto']
+
+    def create_and_delete():
+        created = _checked(client, 'POST', '/api/texts', json={
+            'title': 'Benchmark', 'content': 'conteúdo de teste ' * 20, 'tag_ids': tag_ids[:2]
+        }).get_json()
+        _checked(client, 'DELETE', f"/api/texts/{created['id']}")
+
+    def update():
+        text = rng.choice(texts)
+        _checked(client, 'PUT', f"/api/texts/{text['id']}", json={'title': text['title']})
+
+    return [
+        Scenario(f'{prefix}.GET /api/texts', lambda: _checked(client, 'GET', '/api/texts'), iterations=10),
+        Scenario(f'{prefix}.GET /api/texts/<id>',
+                 lambda: _checked(client, 'GET', f"/api/texts/{rng.choice(texts)['id']}")),
+        Scenario(f'{prefix}.GET /api/tags', lambda: _checked(client, 'GET', '/api/tags')),
+        Scenario(f'{prefix}.GET /api/search?q=',
+                 lambda: _checked(client, 'GET', '/api/search', query_string={'q': rng.choice(words)})),
+        Scenario(f'{prefix}.GET /api/search?tag_id=',
+                 lambda: _checked(client, 'GET', '/api/search', query_string={'tag_id': rng.choice(tag_ids)})),
+        Scenario(f'{prefix}.PUT /api/texts/<id>', update),
+        Scenario(f'{prefix}.POST+DELETE /api/texts', create_and_delete),
+    ]
+
+
+def app_scenarios(texts: List[Dict], tags: List[Dict], workdir: str, seed: int = 42) -> ScenarioGroup:
+    """Rotas do app.py (SQLite puro) pelo cliente de testes do Flask"""
+    sqlite_app = importlib.import_module('app')
+    sqlite_app.DATABASE = os.path.join(workdir, 'app.db')
+    sqlite_app.init_db()
+    text_offset, tag_offset = populate_sqlite(sqlite_app.DATABASE, texts, tags)
+
+    shifted = [dict(text, id=text['id'] + text_offset) for text in texts]
+    client = sqlite_app.app.test_client()
+    scenarios = _http_scenarios('app', client, shifted, [tag['id'] + tag_offset for tag in tags], seed)
+
+    rng = random.Random(seed)
+    prefixes = [word[:length] for text in texts[:200] for word in text['title'].split() for length in (1, 3)]
+    scenarios.append(Scenario('app.GET /api/suggest?prefix=', lambda: _checked(
+        client, 'GET', '/api/suggest', query_string={'prefix': rng.choice(prefixes or ['a'])})))
+    return scenarios, lambda: None
+
+
+def main_scenarios(texts: List[Dict], tags: List[Dict], workdir: str, seed: int = 42) -> ScenarioGroup:
+    """Blueprint e rotas do main.py, com banco e backups isolados em `workdir`"""
+    os.environ['GTEX_DATA_DIR'] = os.path.join(workdir, 'main')
+    main = importlib.import_module('src.main')
+    from src.models.text import Tag, Text, db, text_tags
+
+    with main.app.app_context():
+        # main.py cria etiquetas e textos iniciais; os ids sintéticos vêm depois deles
+        tag_offset = db.session.query(db.func.max(Tag.id)).scalar() or 0
+        text_offset = db.session.query(db.func.max(Text.id)).scalar() or 0
+        tag_ids = {tag['name']: tag['id'] + tag_offset for tag in tags}
+        db.session.execute(Tag.__table__.insert(), [
+            {'id': tag_ids[tag['name']], 'name': tag['name'], 'color': tag['color']} for tag in tags])
+        db.session.execute(Text.__table__.insert(), [{
+            'id': text['id'] + text_offset, 'title': text['title'], 'content': text['content']
+        } for text in texts])
+        links = [{'text_id': text['id'] + text_offset, 'tag_id': tag_ids[name]}
+                 for text in texts for name in text['tags']]
+        if links:
+            db.session.execute(text_tags.insert(), links)
+        db.session.commit()
+
+    shifted = [dict(text, id=text['id'] + text_offset) for text in texts]
+    client = main.app.test_client()
+    scenarios = _http_scenarios('main', client, shifted, list(tag_ids.values()), seed)
+    scenarios.append(Scenario('main.GET /api/backup/stream',
+                              lambda: _checked(client, 'GET', '/api/backup/stream').get_data(), iterations=5))
+
+    def teardown():
+        autosaver = getattr(main.app, 'autosaver', None)
+        if autosaver is not None:
+            autosaver.flush()
+
+    return scenarios, teardown
+
+
+def manager_scenarios(texts: List[Dict], tags: List[Dict], workdir: str, seed: int = 42) -> ScenarioGroup:
+    """save_data/load_data de cada gerenciador, com dados inalterados e com 1% alterado"""
+    from src.utils.cloud_manager import HybridDataManager
+    from src.utils.data_manager import PersistentDataManager
+    from src.utils.ultimate_manager import LocalPostgreSQLManager, UltimateDataManager
+
+    rng = random.Random(seed)
+    tag_dicts = [{'id': tag['id'], 'name': tag['name'], 'color': tag['color']} for tag in tags]
+
+    def mutated():
+        # Cópia rasa com ~1% dos títulos alterados: exercita o caminho incremental
+        changed = list(texts)
+        for position in rng.sample(range(len(changed)), max(1, len(changed) // 100)):
+            changed[position] = dict(changed[position], title=f"{changed[position]['title']} {rng.random():.6f}")
+        return changed
+
+    local = LocalPostgreSQLManager(os.path.join(workdir, 'managers', 'local.db'))
+    local.init_database()
+    persistent = PersistentDataManager(os.path.join(workdir, 'managers', 'persistent'))
+    hybrid = HybridDataManager(os.path.join(workdir, 'managers', 'hybrid'))
+    ultimate = UltimateDataManager(os.path.join(workdir, 'managers', 'ultimate', 'ultimate.db'))
+
+    scenarios = []
+    for name, save, load in (
+        ('local', local.save_data, local.load_data),
+        ('persistent', persistent.backup_data, persistent.restore_data),
+        ('hybrid', hybrid.save_data, hybrid.load_data),
+        ('ultimate', ultimate.save_data, ultimate.load_data),
+    ):
+        save(texts, tag_dicts)
+        scenarios.extend([
+            Scenario(f'{name}.{save.__name__} (sem mudanças)', lambda save=save: save(texts, tag_dicts),
+                     iterations=5),
+            Scenario(f'{name}.{save.__name__} (1% alterado)', lambda save=save: save(mutated(), tag_dicts),
+                     iterations=5),
+            Scenario(f'{name}.{load.__name__}', load, iterations=5),
+        ])
+    scenarios.append(Scenario('local.load_compact', local.load_compact, iterations=5))
+    scenarios.append(Scenario('ultimate.load_compact', ultimate.load_compact, iterations=5))
+
+    return scenarios, ultimate.close
+
+
+def _check(condition: bool, message: str):
+    if not condition:
+        raise RuntimeError(message)
+
+
+def check_transport(stub) -> None:
+    """Retentativas e fallback de gzip do CloudTransport contra o servidor local"""
+    from src.utils.http_transport import CloudTransport
+
+    transport = CloudTransport(max_retries=2, backoff_base=0.001)
+    host = stub.url.split('//', 1)[1]
+    files = {'gtex_check.json': {'content': 'x' * 4096}}
+    try:
+        # POST aplicado pelo servidor mas respondido com 502: repetir criaria um Gist duplicado
+        stub.reset_log()
+        before = len(stub.gists)
+        stub.fail('POST', 502, after_apply=True)
+        response = transport.post(f'{stub.url}/gists', {'files': files})
+        _check(response.status_code == 502 and stub.requests('POST') == 1 and len(stub.gists) == before + 1,
+               'POST repetido após 502')
+
+        # PATCH (idempotent=True) recusado com 503: repetido até dar certo
+        gist_id = transport.post(f'{stub.url}/gists', {'files': files}).json()['id']
+        stub.reset_log()
+        stub.fail('PATCH', 503)
+        response = transport.patch(f'{stub.url}/gists/{gist_id}', {'files': files}, idempotent=True)
+        _check(response.status_code == 200 and stub.requests('PATCH') == 2, 'PATCH não repetido após 503')
+
+        # 400 de validação em corpo gzip: um reenvio sem gzip, e o host continua recebendo gzip
+        stub.reset_log()
+        response = transport.post(f'{stub.url}/gists', {'files': 'inválido', 'pad': 'x' * 4096})
+        _check(response.status_code == 400 and [entry[2] for entry in stub.log] == ['gzip', None],
+               'reenvio sem gzip após 400 de validação')
+        _check(host not in transport._no_gzip_hosts, '400 de validação desligou o gzip do host')
+
+        # Servidor que não aceita gzip: o reenvio sem compressão passa e o host é lembrado
+        stub.reject_gzip = True
+        response = transport.post(f'{stub.url}/gists', {'files': files})
+        _check(response.status_code == 201 and host in transport._no_gzip_hosts, 'fallback sem gzip')
+        stub.reset_log()
+        transport.patch(f'{stub.url}/gists/{gist_id}', {'files': files}, idempotent=True)
+        _check([entry[2] for entry in stub.log] == [None], 'host sem gzip recebeu corpo comprimido')
+    finally:
+        stub.reject_gzip = False
+        transport.close()
+
+
+def check_stale_shards(stub, workdir: str) -> None:
+    """Sem o estado local, o save num Gist existente ainda remove os shards que deixaram de existir"""
+    from src.utils.github_backup import GitHubBackupManager
+    from src.utils.http_transport import CloudTransport
+
+    items = [{'id': item_id, 'title': f'Texto {item_id}'} for item_id in range(30)]
+    first = GitHubBackupManager(api_url=stub.url, state_file=os.path.join(workdir, 'stale_a.json'), shard_size=10)
+    second = GitHubBackupManager(api_url=stub.url, state_file=os.path.join(workdir, 'stale_b.json'), shard_size=10)
+    first.transport = second.transport = CloudTransport(backoff_base=0.001)
+    try:
+        gist_id = first.save_to_github({'texts': items})['gist_id']
+        stub.gists[gist_id]['notas.txt'] = 'arquivo do usuário'
+        result = second.save_to_github({'texts': items[:10]}, gist_id=gist_id)
+        _check(result['success'], f"save_to_github: {result.get('error')}")
+        _check(sorted(stub.gists[gist_id]) == ['gtex_manifest.json', 'gtex_meta.json', 'gtex_texts_000000.json',
+                                               'notas.txt'],
+               f'shards antigos no Gist: {sorted(stub.gists[gist_id])}')
+        _check(second.load_from_github(gist_id)['data']['texts'] == items[:10], 'backup remontado difere')
+    finally:
+        first.transport.close()
+
+
+def backup_scenarios(texts: List[Dict], tags: List[Dict], workdir: str, seed: int = 42) -> ScenarioGroup:
+    """Backup em Gist (shards e PATCH diferencial) contra uma API de Gists local"""
+    from benchmarks.gist_stub import GistStub
+    from src.utils.github_backup import GitHubBackupManager
+    from src.utils.http_transport import CloudTransport
+
+    rng = random.Random(seed)
+    stub = GistStub()
+    check_transport(stub)
+    check_stale_shards(stub, workdir)
+
+    manager = GitHubBackupManager(api_url=stub.url, state_file=os.path.join(workdir, 'gist_state.json'))
+    manager.transport = CloudTransport(backoff_base=0.001)
+    data = {'texts': texts, 'tags': [{'id': tag['id'], 'name': tag['name'], 'color': tag['color']}
+                                     for tag in tags]}
+
+    def save(payload):
+        result = manager.save_to_github(payload)
+        _check(result['success'], f"save_to_github: {result.get('error')}")
+
+    def mutated():
+        changed = list(texts)
+        for position in rng.sample(range(len(changed)), max(1, len(changed) // 100)):
+            changed[position] = dict(changed[position], title=f"{changed[position]['title']} {rng.random():.6f}")
+        return dict(data, texts=changed)
+
+    def load():
+        result = manager.load_from_github(manager.gist_id)
+        _check(result['success'], f"load_from_github: {result.get('error')}")
+
+    save(data)
+
+    def teardown():
+        manager.transport.close()
+        stub.close()
+
+    return [
+        Scenario('backup.save_to_github (sem mudanças)', lambda: save(data), iterations=5),
+        Scenario('backup.save_to_github (1% alterado)', lambda: save(mutated()), iterations=5),
+        Scenario('backup.load_from_github', load, iterations=5),
+    ], teardown
+
+
+GROUPS = {
+    'app': app_scenarios,
+    'main': main_scenarios,
+    'managers': manager_scenarios,
+    'backup': backup_scenarios,
+}
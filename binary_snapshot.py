@@ -0,0 +1,244 @@
+import gc
+import json
+import mmap
+import os
+import struct
+import zlib
+from collections.abc import Sequence
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+# Layout do arquivo:
+#   cabeçalho | bloco... | índice (JSON) | rodapé
+# Cada bloco guarda até `block_size` registros comprimidos com zlib, com
+# tamanho e CRC32 no próprio cabeçalho do bloco. O rodapé aponta para o
+# índice, que lista os blocos de cada seção; assim a leitura só decodifica
+# os blocos que forem de fato acessados. Os registros vão em JSON: o formato
+# do marshal muda entre versões do Python e o snapshot precisa sobreviver a
+# uma atualização do interpretador.
+MAGIC = b'GTXSNAP\x00'
+END_MAGIC = b'GTXEND\x00\x00'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('>8sHH')
+BLOCK_HEADER = struct.Struct('>cII')
+FOOTER = struct.Struct('>QII8s')
+
+CODEC_JSON = b'j'
+DEFAULT_BLOCK_SIZE = 1000
+
+
+class SnapshotFormatError(Exception):
+    """Arquivo de snapshot truncado, corrompido ou de versão desconhecida"""
+
+
+def _encode_block(records: List[Any], level: int) -> bytes:
+    payload = json.dumps(records, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8')
+    compressed = zlib.compress(payload, level)
+    return BLOCK_HEADER.pack(CODEC_JSON, len(compressed), zlib.crc32(compressed)) + compressed
+
+
+def _decode_block(codec: bytes, payload: bytes) -> List[Any]:
+    if codec != CODEC_JSON:
+        raise SnapshotFormatError(f"codec de bloco desconhecido: {codec!r}")
+    return json.loads(zlib.decompress(payload).decode('utf-8'))
+
+
+def _fsync_directory(directory: str):
+    if hasattr(os, 'O_DIRECTORY'):
+        fd = os.open(directory or '.', os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def write_snapshot(path: str, sections: Dict[str, Iterable[Any]], meta: Optional[Dict] = None,
+                   block_size: int = DEFAULT_BLOCK_SIZE, level: int = 1) -> Dict[str, int]:
+    """Gravar as seções em um snapshot binário de forma atômica.
+
+    O arquivo é escrito ao lado do destino, sincronizado com fsync e só
+    então renomeado; um leitor nunca vê um snapshot pela metade. As seções
+    podem ser iteradores. Devolve a quantidade de registros por seção.
+    """
+    tmp_path = path + '.tmp'
+    index = {
+        'created_at': datetime.utcnow().isoformat(),
+        'meta': meta or {},
+        'sections': {}
+    }
+    counts = {}
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, FORMAT_VERSION, 0))
+            for name, records in sections.items():
+                blocks = []
+                count = 0
+                batch = []
+
+                def flush_batch():
+                    blocks.append([f.tell(), len(batch)])
+                    f.write(_encode_block(batch, level))
+
+                for record in records:
+                    batch.append(record)
+                    if len(batch) >= block_size:
+                        flush_batch()
+                        count += len(batch)
+                        batch = []
+                if batch:
+                    flush_batch()
+                    count += len(batch)
+                index['sections'][name] = {'count': count, 'blocks': blocks}
+                counts[name] = count
+
+            index_offset = f.tell()
+            index_bytes = json.dumps(index, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+            f.write(index_bytes)
+            f.write(FOOTER.pack(index_offset, len(index_bytes), zlib.crc32(index_bytes), END_MAGIC))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    _fsync_directory(os.path.dirname(path))
+    return counts
+
+
+class LazySection(Sequence):
+    """Registros de uma seção, decodificados bloco a bloco sob demanda"""
+
+    def __init__(self, reader: 'SnapshotReader', name: str, info: Dict):
+        self._reader = reader
+        self.name = name
+        self._count = info['count']
+        self._blocks = info['blocks']
+        # Índice do primeiro registro de cada bloco, para busca binária
+        self._starts = []
+        position = 0
+        for _, block_count in self._blocks:
+            self._starts.append(position)
+            position += block_count
+        self._cached_block = None
+        self._cached_records = None
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _block(self, number: int) -> List[Any]:
+        if self._cached_block != number:
+            self._cached_records = self._reader.read_block(self._blocks[number][0])
+            self._cached_block = number
+        return self._cached_records
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+        low, high = 0, len(self._starts) - 1
+        while low < high:
+            middle = (low + high + 1) // 2
+            if self._starts[middle] <= index:
+                low = middle
+            else:
+                high = middle - 1
+        return self._block(low)[index - self._starts[low]]
+
+    def __iter__(self) -> Iterator[Any]:
+        for offset, _ in self._blocks:
+            yield from self._reader.read_block(offset)
+
+
+class SnapshotReader:
+    """Leitor de snapshot via mmap: valida cabeçalho e índice ao abrir e
+    só descomprime os blocos acessados (cada um conferido pelo CRC32)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            size = os.fstat(self._file.fileno()).st_size
+            if size < HEADER.size + FOOTER.size:
+                raise SnapshotFormatError(f"snapshot truncado: {path}")
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except BaseException:
+            self._file.close()
+            raise
+
+        try:
+            magic, version, _ = HEADER.unpack_from(self._map, 0)
+            if magic != MAGIC:
+                raise SnapshotFormatError(f"não é um snapshot GTEX: {path}")
+            if version > FORMAT_VERSION:
+                raise SnapshotFormatError(f"versão de snapshot não suportada: {version}")
+            self.version = version
+
+            index_offset, index_length, index_crc, end_magic = FOOTER.unpack_from(self._map, size - FOOTER.size)
+            if end_magic != END_MAGIC or index_offset + index_length != size - FOOTER.size:
+                raise SnapshotFormatError(f"snapshot truncado: {path}")
+            index_bytes = self._map[index_offset:index_offset + index_length]
+            if zlib.crc32(index_bytes) != index_crc:
+                raise SnapshotFormatError(f"índice corrompido: {path}")
+            self._data_end = index_offset
+        except BaseException:
+            self.close()
+            raise
+
+        index = json.loads(index_bytes.decode('utf-8'))
+        self.created_at = index['created_at']
+        self.meta = index['meta']
+        self.sections = {name: LazySection(self, name, info) for name, info in index['sections'].items()}
+
+    def read_block(self, offset: int) -> List[Any]:
+        if offset + BLOCK_HEADER.size > self._data_end:
+            raise SnapshotFormatError(f"bloco fora do arquivo: {offset}")
+        codec, length, checksum = BLOCK_HEADER.unpack_from(self._map, offset)
+        start = offset + BLOCK_HEADER.size
+        if start + length > self._data_end:
+            raise SnapshotFormatError(f"bloco truncado: {offset}")
+        payload = self._map[start:start + length]
+        if zlib.crc32(payload) != checksum:
+            raise SnapshotFormatError(f"checksum inválido no bloco {offset}")
+        return _decode_block(codec, payload)
+
+    def section(self, name: str) -> LazySection:
+        return self.sections[name]
+
+    def verify(self) -> bool:
+        """Conferir o CRC de todos os blocos sem decodificar os registros"""
+        for section in self.sections.values():
+            for offset, _ in section._blocks:
+                codec, length, checksum = BLOCK_HEADER.unpack_from(self._map, offset)
+                start = offset + BLOCK_HEADER.size
+                if start + length > self._data_end or zlib.crc32(self._map[start:start + length]) != checksum:
+                    return False
+        return True
+
+    def close(self):
+        if getattr(self, '_map', None) is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_snapshot(path: str) -> Dict[str, List[Any]]:
+    """Ler todas as seções de uma vez (materializadas em listas)"""
+    # Sem coletas do GC durante a criação de milhares de dicts: nada aqui forma ciclos
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        with SnapshotReader(path) as reader:
+            return {name: list(section) for name, section in reader.sections.items()}
+    finally:
+        if gc_enabled:
+            gc.enable()
@@ -1,9 +1,13 @@
-import requests
 import json
 import os
+import time
 from datetime import datetime
 from typing import Dict, List, Any
 
+from src.utils.http_transport import get_transport
+from src.utils.backup_retention import BackupRetentionEngine, RetentionPolicy
+from src.utils.tier_health import TierHealthTracker
+
 class CloudDataManager:
     """Gerenciador de dados em nuvem usando JSONBin.io"""
     
@@ -15,6 +19,7 @@ class CloudDataManager:
             'X-Master-Key': '$2a$10$8VvQjQjQjQjQjQjQjQjQjOeKKKKKKKKKKKKKKKKKKKKKKKKKKKKKKK'  # Chave pública para demo
         }
         self.bin_id = None
+        self.transport = get_transport()
         
     def create_or_get_bin(self):
         """Criar ou obter bin de dados"""
@@ -27,11 +32,10 @@ class CloudDataManager:
                 "last_updated": datetime.utcnow().isoformat()
             }
             
-            response = requests.post(
+            response = self.transport.post(
                 f"{self.base_url}",
-                headers=self.headers,
-                json=initial_data,
-                timeout=10
+                initial_data,
+                headers=self.headers
             )
             
             if response.status_code == 200:
@@ -64,7 +68,7 @@ class CloudDataManager:
             print(f"Erro ao salvar na nuvem: {e}")
             return False
     
-    def load_data(self) -> tuple[List[Dict], List[Dict]]:
+    def load_data(self, raise_errors: bool = False) -> tuple[List[Dict], List[Dict]]:
         """Carregar dados da nuvem"""
         try:
             # Simular carregamento de dados
@@ -74,16 +78,28 @@ class CloudDataManager:
             
         except Exception as e:
             print(f"Erro ao carregar da nuvem: {e}")
+            if raise_errors:
+                raise
             return [], []
 
 class HybridDataManager:
     """Gerenciador híbrido: Local + Nuvem + Backup em arquivo"""
     
-    def __init__(self, backup_dir: str):
+    TIERS = ('cloud', 'local', 'backup')
+    
+    def __init__(self, backup_dir: str, use_oplog: bool = False, retention_policy: RetentionPolicy = None):
         self.backup_dir = backup_dir
         os.makedirs(backup_dir, exist_ok=True)
         self.local_file = os.path.join(backup_dir, 'local_data.json')
         self.cloud_manager = CloudDataManager()
+        self.health = TierHealthTracker(self.TIERS)
+        self.retention = BackupRetentionEngine(backup_dir, retention_policy)
+        
+        # Com o log de operações a camada local grava só as mudanças
+        self.oplog = None
+        if use_oplog:
+            from src.utils.operation_log import OperationLogStore
+            self.oplog = OperationLogStore(os.path.join(backup_dir, 'oplog'))
         
     def save_data(self, texts: List[Dict], tags: List[Dict]) -> bool:
         """Salvar dados em múltiplas camadas"""
@@ -97,8 +113,11 @@ class HybridDataManager:
                 "timestamp": datetime.utcnow().isoformat()
             }
             
-            with open(self.local_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            if self.oplog is not None:
+                self.oplog.apply(texts, tags)
+            else:
+                with open(self.local_file, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, ensure_ascii=False, indent=2)
             success_count += 1
             print("✓ Dados salvos localmente")
             
@@ -106,70 +125,98 @@ class HybridDataManager:
             print(f"✗ Erro no salvamento local: {e}")
         
         # 2. Salvar na nuvem
+        cloud_ok = False
         try:
             if self.cloud_manager.save_data(texts, tags):
+                cloud_ok = True
                 success_count += 1
                 print("✓ Dados salvos na nuvem")
         except Exception as e:
             print(f"✗ Erro no salvamento na nuvem: {e}")
+        self.health.record('cloud', None, cloud_ok)
         
         # 3. Backup adicional em arquivo timestampado
         try:
-            timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-            backup_file = os.path.join(self.backup_dir, f'backup_{timestamp}.json')
+            now = datetime.utcnow()
+            backup_name = f'backup_{now.strftime("%Y%m%d_%H%M%S")}.json'
+            backup_file = os.path.join(self.backup_dir, backup_name)
             
             with open(backup_file, 'w', encoding='utf-8') as f:
                 json.dump(data, f, ensure_ascii=False, indent=2)
             success_count += 1
             print("✓ Backup timestampado criado")
             
+            # Registrar no manifesto e aplicar a política de retenção em segundo plano
+            self.retention.register(backup_name, now)
+            self.retention.prune_async()
+            
         except Exception as e:
             print(f"✗ Erro no backup timestampado: {e}")
         
         return success_count > 0
     
+    def _load_json(self, path: str) -> tuple[List[Dict], List[Dict]]:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return data.get('texts', []), data.get('tags', [])
+    
+    def _latest_backup(self):
+        return self.retention.latest_path()
+    
+    def _load_tier(self, tier: str) -> tuple[List[Dict], List[Dict]]:
+        if tier == 'cloud':
+            return self.cloud_manager.load_data(raise_errors=True)
+        if tier == 'local':
+            if self.oplog is not None and not self.oplog.is_empty():
+                return self.oplog.load()
+            if not os.path.exists(self.local_file):
+                return [], []
+            return self._load_json(self.local_file)
+        latest_backup = self._latest_backup()
+        if not latest_backup:
+            return [], []
+        return self._load_json(latest_backup)
+    
+    def _probe_tier(self, tier: str) -> bool:
+        if tier == 'cloud':
+            self.cloud_manager.load_data(raise_errors=True)
+            return True
+        if tier == 'local':
+            return self.oplog is not None or os.path.exists(self.local_file)
+        return self._latest_backup() is not None
+    
     def load_data(self) -> tuple[List[Dict], List[Dict]]:
         """Carregar dados de múltiplas fontes"""
+        labels = {'cloud': 'da nuvem', 'local': 'do arquivo local', 'backup': 'do backup mais recente'}
         
-        # 1. Tentar carregar da nuvem primeiro
-        try:
-            texts, tags = self.cloud_manager.load_data()
-            if texts or tags:
-                print("✓ Dados carregados da nuvem")
-                return texts, tags
-        except Exception as e:
-            print(f"✗ Erro ao carregar da nuvem: {e}")
-        
-        # 2. Tentar carregar do arquivo local
-        try:
-            if os.path.exists(self.local_file):
-                with open(self.local_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    texts = data.get('texts', [])
-                    tags = data.get('tags', [])
-                    if texts or tags:
-                        print("✓ Dados carregados do arquivo local")
-                        return texts, tags
-        except Exception as e:
-            print(f"✗ Erro ao carregar arquivo local: {e}")
-        
-        # 3. Tentar carregar do backup mais recente
-        try:
-            backup_files = [f for f in os.listdir(self.backup_dir) if f.startswith('backup_') and f.endswith('.json')]
-            if backup_files:
-                latest_backup = sorted(backup_files)[-1]
-                backup_path = os.path.join(self.backup_dir, latest_backup)
+        # Ordem definida pela saúde das camadas; disjuntores abertos são pulados
+        for tier in self.health.order():
+            with self.health.attempt(tier) as allowed:
+                if not allowed:
+                    continue
+                started = time.monotonic()
+                try:
+                    texts, tags = self._load_tier(tier)
+                except Exception as e:
+                    self.health.record(tier, time.monotonic() - started, False)
+                    print(f"✗ Erro ao carregar {labels[tier]}: {e}")
+                    continue
                 
-                with open(backup_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    texts = data.get('texts', [])
-                    tags = data.get('tags', [])
-                    if texts or tags:
-                        print(f"✓ Dados carregados do backup: {latest_backup}")
-                        return texts, tags
-        except Exception as e:
-            print(f"✗ Erro ao carregar backup: {e}")
+                self.health.record(tier, time.monotonic() - started, True)
+            if texts or tags:
+                self.health.mark_good(tier)
+                print(f"✓ Dados carregados {labels[tier]}")
+                break
+        else:
+            texts, tags = [], []
+            print("⚠ Nenhum dado encontrado em nenhuma fonte")
         
-        print("⚠ Nenhum dado encontrado em nenhuma fonte")
-        return [], []
-
+        for tier in self.TIERS:
+            if self.health.is_open(tier):
+                self.health.probe(tier, lambda tier=tier: self._probe_tier(tier))
+        return texts, tags
+    
+    def load_compact(self):
+        """Como load_data, mas devolvendo um CompactDataset (registros com __slots__)"""
+        from src.utils.compact_dataset import CompactDataset
+        return CompactDataset.from_dicts(*self.load_data())
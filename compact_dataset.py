@@ -0,0 +1,155 @@
+import sys
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Marca campos ausentes no dicionário de origem (diferente de None explícito)
+_MISSING = object()
+_TEXT_FIELDS = ('id', 'title', 'content', 'tags', 'created_at', 'updated_at')
+_TAG_FIELDS = ('id', 'name', 'color')
+
+
+class TagRecord:
+    """Etiqueta única do conjunto; textos a referenciam pela posição"""
+
+    __slots__ = ('id', 'name', 'color', 'extra', 'listed')
+
+    def __init__(self, id, name: str, color=None, extra: Optional[Dict] = None, listed: bool = True):
+        self.id = id
+        self.name = name
+        self.color = color
+        self.extra = extra
+        # False para nomes que só aparecem dentro de textos (fora da lista de etiquetas)
+        self.listed = listed
+
+    def to_dict(self) -> Dict:
+        data = {'id': self.id, 'name': self.name, 'color': self.color}
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+
+class TextRecord:
+    """Texto com as etiquetas guardadas como array de índices inteiros"""
+
+    __slots__ = ('id', 'title', 'content', 'created_at', 'updated_at', 'tag_ids', 'extra')
+
+    def __init__(self, id, title, content, tag_ids: array, created_at=_MISSING, updated_at=_MISSING,
+                 extra: Optional[Dict] = None):
+        self.id = id
+        self.title = title
+        self.content = content
+        self.tag_ids = tag_ids
+        self.created_at = created_at
+        self.updated_at = updated_at
+        self.extra = extra
+
+
+class CompactDataset:
+    """Representação compacta de textos e etiquetas em memória.
+
+    Registros com `__slots__` em vez de dicionários, nomes de etiqueta
+    internados (uma única string por etiqueta) e a lista de etiquetas de
+    cada texto como array de índices. `from_dicts`/`to_dicts` convertem de
+    e para o formato de dicionários usado pelos gerenciadores.
+    """
+
+    def __init__(self):
+        self.texts: List[TextRecord] = []
+        self.tags: List[TagRecord] = []
+        self._tag_index: Dict[str, int] = {}
+        # Textos de to_dict() trazem as etiquetas como dicionários; os do banco, como nomes
+        self.tags_as_dicts = False
+
+    # Construção
+
+    def add_tag(self, name: str, id=None, color=None, extra: Optional[Dict] = None, listed: bool = True) -> int:
+        """Registrar uma etiqueta (ou completar uma já vista) e devolver sua posição"""
+        position = self._tag_index.get(name)
+        if position is None:
+            position = len(self.tags)
+            self._tag_index[sys.intern(name)] = position
+            self.tags.append(TagRecord(id, sys.intern(name), color, extra or None, listed))
+        elif listed:
+            tag = self.tags[position]
+            tag.listed = True
+            if id is not None:
+                tag.id = id
+            if color is not None:
+                tag.color = color
+            if extra:
+                tag.extra = extra
+        return position
+
+    def _tag_position(self, tag) -> int:
+        if isinstance(tag, dict):
+            extra = {key: value for key, value in tag.items() if key not in _TAG_FIELDS}
+            position = self._tag_index.get(tag['name'])
+            if position is None:
+                return self.add_tag(tag['name'], tag.get('id'), tag.get('color'), extra, listed=False)
+            return position
+        position = self._tag_index.get(tag)
+        if position is None:
+            position = self.add_tag(tag, listed=False)
+        return position
+
+    def add_text(self, id, title, content, tags: Iterable = (), created_at=_MISSING, updated_at=_MISSING,
+                 extra: Optional[Dict] = None) -> TextRecord:
+        positions = [self._tag_position(tag) for tag in tags]
+        # 'H' usa 2 bytes por etiqueta; só conjuntos com mais de 65535 etiquetas precisam de 'I'
+        typecode = 'H' if len(self.tags) <= 0xFFFF else 'I'
+        record = TextRecord(id, title, content, array(typecode, positions), created_at, updated_at, extra or None)
+        self.texts.append(record)
+        return record
+
+    @classmethod
+    def from_dicts(cls, texts: Iterable[Dict], tags: Iterable[Dict]) -> 'CompactDataset':
+        dataset = cls()
+        for tag in tags:
+            extra = {key: value for key, value in tag.items() if key not in _TAG_FIELDS}
+            dataset.add_tag(tag['name'], tag.get('id'), tag.get('color'), extra)
+        for text in texts:
+            text_tags = text.get('tags') or ()
+            if text_tags and isinstance(text_tags[0], dict):
+                dataset.tags_as_dicts = True
+            extra = {key: value for key, value in text.items() if key not in _TEXT_FIELDS}
+            dataset.add_text(text.get('id'), text.get('title'), text.get('content'), text_tags,
+                             text.get('created_at', _MISSING), text.get('updated_at', _MISSING), extra)
+        return dataset
+
+    # Conversão e consulta
+
+    def tag_names(self, record: TextRecord) -> List[str]:
+        return [self.tags[position].name for position in record.tag_ids]
+
+    def text_to_dict(self, record: TextRecord) -> Dict:
+        if self.tags_as_dicts:
+            text_tags = [self.tags[position].to_dict() for position in record.tag_ids]
+        else:
+            text_tags = self.tag_names(record)
+        data = {'id': record.id, 'title': record.title, 'content': record.content, 'tags': text_tags}
+        if record.created_at is not _MISSING:
+            data['created_at'] = record.created_at
+        if record.updated_at is not _MISSING:
+            data['updated_at'] = record.updated_at
+        if record.extra:
+            data.update(record.extra)
+        return data
+
+    def iter_text_dicts(self) -> Iterator[Dict]:
+        """Dicionários gerados sob demanda, um por vez"""
+        for record in self.texts:
+            yield self.text_to_dict(record)
+
+    def to_dicts(self) -> Tuple[List[Dict], List[Dict]]:
+        texts = list(self.iter_text_dicts())
+        tags = [tag.to_dict() for tag in self.tags if tag.listed]
+        return texts, tags
+
+    def texts_with_tag(self, name: str) -> List[TextRecord]:
+        position = self._tag_index.get(name)
+        if position is None:
+            return []
+        return [record for record in self.texts if position in record.tag_ids]
+
+    def __len__(self) -> int:
+        return len(self.texts)
@@ -1,33 +1,34 @@
 import json
 import os
-from datetime import datetime
-from typing import Dict, List, Any
+from typing import Dict, Iterable, Iterator, List, Any
 
 class PersistentDataManager:
     """Gerenciador de dados persistente com backup automático"""
     
-    def __init__(self, backup_dir: str):
+    def __init__(self, backup_dir: str, use_oplog: bool = False):
         self.backup_dir = backup_dir
         os.makedirs(backup_dir, exist_ok=True)
         self.texts_file = os.path.join(backup_dir, 'texts_backup.json')
         self.tags_file = os.path.join(backup_dir, 'tags_backup.json')
+        self.stream_file = os.path.join(backup_dir, 'backup.ndjson.gz')
+        self.snapshot_file = os.path.join(backup_dir, 'backup.gtxs')
+        
+        # Log de operações: cada backup grava só o que mudou
+        self.oplog = None
+        if use_oplog:
+            from src.utils.operation_log import OperationLogStore
+            self.oplog = OperationLogStore(os.path.join(backup_dir, 'oplog'))
     
     def backup_data(self, texts: List[Dict], tags: List[Dict]) -> bool:
-        """Fazer backup dos dados em arquivos JSON"""
+        """Fazer backup dos dados em um snapshot binário"""
         try:
-            # Backup dos textos
-            with open(self.texts_file, 'w', encoding='utf-8') as f:
-                json.dump({
-                    'timestamp': datetime.utcnow().isoformat(),
-                    'data': texts
-                }, f, ensure_ascii=False, indent=2)
+            if self.oplog is not None:
+                self.oplog.apply(texts, tags)
+                return True
             
-            # Backup das etiquetas
-            with open(self.tags_file, 'w', encoding='utf-8') as f:
-                json.dump({
-                    'timestamp': datetime.utcnow().isoformat(),
-                    'data': tags
-                }, f, ensure_ascii=False, indent=2)
+            # Snapshot binário gravado de forma atômica (temp + fsync + rename)
+            from src.utils.binary_snapshot import write_snapshot
+            write_snapshot(self.snapshot_file, {'texts': texts, 'tags': tags})
             
             return True
         except Exception as e:
@@ -40,13 +41,20 @@ class PersistentDataManager:
         tags = []
         
         try:
-            # Restaurar etiquetas
+            if self.oplog is not None and not self.oplog.is_empty():
+                return self.oplog.load()
+            
+            if os.path.exists(self.snapshot_file):
+                from src.utils.binary_snapshot import read_snapshot
+                sections = read_snapshot(self.snapshot_file)
+                return sections.get('texts', []), sections.get('tags', [])
+            
+            # Backups JSON do formato anterior
             if os.path.exists(self.tags_file):
                 with open(self.tags_file, 'r', encoding='utf-8') as f:
                     tags_data = json.load(f)
                     tags = tags_data.get('data', [])
             
-            # Restaurar textos
             if os.path.exists(self.texts_file):
                 with open(self.texts_file, 'r', encoding='utf-8') as f:
                     texts_data = json.load(f)
@@ -57,7 +65,38 @@ class PersistentDataManager:
         
         return texts, tags
     
+    def restore_compact(self):
+        """Como restore_data, mas devolvendo um CompactDataset (registros com __slots__)"""
+        from src.utils.compact_dataset import CompactDataset
+        return CompactDataset.from_dicts(*self.restore_data())
+    
+    def open_snapshot(self):
+        """Abrir o snapshot binário para leitura sob demanda (use com `with`)"""
+        from src.utils.binary_snapshot import SnapshotReader
+        return SnapshotReader(self.snapshot_file)
+    
+    def backup_stream(self, texts: Iterable[Dict], tags: Iterable[Dict]) -> bool:
+        """Fazer backup em NDJSON comprimido consumindo iteradores (memória constante)"""
+        from src.utils.streaming_backup import iter_dataset_records, write_ndjson
+        
+        try:
+            write_ndjson(self.stream_file, iter_dataset_records(texts, tags, 'persistent'))
+            return True
+        except Exception as e:
+            print(f"Erro no backup NDJSON: {e}")
+            return False
+    
+    def iter_backup(self) -> Iterator[Dict]:
+        """Percorrer os registros do backup NDJSON sem carregá-lo inteiro"""
+        from src.utils.streaming_backup import read_ndjson
+        
+        if os.path.exists(self.stream_file):
+            yield from read_ndjson(self.stream_file)
+    
     def has_backup(self) -> bool:
         """Verificar se existem backups"""
-        return os.path.exists(self.texts_file) or os.path.exists(self.tags_file)
+        return (os.path.exists(self.snapshot_file)
+                or os.path.exists(self.texts_file) or os.path.exists(self.tags_file)
+                or os.path.exists(self.stream_file)
+                or (self.oplog is not None and not self.oplog.is_empty()))
 
@@ -1,69 +1,257 @@
-import requests
 import json
 import base64
+import hashlib
+import os
+import re
 from datetime import datetime
 
+from src.utils.http_transport import get_transport
+
+# Formato em shards: cada coleção (lista de objetos) é dividida por faixa de id
+# em arquivos do Gist; o manifesto diz quais arquivos montam o backup
+MANIFEST_FILE = 'gtex_manifest.json'
+META_FILE = 'gtex_meta.json'
+LEGACY_FILE = 'gtex_backup.json'
+SHARD_FORMAT = 1
+
+
+class GistAPIError(Exception):
+    """Resposta inesperada da API de Gists"""
+
+    def __init__(self, status_code, sent_any):
+        super().__init__(f'GitHub API error: {status_code}')
+        self.status_code = status_code
+        self.sent_any = sent_any
+
+
+def _dumps(data) -> str:
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+
+
+def _content_hash(content: str) -> str:
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+
 class GitHubBackupManager:
-    def __init__(self):
+    def __init__(self, api_url=None, token=None, state_file=None, shard_size=500, files_per_request=50):
         # Token público para demonstração (em produção seria privado)
-        self.github_token = None  # Será usado sem token (público)
+        self.github_token = token or os.environ.get('GTEX_GITHUB_TOKEN')  # Sem token: uso público
         self.gist_id = None  # Será criado dinamicamente
-        
-    def save_to_github(self, data):
-        """Salva dados no GitHub Gist"""
+        self.api_url = (api_url or os.environ.get('GTEX_GITHUB_API_URL', 'https://api.github.com')).rstrip('/')
+        # Hashes dos shards já enviados, para mandar só o que mudou
+        self.state_file = state_file
+        self.shard_size = shard_size
+        self.files_per_request = files_per_request
+        self.transport = get_transport()
+
+    def _headers(self):
+        headers = {"Accept": "application/vnd.github.v3+json"}
+        if self.github_token:
+            headers["Authorization"] = f"token {self.github_token}"
+        return headers
+
+    # Shards
+
+    def build_shards(self, data):
+        """Dividir o backup em arquivos: um por faixa de id de cada coleção, mais metadados e manifesto"""
+        files = {}
+        collections = {}
+        meta = {}
+
+        for key, value in data.items():
+            if not (isinstance(value, list) and all(isinstance(item, dict) for item in value)):
+                meta[key] = value
+                continue
+
+            safe_key = re.sub(r'[^A-Za-z0-9_-]', '_', key)
+            shards = {}
+            for item in value:
+                item_id = item.get('id')
+                if isinstance(item_id, int) and item_id >= 0:
+                    name = f"gtex_{safe_key}_{item_id // self.shard_size:06d}.json"
+                else:
+                    name = f"gtex_{safe_key}_rest.json"
+                shards.setdefault(name, []).append(item)
+
+            for name, items in shards.items():
+                items.sort(key=lambda item: item['id'] if isinstance(item.get('id'), int) else -1)
+                files[name] = _dumps(items)
+            # Shards numéricos em ordem de id; itens sem id por último
+            collections[key] = sorted(shards, key=lambda name: (name.endswith('_rest.json'), name))
+
+        files[META_FILE] = _dumps(meta)
+        manifest = {
+            'format': SHARD_FORMAT,
+            'shard_size': self.shard_size,
+            'collections': collections,
+            'meta': META_FILE,
+            'hashes': {name: _content_hash(content) for name, content in files.items()}
+        }
+        return files, manifest
+
+    def _load_state(self):
+        if self.state_file and os.path.exists(self.state_file):
+            try:
+                with open(self.state_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                pass
+        return {'gist_id': None, 'hashes': {}}
+
+    def _save_state(self, state):
+        if not self.state_file:
+            return
+        tmp_path = self.state_file + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, separators=(',', ':'))
+        os.replace(tmp_path, self.state_file)
+
+    def _send_files(self, gist_id, files, description):
+        """Enviar arquivos em lotes; o último lote leva o manifesto e as remoções.
+
+        Produz (gist_id, lote, resposta) a cada lote aceito; sem `gist_id`,
+        o primeiro lote cria o Gist.
+        """
+        names = [name for name in files if name != MANIFEST_FILE and files[name] is not None]
+        tail = [name for name in files if name == MANIFEST_FILE or files[name] is None]
+        size = max(1, self.files_per_request)
+        batches = [names[i:i + size] for i in range(0, len(names), size)] or [[]]
+        batches[-1] = batches[-1] + tail
+
+        sent_any = False
+        for batch in batches:
+            payload = {name: (None if files[name] is None else {"content": files[name]}) for name in batch}
+            if gist_id is None:
+                response = self.transport.post(f"{self.api_url}/gists", {
+                    "description": description,
+                    "public": False,
+                    "files": payload
+                }, headers=self._headers())
+                if response.status_code != 201:
+                    raise GistAPIError(response.status_code, sent_any)
+                gist_id = response.json()['id']
+            else:
+                # Reenviar o mesmo conteúdo dos arquivos deixa o Gist no mesmo estado
+                response = self.transport.patch(f"{self.api_url}/gists/{gist_id}", {
+                    "description": description,
+                    "files": payload
+                }, headers=self._headers(), idempotent=True)
+                if response.status_code != 200:
+                    raise GistAPIError(response.status_code, sent_any)
+            sent_any = True
+            yield gist_id, batch, response
+
+    def _remote_files(self, gist_id):
+        """Nomes dos arquivos do Gist; vazio se ele não puder ser lido"""
+        response = self.transport.get(f"{self.api_url}/gists/{gist_id}", headers=self._headers())
+        if response.status_code != 200:
+            return []
+        return list(response.json().get('files', {}))
+
+    def save_to_github(self, data, gist_id=None):
+        """Salva dados no GitHub Gist.
+
+        Com `gist_id` (ou um Gist já usado antes), o Gist é atualizado no
+        lugar via PATCH e apenas os shards cujo hash mudou são enviados;
+        sem ele, um novo Gist é criado.
+        """
         try:
-            # Preparar dados para o Gist
-            gist_data = {
-                "description": f"Gtex Backup - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
-                "public": False,
-                "files": {
-                    "gtex_backup.json": {
-                        "content": json.dumps(data, ensure_ascii=False, indent=2)
-                    }
-                }
+            files, manifest = self.build_shards(data)
+            description = f"Gtex Backup - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+
+            state = self._load_state()
+            gist_id = gist_id or self.gist_id
+            known = state['hashes'] if gist_id and state.get('gist_id') == gist_id else {}
+
+            changed = {name: content for name, content in files.items()
+                       if known.get(name) != manifest['hashes'][name]}
+            # Sem estado local para este Gist (arquivo perdido ou de outro Gist), os shards
+            # antigos só são conhecidos listando os arquivos do próprio Gist
+            existing = known if known or not gist_id else self._remote_files(gist_id)
+            for name in existing:
+                if name not in files and name != MANIFEST_FILE and name.startswith('gtex_'):
+                    # Shard que deixou de existir: null remove o arquivo do Gist
+                    changed[name] = None
+            if gist_id and known and not changed:
+                self.gist_id = gist_id
+                return {'success': True, 'gist_id': gist_id, 'url': None, 'uploaded': 0,
+                        'unchanged': len(files)}
+
+            changed[MANIFEST_FILE] = _dumps(manifest)
+
+            response = None
+            try:
+                for gist_id, batch, response in self._send_files(gist_id, changed, description):
+                    # Registrar a cada lote: um erro no meio não obriga a reenviar o que já foi
+                    for name in batch:
+                        if changed[name] is None:
+                            known.pop(name, None)
+                        elif name != MANIFEST_FILE:
+                            known[name] = manifest['hashes'][name]
+                    state = {'gist_id': gist_id, 'hashes': known}
+                    self._save_state(state)
+            except GistAPIError as e:
+                if e.status_code == 404 and not e.sent_any:
+                    # Gist apagado do lado do GitHub: recomeçar em um novo
+                    self.gist_id = None
+                    self._save_state({'gist_id': None, 'hashes': {}})
+                    return self.save_to_github(data)
+                return {'success': False, 'error': str(e)}
+
+            self.gist_id = gist_id
+            uploaded = sum(1 for name, content in changed.items() if content is not None and name != MANIFEST_FILE)
+            return {
+                'success': True,
+                'gist_id': self.gist_id,
+                'url': response.json().get('html_url') if response is not None else None,
+                'uploaded': uploaded,
+                'unchanged': len(files) - uploaded
             }
-            
-            # Criar ou atualizar Gist
-            url = "https://api.github.com/gists"
-            headers = {"Accept": "application/vnd.github.v3+json"}
-            
-            response = requests.post(url, json=gist_data, headers=headers, timeout=10)
-            
-            if response.status_code == 201:
-                gist_info = response.json()
-                self.gist_id = gist_info['id']
-                return {
-                    'success': True,
-                    'gist_id': self.gist_id,
-                    'url': gist_info['html_url']
-                }
-            else:
-                return {'success': False, 'error': f'GitHub API error: {response.status_code}'}
-                
+
         except Exception as e:
             return {'success': False, 'error': str(e)}
-    
+
+    def _file_content(self, file_info):
+        # Arquivos grandes chegam truncados na resposta; o conteúdo completo fica em raw_url
+        if file_info.get('truncated') and file_info.get('raw_url'):
+            response = self.transport.get(file_info['raw_url'])
+            response.raise_for_status()
+            return response.text
+        return file_info['content']
+
     def load_from_github(self, gist_id):
         """Carrega dados do GitHub Gist"""
         try:
-            url = f"https://api.github.com/gists/{gist_id}"
-            headers = {"Accept": "application/vnd.github.v3+json"}
-            
-            response = requests.get(url, headers=headers, timeout=10)
-            
+            url = f"{self.api_url}/gists/{gist_id}"
+
+            response = self.transport.get(url, headers=self._headers())
+
             if response.status_code == 200:
-                gist_data = response.json()
-                file_content = gist_data['files']['gtex_backup.json']['content']
+                gist_files = response.json()['files']
+                if MANIFEST_FILE not in gist_files:
+                    file_content = self._file_content(gist_files[LEGACY_FILE])
+                    return {
+                        'success': True,
+                        'data': json.loads(file_content)
+                    }
+
+                # Remontar o backup a partir dos shards listados no manifesto
+                manifest = json.loads(self._file_content(gist_files[MANIFEST_FILE]))
+                data = json.loads(self._file_content(gist_files[manifest['meta']]))
+                for key, names in manifest['collections'].items():
+                    items = []
+                    for name in names:
+                        items.extend(json.loads(self._file_content(gist_files[name])))
+                    data[key] = items
                 return {
                     'success': True,
-                    'data': json.loads(file_content)
+                    'data': data
                 }
             else:
                 return {'success': False, 'error': f'Gist not found: {response.status_code}'}
-                
+
         except Exception as e:
             return {'success': False, 'error': str(e)}
 
 # Instância global
 github_backup = GitHubBackupManager()
-
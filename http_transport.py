@@ -0,0 +1,175 @@
+import gzip
+import json
+import random
+import threading
+import time
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+RETRYABLE_STATUS = frozenset({408, 425, 429, 500, 502, 503, 504})
+# Repetir um POST/PATCH depois de um 5xx ou timeout pode aplicar a operação duas vezes
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'})
+
+
+class TransportMetrics:
+    """Contadores de chamadas, latência e bytes por destino"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hosts = {}
+
+    def record(self, host: str, latency: float, sent: int, received: int, status: Optional[int], retries: int):
+        with self._lock:
+            stats = self._hosts.setdefault(host, {
+                'requests': 0, 'errors': 0, 'retries': 0,
+                'bytes_sent': 0, 'bytes_received': 0,
+                'total_latency': 0.0, 'max_latency': 0.0
+            })
+            stats['requests'] += 1
+            stats['retries'] += retries
+            stats['bytes_sent'] += sent
+            stats['bytes_received'] += received
+            stats['total_latency'] += latency
+            stats['max_latency'] = max(stats['max_latency'], latency)
+            if status is None or status >= 400:
+                stats['errors'] += 1
+
+    def snapshot(self) -> Dict[str, Dict]:
+        with self._lock:
+            result = {}
+            for host, stats in self._hosts.items():
+                data = dict(stats)
+                data['avg_latency'] = stats['total_latency'] / stats['requests'] if stats['requests'] else 0.0
+                result[host] = data
+            return result
+
+
+class CloudTransport:
+    """Cliente HTTP compartilhado pelos destinos de backup em nuvem.
+
+    Uma sessão com pool de conexões keep-alive, retentativas com backoff
+    exponencial e jitter nos status transitórios, JSON compacto e corpo
+    comprimido com gzip acima de `compress_min_bytes`.
+
+    Só métodos idempotentes são repetidos após status transitório ou erro de
+    rede; um POST/PATCH só com `idempotent=True`. Um 400/415 em corpo gzip
+    leva a um reenvio sem compressão, e o host só passa a receber corpos sem
+    gzip se esse reenvio for aceito (um 400 de validação não desliga o gzip).
+    """
+
+    def __init__(self, max_retries: int = 3, backoff_base: float = 0.5, backoff_max: float = 8.0,
+                 timeout: float = 10.0, compress_min_bytes: int = 1024, pool_size: int = 10):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.compress_min_bytes = compress_min_bytes
+        self.metrics = TransportMetrics()
+        self._no_gzip_hosts = set()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    @staticmethod
+    def encode_json(data: Any) -> bytes:
+        return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    def _backoff(self, attempt: int, retry_after: Optional[str]) -> float:
+        if retry_after:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+        # "Full jitter": espera aleatória até o teto exponencial
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def request(self, method: str, url: str, json_body: Any = None, headers: Optional[Dict] = None,
+                timeout: Optional[float] = None, compress: bool = True,
+                idempotent: Optional[bool] = None) -> requests.Response:
+        """Enviar uma requisição com retentativas; exceções de rede sobem após a última tentativa"""
+        host = urlsplit(url).netloc
+        retry = method.upper() in IDEMPOTENT_METHODS if idempotent is None else idempotent
+        headers = dict(headers or {})
+        body = None
+        if json_body is not None:
+            body = self.encode_json(json_body)
+            headers.setdefault('Content-Type', 'application/json')
+            if compress and len(body) >= self.compress_min_bytes and host not in self._no_gzip_hosts:
+                body = gzip.compress(body, compresslevel=6)
+                headers['Content-Encoding'] = 'gzip'
+
+        started = time.monotonic()
+        retries = 0
+        sent = 0
+        response = None
+        gzip_refused = False
+        try:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    sent += len(body or b'')
+                    response = self.session.request(method, url, data=body, headers=headers,
+                                                    timeout=timeout or self.timeout)
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    # Sem conexão estabelecida nada chegou ao servidor: repetir é seguro para todo método
+                    if attempt >= self.max_retries or not (retry or isinstance(e, requests.ConnectTimeout)):
+                        raise
+                    retries += 1
+                    time.sleep(self._backoff(attempt, None))
+                    continue
+
+                if response.status_code in (400, 415) and headers.get('Content-Encoding') == 'gzip':
+                    # Talvez o servidor não aceite corpo comprimido: reenviar sem gzip. A requisição
+                    # foi recusada, então o reenvio é seguro mesmo para um POST
+                    gzip_refused = True
+                    body = self.encode_json(json_body)
+                    headers.pop('Content-Encoding')
+                    retries += 1
+                    continue
+                if gzip_refused and response.status_code < 400:
+                    # Sem gzip foi aceita: o problema era a compressão
+                    self._no_gzip_hosts.add(host)
+                    gzip_refused = False
+
+                if retry and response.status_code in RETRYABLE_STATUS and attempt < self.max_retries:
+                    retries += 1
+                    time.sleep(self._backoff(attempt, response.headers.get('Retry-After')))
+                    continue
+                return response
+            return response
+        finally:
+            received = len(response.content) if response is not None else 0
+            status = response.status_code if response is not None else None
+            self.metrics.record(host, time.monotonic() - started, sent, received, status, retries)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, json_body: Any = None, **kwargs) -> requests.Response:
+        return self.request('POST', url, json_body=json_body, **kwargs)
+
+    def patch(self, url: str, json_body: Any = None, **kwargs) -> requests.Response:
+        return self.request('PATCH', url, json_body=json_body, **kwargs)
+
+    def delete(self, url: str, **kwargs) -> requests.Response:
+        return self.request('DELETE', url, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+# Instância compartilhada
+_shared_transport = None
+_shared_lock = threading.Lock()
+
+
+def get_transport() -> CloudTransport:
+    global _shared_transport
+    with _shared_lock:
+        if _shared_transport is None:
+            _shared_transport = CloudTransport()
+        return _shared_transport
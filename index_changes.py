@@ -0,0 +1,44 @@
+import sqlite3
+from typing import Optional, Set, Tuple
+
+# Feed de mudanças para os índices em memória: cada escrita em um texto ou etiqueta grava
+# uma linha na mesma transação, e quem mantém um índice aplica só o que mudou desde a
+# última sincronização, em vez de remontá-lo do zero
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS index_changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    item_id INTEGER NOT NULL
+);
+'''
+
+# Poda a cada PRUNE_EVERY publicações
+PRUNE_EVERY = 1000
+
+
+def publish(db: sqlite3.Connection, kind: str, item_id: int, keep: int = 20000):
+    """Registrar que um texto ('text') ou etiqueta ('tag') mudou; não faz commit"""
+    seq = db.execute('INSERT INTO index_changes (kind, item_id) VALUES (?, ?)', (kind, item_id)).lastrowid
+    if seq % PRUNE_EVERY == 0:
+        db.execute('DELETE FROM index_changes WHERE seq <= ?', (seq - keep,))
+
+
+def last_seq(db: sqlite3.Connection) -> int:
+    return db.execute('SELECT COALESCE(MAX(seq), 0) FROM index_changes').fetchone()[0]
+
+
+def changes_since(db: sqlite3.Connection, seq: int, limit: int) -> Optional[Tuple[int, Set[Tuple[str, int]]]]:
+    """(último seq, {(kind, item_id)}) das mudanças depois de `seq`.
+
+    None quando não dá para atualizar aos poucos: mais de `limit` mudanças,
+    ou mudanças seguintes a `seq` já podadas (lacuna na sequência). O
+    AUTOINCREMENT não reaproveita números e um rollback desfaz também o
+    contador, então a sequência só tem lacunas por causa da poda.
+    """
+    rows = db.execute('SELECT seq, kind, item_id FROM index_changes WHERE seq > ? ORDER BY seq LIMIT ?',
+                      (seq, limit + 1)).fetchall()
+    if not rows:
+        return seq, set()
+    if len(rows) > limit or rows[0][0] != seq + 1:
+        return None
+    return rows[-1][0], {(row[1], row[2]) for row in rows}
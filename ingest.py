@@ -0,0 +1,375 @@
+"""Importação em massa de diretórios de arquivos Markdown/texto direto no banco.
+
+    python -m src.utils.ingest ~/notas --db gtex.db
+    python -m src.utils.ingest ~/export --db database/gtex_persistent.db --workers 8
+
+Os arquivos (.md, .markdown, .txt) são lidos e interpretados em um pool de
+processos: título e etiquetas vêm do front-matter (title, tags/keywords,
+date/created); sem título, vale o primeiro cabeçalho Markdown e depois o
+nome do arquivo. O processo principal grava em transações grandes
+(--batch arquivos por vez) no esquema do app.py (texts/tags) ou do main.py
+(text/tag), detectado pelas tabelas existentes.
+
+Conteúdos repetidos (hash SHA-1, inclusive de textos já no banco) não viram
+textos novos. A tabela ingest_files registra cada arquivo importado na mesma
+transação dos textos: rodar de novo retoma de onde parou, pula arquivos sem
+mudança e atualiza no lugar o texto de um arquivo que mudou.
+"""
+import argparse
+import hashlib
+import os
+import re
+import sqlite3
+import sys
+import time
+from datetime import datetime
+from multiprocessing import Pool
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from src.utils import index_changes
+from src.utils.large_content import SCHEMA as LARGE_CONTENT_SCHEMA, LargeContentStore
+from src.utils.revision_store import SCHEMA as REVISION_SCHEMA, RevisionStore
+
+EXTENSIONS = ('.md', '.markdown', '.txt')
+# Limites das colunas do main.py (String(200) e String(50))
+MAX_TITLE = 200
+MAX_TAG = 50
+TAG_COLORS = ('#ef4444', '#8b5cf6', '#f97316', '#10b981', '#3b82f6', '#eab308', '#ec4899', '#14b8a6')
+
+STATE_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS ingest_files (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    content_hash TEXT NOT NULL,
+    text_id INTEGER,
+    ingested_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_ingest_files_hash ON ingest_files (content_hash);
+'''
+
+_FRONT_MATTER = re.compile(r'\A\ufeff?---[ \t]*\r?\n(.*?)\r?\n(?:---|\.\.\.)[ \t]*(?:\r?\n|\Z)', re.S)
+_HEADING = re.compile(r'^#{1,6}[ \t]+(.+?)[ \t#]*$', re.M)
+
+
+# Interpretação (roda nos processos do pool)
+
+def _unquote(value: str) -> str:
+    value = value.strip()
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in '"\'':
+        return value[1:-1]
+    return value
+
+
+def parse_front_matter(block: str) -> Dict:
+    """Subconjunto de YAML do front-matter: `chave: valor`, listas [a, b] e itens `- a`"""
+    data: Dict = {}
+    key = None
+    for line in block.splitlines():
+        stripped = line.strip()
+        if not stripped or stripped.startswith('#'):
+            continue
+        if stripped.startswith('- ') and key is not None:
+            if not isinstance(data.get(key), list):
+                data[key] = []
+            data[key].append(_unquote(stripped[2:]))
+            continue
+        name, separator, value = line.partition(':')
+        if not separator:
+            continue
+        key = name.strip().lower()
+        value = value.strip()
+        if value.startswith('[') and value.endswith(']'):
+            data[key] = [_unquote(item) for item in value[1:-1].split(',') if item.strip()]
+        else:
+            data[key] = _unquote(value)
+    return data
+
+
+def _tags(value) -> List[str]:
+    items = value if isinstance(value, list) else re.split(r'[,\s]+', value or '')
+    tags = []
+    for item in items:
+        tag = item.strip().lstrip('#').strip()[:MAX_TAG]
+        if tag and tag not in tags:
+            tags.append(tag)
+    return tags
+
+
+def _created_at(value, mtime_ns: int) -> str:
+    try:
+        moment = datetime.fromisoformat(str(value).strip().replace('Z', '+00:00')) if value else None
+    except ValueError:
+        moment = None
+    if moment is None:
+        moment = datetime.fromtimestamp(mtime_ns / 1e9)
+    return moment.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def parse_file(item: Tuple[str, int, int]) -> Dict:
+    """Ler e interpretar um arquivo: título, etiquetas, data, conteúdo e hash"""
+    path, mtime_ns, size = item
+    result = {'path': path, 'mtime_ns': mtime_ns, 'size': size}
+    try:
+        with open(path, 'rb') as handle:
+            text = handle.read().decode('utf-8', errors='replace')
+    except OSError as e:
+        result['error'] = str(e)
+        return result
+
+    meta: Dict = {}
+    match = _FRONT_MATTER.match(text)
+    if match:
+        meta = parse_front_matter(match.group(1))
+        text = text[match.end():]
+    content = text.lstrip('\ufeff').strip()
+
+    title = meta.get('title') if isinstance(meta.get('title'), str) else None
+    if not title:
+        heading = _HEADING.search(content)
+        title = heading.group(1) if heading else None
+    if not title:
+        title = re.sub(r'[_-]+', ' ', os.path.splitext(os.path.basename(path))[0]).strip() or 'Sem título'
+
+    result.update({
+        'title': title.strip()[:MAX_TITLE],
+        'tags': _tags(meta.get('tags', meta.get('keywords'))),
+        'created_at': _created_at(meta.get('date', meta.get('created')), mtime_ns),
+        'content': content,
+        'hash': hashlib.sha1(content.encode('utf-8')).hexdigest()
+    })
+    return result
+
+
+# Gravação (processo principal)
+
+class Target:
+    """Esquema de destino: app.py (texts/tags, conteúdo grande e revisões) ou main.py (text/tag)"""
+
+    def __init__(self, db: sqlite3.Connection, kind: str = 'auto'):
+        tables = {row[0] for row in db.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        if kind == 'auto':
+            kind = 'app' if 'texts' in tables else 'main' if 'text' in tables else None
+        if kind is None or {'app': 'texts', 'main': 'text'}[kind] not in tables:
+            raise ValueError('Banco sem tabelas de textos: inicie o app.py ou o main.py uma vez antes')
+        self.kind = kind
+        self.texts, self.tags = ('texts', 'tags') if kind == 'app' else ('text', 'tag')
+        self.large_content = self.revisions = None
+        if kind == 'app':
+            db.executescript(LARGE_CONTENT_SCHEMA + REVISION_SCHEMA + index_changes.SCHEMA)
+            self.large_content = LargeContentStore(
+                threshold=int(os.environ.get('GTEX_LARGE_CONTENT', 256 * 1024)),
+                preview_chars=int(os.environ.get('GTEX_CONTENT_PREVIEW', 2000))
+            )
+            self.revisions = RevisionStore(keyframe_interval=int(os.environ.get('GTEX_REVISION_KEYFRAME', 32)))
+
+
+class Ingester:
+    def __init__(self, db_path: str, target: str = 'auto', batch_size: int = 2000):
+        self.db = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+        for pragma in ('busy_timeout=30000', 'synchronous=NORMAL', 'cache_size=-65536', 'temp_store=MEMORY'):
+            self.db.execute(f'PRAGMA {pragma}')
+        self.target = Target(self.db, target)
+        self.db.executescript(STATE_SCHEMA)
+        self.batch_size = batch_size
+        self.tag_ids = {name: tag_id for tag_id, name in self.db.execute(f'SELECT id, name FROM {self.target.tags}')}
+        self.stats = {'seen': 0, 'unchanged': 0, 'created': 0, 'updated': 0, 'duplicates': 0, 'failed': 0}
+
+    def known(self) -> Tuple[Dict[str, Tuple[int, int, Optional[int]]], Dict[str, int]]:
+        """Arquivos já importados (caminho -> mtime, tamanho, texto) e hashes de conteúdo existentes"""
+        files = {path: (mtime_ns, size, text_id) for path, mtime_ns, size, text_id in self.db.execute(
+            'SELECT path, mtime_ns, size, text_id FROM ingest_files')}
+        hashes = {content_hash: text_id for content_hash, text_id in self.db.execute(
+            'SELECT content_hash, text_id FROM ingest_files WHERE text_id IS NOT NULL')}
+        # Textos criados pela API também contam para a deduplicação
+        ingested = set(hashes.values())
+        if self.target.large_content is not None:
+            rows = self.db.execute('''
+                SELECT t.id, t.content, b.id IS NOT NULL FROM texts t
+                LEFT JOIN text_blobs b ON b.text_id = t.id AND b.complete = 1
+            ''')
+        else:
+            rows = self.db.execute(f'SELECT id, content, 0 FROM {self.target.texts}')
+        for text_id, content, large in rows:
+            if text_id in ingested:
+                continue
+            if large:
+                content = self.target.large_content.read_text(self.db, text_id)
+            hashes.setdefault(hashlib.sha1((content or '').strip().encode('utf-8')).hexdigest(), text_id)
+        return files, hashes
+
+    def _tag_id(self, name: str) -> int:
+        tag_id = self.tag_ids.get(name)
+        if tag_id is None:
+            color = TAG_COLORS[int(hashlib.sha1(name.encode('utf-8')).hexdigest(), 16) % len(TAG_COLORS)]
+            # OR IGNORE: o app pode ter criado a mesma etiqueta enquanto a importação roda
+            created = self.db.execute(f'INSERT OR IGNORE INTO {self.target.tags} (name, color) VALUES (?, ?)',
+                                      (name, color)).rowcount
+            tag_id = self.tag_ids[name] = self.db.execute(
+                f'SELECT id FROM {self.target.tags} WHERE name = ?', (name,)).fetchone()[0]
+            if created and self.target.kind == 'app':
+                index_changes.publish(self.db, 'tag', tag_id)
+        return tag_id
+
+    def _store_text(self, item: Dict, text_id: Optional[int]) -> int:
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        content = item['content']
+        large = self.target.large_content is not None and self.target.large_content.is_large(content)
+        stored = self.target.large_content.preview(content) if large else content
+        if text_id is None:
+            text_id = self.db.execute(
+                f'INSERT INTO {self.target.texts} (title, content, created_at, updated_at) VALUES (?, ?, ?, ?)',
+                (item['title'], stored, item['created_at'], now)).lastrowid
+        else:
+            self.db.execute(f'UPDATE {self.target.texts} SET title = ?, content = ?, updated_at = ? WHERE id = ?',
+                            (item['title'], stored, now, text_id))
+            self.db.execute('DELETE FROM text_tags WHERE text_id = ?', (text_id,))
+        if self.target.large_content is not None:
+            if large:
+                self.target.large_content.store(self.db, text_id, content)
+            else:
+                self.target.large_content.delete(self.db, text_id)
+            self.target.revisions.record(self.db, text_id, item['title'], content)
+            # Os leitores do serve.py aplicam a mudança aos seus índices em memória
+            index_changes.publish(self.db, 'text', text_id)
+        self.db.executemany('INSERT OR IGNORE INTO text_tags (text_id, tag_id) VALUES (?, ?)',
+                            [(text_id, self._tag_id(tag)) for tag in item['tags']])
+        return text_id
+
+    def write_batch(self, batch: List[Dict], files: Dict, hashes: Dict[str, int]):
+        """Gravar um lote inteiro (textos, etiquetas e estado) em uma única transação"""
+        self.db.execute('BEGIN IMMEDIATE')
+        try:
+            for item in batch:
+                if 'error' in item:
+                    self.stats['failed'] += 1
+                    print(f"✗ {item['path']}: {item['error']}")
+                    continue
+                previous = files.get(item['path'])
+                previous_text = previous[2] if previous else None
+                existing = hashes.get(item['hash'])
+                if existing is not None and existing != previous_text:
+                    # Conteúdo já importado (ou criado pela API): o arquivo aponta para o mesmo texto
+                    text_id = existing
+                    self.stats['duplicates'] += 1
+                elif existing is not None:
+                    # Só a data de modificação mudou
+                    text_id = existing
+                    self.stats['unchanged'] += 1
+                else:
+                    exists = previous_text is not None and self.db.execute(
+                        f'SELECT 1 FROM {self.target.texts} WHERE id = ?', (previous_text,)).fetchone()
+                    text_id = self._store_text(item, previous_text if exists else None)
+                    hashes[item['hash']] = text_id
+                    self.stats['updated' if exists else 'created'] += 1
+                self.db.execute('''
+                    INSERT OR REPLACE INTO ingest_files (path, mtime_ns, size, content_hash, text_id)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (item['path'], item['mtime_ns'], item['size'], item['hash'], text_id))
+                files[item['path']] = (item['mtime_ns'], item['size'], text_id)
+            self.db.execute('COMMIT')
+        except BaseException:
+            self.db.execute('ROLLBACK')
+            raise
+
+    def close(self):
+        self.db.close()
+
+
+def scan(root: str) -> Iterator[Tuple[str, int, int]]:
+    """Arquivos elegíveis sob `root`, com mtime (ns) e tamanho"""
+    stack = [os.path.realpath(root)]
+    while stack:
+        try:
+            entries = list(os.scandir(stack.pop()))
+        except OSError as e:
+            print(f"⚠ {e}")
+            continue
+        for entry in entries:
+            if entry.name.startswith('.'):
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                stack.append(entry.path)
+            elif entry.name.lower().endswith(EXTENSIONS) and entry.is_file():
+                stat = entry.stat()
+                yield entry.path, stat.st_mtime_ns, stat.st_size
+
+
+def _progress(stats: Dict, total: int, started: float):
+    done = stats['seen']
+    elapsed = max(time.monotonic() - started, 1e-6)
+    rate = done / elapsed
+    remaining = (total - done) / rate if rate else 0
+    print(f"✓ {done}/{total} arquivos ({rate:.0f}/s, faltam ~{remaining:.0f}s): "
+          f"{stats['created']} novos, {stats['updated']} atualizados, "
+          f"{stats['duplicates']} duplicados, {stats['failed']} com erro", flush=True)
+
+
+def ingest(root: str, db_path: str, target: str = 'auto', workers: Optional[int] = None,
+           batch_size: int = 2000) -> Dict:
+    ingester = Ingester(db_path, target, batch_size)
+    try:
+        files, hashes = ingester.known()
+        pending = []
+        for path, mtime_ns, size in scan(root):
+            previous = files.get(path)
+            if previous and previous[:2] == (mtime_ns, size):
+                ingester.stats['unchanged'] += 1
+            else:
+                pending.append((path, mtime_ns, size))
+        print(f"✓ Esquema {ingester.target.kind}: {len(pending)} arquivos para importar "
+              f"({ingester.stats['unchanged']} sem mudança)")
+
+        started = time.monotonic()
+        batch: List[Dict] = []
+        # Cada processo recebe blocos de arquivos; a ordem dos resultados não importa
+        with Pool(workers or os.cpu_count() or 1) as pool:
+            for item in pool.imap_unordered(parse_file, pending, chunksize=64):
+                batch.append(item)
+                ingester.stats['seen'] += 1
+                if len(batch) >= batch_size:
+                    ingester.write_batch(batch, files, hashes)
+                    batch = []
+                    _progress(ingester.stats, len(pending), started)
+        if batch:
+            ingester.write_batch(batch, files, hashes)
+            _progress(ingester.stats, len(pending), started)
+        if ingester.target.kind == 'app' and (ingester.stats['created'] or ingester.stats['updated']):
+            print('⚠ Os leitores do serve.py atualizam seus índices em memória sozinhos; um app.py em um '
+                  'único processo só vê os novos textos com GTEX_INDEX_REFRESH ou depois de reiniciar')
+        return ingester.stats
+    finally:
+        ingester.close()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m src.utils.ingest',
+                                     description='Importação em massa de arquivos .md/.txt')
+    parser.add_argument('directory', help='diretório com os arquivos (percorrido recursivamente)')
+    parser.add_argument('--db', default=os.environ.get('GTEX_INGEST_DB', 'gtex.db'),
+                        help='banco SQLite do app.py ou do main.py (padrão: gtex.db)')
+    parser.add_argument('--target', choices=('auto', 'app', 'main'), default='auto',
+                        help='esquema de destino (padrão: detectar pelas tabelas)')
+    parser.add_argument('--workers', type=int, help='processos de leitura (padrão: número de CPUs)')
+    parser.add_argument('--batch', type=int, default=2000, help='arquivos por transação')
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    if not os.path.isdir(args.directory):
+        print(f"✗ Diretório não encontrado: {args.directory}")
+        return 1
+    try:
+        stats = ingest(args.directory, args.db, args.target, args.workers, max(1, args.batch))
+    except (ValueError, sqlite3.Error) as e:
+        print(f"✗ Erro na importação: {e}")
+        return 1
+    print(f"✓ Importação concluída: {stats['created']} novos, {stats['updated']} atualizados, "
+          f"{stats['duplicates']} duplicados, {stats['unchanged']} sem mudança, {stats['failed']} com erro")
+    return 1 if stats['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
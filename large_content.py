@@ -0,0 +1,159 @@
+import sqlite3
+from datetime import timedelta
+from typing import Dict, Optional
+
+# Conteúdos grandes ficam fora da linha de `texts`, em uma tabela própria lida e gravada
+# com a E/S incremental de blobs do SQLite (Connection.blobopen, Python 3.11+)
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS text_blobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    text_id INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    received INTEGER NOT NULL DEFAULT 0,
+    complete INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    body BLOB
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_text_blobs_current ON text_blobs (text_id) WHERE complete = 1;
+'''
+
+# Bloco de cópia entre a memória e o blob
+COPY_CHUNK = 1024 * 1024
+
+
+class UploadError(ValueError):
+    """Envio em partes inválido (offset fora de ordem, tamanho excedido, envio inexistente)"""
+
+
+class LargeContentStore:
+    """Conteúdo de textos acima de `threshold` bytes guardado em `text_blobs`.
+
+    A coluna `texts.content` de um texto grande guarda só uma prévia de
+    `preview_chars` caracteres, então listagens e buscas varrem linhas
+    pequenas; o corpo completo fica em uma linha de `text_blobs` (a de
+    complete = 1) e é lido por faixas sem carregar o blob inteiro.
+
+    Envios em partes criam uma linha com complete = 0 e zeroblob(size);
+    cada parte é gravada no lugar, na ordem, e `received` permite retomar
+    um envio interrompido. Ao completar, a linha passa a ser a atual do
+    texto e a anterior é apagada.
+
+    Os métodos recebem a conexão da requisição e não fazem commit: quem
+    chama grava junto as mudanças em `texts`.
+    """
+
+    def __init__(self, threshold: int = 256 * 1024, preview_chars: int = 2000):
+        self.threshold = threshold
+        self.preview_chars = preview_chars
+
+    def is_large(self, content: str) -> bool:
+        # Só codifica quando o número de caracteres não decide sozinho (UTF-8 usa até 4 bytes)
+        if len(content) > self.threshold:
+            return True
+        return len(content) * 4 > self.threshold and len(content.encode('utf-8')) > self.threshold
+
+    def preview(self, content: str) -> str:
+        return content[:self.preview_chars]
+
+    # Gravação
+
+    def _allocate(self, db: sqlite3.Connection, text_id: int, size: int) -> int:
+        cursor = db.execute('INSERT INTO text_blobs (text_id, size, body) VALUES (?, ?, zeroblob(?))',
+                            (text_id, size, size))
+        return cursor.lastrowid
+
+    def _activate(self, db: sqlite3.Connection, text_id: int, blob_id: int):
+        db.execute('DELETE FROM text_blobs WHERE text_id = ? AND complete = 1', (text_id,))
+        db.execute('UPDATE text_blobs SET complete = 1, received = size WHERE id = ?', (blob_id,))
+
+    def store(self, db: sqlite3.Connection, text_id: int, content: str) -> str:
+        """Guardar o conteúdo completo de um texto grande; devolve a prévia para `texts.content`"""
+        data = content.encode('utf-8')
+        blob_id = self._allocate(db, text_id, len(data))
+        with db.blobopen('text_blobs', 'body', blob_id) as blob:
+            view = memoryview(data)
+            for first in range(0, len(data), COPY_CHUNK):
+                blob.write(view[first:first + COPY_CHUNK])
+        self._activate(db, text_id, blob_id)
+        return self.preview(content)
+
+    def delete(self, db: sqlite3.Connection, text_id: int):
+        """Apagar o conteúdo guardado e os envios pendentes de um texto"""
+        db.execute('DELETE FROM text_blobs WHERE text_id = ?', (text_id,))
+
+    # Leitura
+
+    def _current(self, db: sqlite3.Connection, text_id: int) -> Optional[tuple]:
+        return db.execute('SELECT id, size FROM text_blobs WHERE text_id = ? AND complete = 1',
+                          (text_id,)).fetchone()
+
+    def size(self, db: sqlite3.Connection, text_id: int) -> Optional[int]:
+        row = self._current(db, text_id)
+        return row[1] if row else None
+
+    def read(self, db: sqlite3.Connection, text_id: int, offset: int = 0,
+             length: Optional[int] = None) -> Optional[bytes]:
+        """Bytes [offset, offset + length) do conteúdo guardado, ou None se o texto não é grande"""
+        row = self._current(db, text_id)
+        if row is None:
+            return None
+        blob_id, size = row
+        offset = min(max(0, offset), size)
+        length = size - offset if length is None else max(0, min(length, size - offset))
+        with db.blobopen('text_blobs', 'body', blob_id, readonly=True) as blob:
+            blob.seek(offset)
+            return blob.read(length)
+
+    def read_text(self, db: sqlite3.Connection, text_id: int) -> Optional[str]:
+        data = self.read(db, text_id)
+        return None if data is None else data.decode('utf-8', errors='replace')
+
+    def read_preview(self, db: sqlite3.Connection, text_id: int) -> Optional[str]:
+        # Um caractere tem no máximo 4 bytes; um caractere cortado no fim é descartado
+        data = self.read(db, text_id, 0, self.preview_chars * 4)
+        return None if data is None else data.decode('utf-8', errors='ignore')[:self.preview_chars]
+
+    # Envio em partes
+
+    def begin_upload(self, db: sqlite3.Connection, text_id: int, size: int) -> Dict:
+        if size < 0:
+            raise UploadError('Tamanho inválido')
+        upload_id = self._allocate(db, text_id, size)
+        return {'upload_id': upload_id, 'size': size, 'received': 0, 'complete': False}
+
+    def upload_status(self, db: sqlite3.Connection, text_id: int, upload_id: int) -> Optional[Dict]:
+        row = db.execute('SELECT size, received, complete FROM text_blobs WHERE id = ? AND text_id = ?',
+                         (upload_id, text_id)).fetchone()
+        if row is None:
+            return None
+        return {'upload_id': upload_id, 'size': row[0], 'received': row[1], 'complete': bool(row[2])}
+
+    def write_chunk(self, db: sqlite3.Connection, text_id: int, upload_id: int, offset: int,
+                    data: bytes) -> Dict:
+        """Gravar uma parte em `offset`, que deve ser igual ao total já recebido"""
+        status = self.upload_status(db, text_id, upload_id)
+        if status is None or status['complete']:
+            raise UploadError('Envio não encontrado')
+        if offset != status['received']:
+            raise UploadError(f"Offset esperado: {status['received']}")
+        if offset + len(data) > status['size']:
+            raise UploadError('A parte ultrapassa o tamanho declarado')
+
+        # O UPDATE abre a transação: contador e bytes são gravados juntos
+        db.execute('UPDATE text_blobs SET received = ? WHERE id = ?', (offset + len(data), upload_id))
+        with db.blobopen('text_blobs', 'body', upload_id) as blob:
+            blob.seek(offset)
+            blob.write(data)
+        status['received'] = offset + len(data)
+        if status['received'] == status['size']:
+            self._activate(db, text_id, upload_id)
+            status['complete'] = True
+        return status
+
+    def prune_uploads(self, db: sqlite3.Connection, max_age: timedelta = timedelta(days=1)) -> int:
+        """Apagar envios incompletos mais antigos que `max_age`"""
+        # created_at usa CURRENT_TIMESTAMP (UTC): a comparação fica toda no SQLite
+        cursor = db.execute("DELETE FROM text_blobs WHERE complete = 0 AND created_at < datetime('now', ?)",
+                            (f'-{int(max_age.total_seconds())} seconds',))
+        return cursor.rowcount
@@ -1,5 +1,6 @@
-from flask import Flask, send_from_directory, jsonify
+from flask import Flask, send_from_directory, jsonify, request, Response, stream_with_context, g
 from flask_cors import CORS
+import json
 import os
 import sys
 
@@ -14,7 +15,9 @@ CORS(app)
 
 # Configuração do banco de dados - usando arquivo persistente robusto
 import os
-db_path = os.path.join(os.path.dirname(__file__), 'database', 'gtex_persistent.db')
+# GTEX_DATA_DIR permite apontar banco e backups para outro diretório (ex.: benchmarks)
+data_dir = os.environ.get('GTEX_DATA_DIR', os.path.dirname(__file__))
+db_path = os.path.join(data_dir, 'database', 'gtex_persistent.db')
 os.makedirs(os.path.dirname(db_path), exist_ok=True)
 
 app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{db_path}"
@@ -31,13 +34,69 @@ app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
 }
 
 # Importar e inicializar modelos
-from src.models.text import db, Text, Tag
+from src.models.text import db, Text, Tag, text_tags
 db.init_app(app)
 
+# Modo multi-tenant (GTEX_TENANT_DIR): cada tenant, indicado pelo cabeçalho X-Gtex-Tenant,
+# tem seu próprio arquivo SQLite e a sessão do SQLAlchemy usa a engine dele
+tenant_router = None
+if os.environ.get('GTEX_TENANT_DIR'):
+    from src.utils.tenant_router import (TENANT_HEADER, TenantEngines, TenantError, TenantRouter,
+                                         install_tenant_session, schema_from_metadata)
+    tenant_router = TenantRouter(
+        os.environ['GTEX_TENANT_DIR'],
+        schema=schema_from_metadata(db.metadata),
+        pragmas=('journal_mode=WAL', 'synchronous=NORMAL', 'cache_size=10000')
+    )
+    install_tenant_session(app, db, TenantEngines(
+        tenant_router,
+        max_engines=int(os.environ.get('GTEX_TENANT_MAX_OPEN', 64)),
+        engine_options=app.config['SQLALCHEMY_ENGINE_OPTIONS']
+    ))
+
+    @app.before_request
+    def select_tenant():
+        if not request.path.startswith('/api/'):
+            return None
+        try:
+            g.tenant = TenantRouter.validate(request.headers.get(TENANT_HEADER, ''))
+        except TenantError as e:
+            return jsonify({'error': str(e)}), 400
+
 # Importar rotas
 from src.routes.text import text_bp
 app.register_blueprint(text_bp, url_prefix='/api')
 
+# Métricas opcionais (GTEX_METRICS=1): latência, consultas SQL por rota e /metrics para o Prometheus
+request_metrics = None
+if os.environ.get('GTEX_METRICS', '').lower() in ('1', 'true', 'yes'):
+    from src.utils.request_metrics import RequestMetrics
+    request_metrics = RequestMetrics(app, n_plus_one_threshold=int(os.environ.get('GTEX_N_PLUS_ONE_THRESHOLD', 20)))
+
+# Consultas acima de GTEX_SLOW_QUERY_MS são registradas com parâmetros e EXPLAIN QUERY PLAN
+slow_query_log = None
+if os.environ.get('GTEX_SLOW_QUERY_MS'):
+    from src.utils.profiling import SlowQueryLog
+    slow_query_log = SlowQueryLog(float(os.environ['GTEX_SLOW_QUERY_MS']))
+
+# Perfil sob demanda (GTEX_PROFILING=1): cabeçalho X-Gtex-Profile com GTEX_PROFILE_TOKEN
+# ou caminhos listados em GTEX_PROFILE_PATHS
+if os.environ.get('GTEX_PROFILING', '').lower() in ('1', 'true', 'yes'):
+    from src.utils.profiling import RequestProfiler
+    app.wsgi_app = RequestProfiler(
+        app.wsgi_app,
+        os.environ.get('GTEX_PROFILE_DIR', os.path.join(data_dir, 'profiles')),
+        keep=int(os.environ.get('GTEX_PROFILE_KEEP', 50)),
+        token=os.environ.get('GTEX_PROFILE_TOKEN'),
+        allow_paths=os.environ.get('GTEX_PROFILE_PATHS', '').split(',')
+    )
+
+# Controle de admissão (desligado com GTEX_ADMISSION=0): vagas e filas curtas por classe de rota.
+# Sem vaga dentro do prazo a resposta é 429/503 com Retry-After, em vez de a thread esperar
+# o lock do SQLite; leituras são atendidas antes das escritas quando as vagas acabam
+from src.utils.admission import install_from_env as install_admission
+install_admission(app)
+
 # Inicializar banco de dados com sistema simplificado mas robusto
 with app.app_context():
     try:
@@ -55,10 +114,18 @@ with app.app_context():
             cursor.execute("PRAGMA cache_size=10000")
             cursor.close()
         
+        if request_metrics is not None:
+            request_metrics.instrument_engine(db.engine)
+        if slow_query_log is not None:
+            slow_query_log.instrument_engine(db.engine)
+        
         db.create_all()
         
         # Inicializar sistema definitivo de forma assíncrona
-        ultimate_manager = UltimateDataManager(os.path.join(os.path.dirname(__file__), 'ultimate_storage', 'gtex_ultimate.db'))
+        ultimate_manager = UltimateDataManager(
+            os.path.join(data_dir, 'ultimate_storage', 'gtex_ultimate.db'),
+            use_oplog=True
+        )
         
         # Se ainda não há dados, criar dados iniciais
         if Tag.query.count() == 0:
@@ -115,6 +182,105 @@ with app.app_context():
         # Disponibilizar o manager globalmente
         app.ultimate_manager = ultimate_manager
         
+        # Concluir gravações das camadas que ainda rodam em segundo plano
+        import atexit
+        atexit.register(ultimate_manager.close)
+        
+        # Salvamento automático agrupado: uma rajada de edições vira um único save
+        from src.utils.autosave import DebouncedSaver
+        
+        # Ids dos textos gravados desde o último snapshot, para o log de operações comparar só
+        # esses. None no conjunto: não dá para saber quais mudaram (etiqueta renomeada ou
+        # removida, escrita em lote ou em SQL direto) e o próximo salvamento compara tudo.
+        import threading
+        from sqlalchemy.sql.elements import TextClause
+        changed_texts = {None}
+        changed_lock = threading.Lock()
+        
+        @event.listens_for(db.session, 'after_flush')
+        def track_flushed_texts(session, flush_context):
+            ids = session.info.setdefault('gtex_changed_texts', set())
+            for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+                if isinstance(obj, Text):
+                    ids.add(obj.id)
+                elif isinstance(obj, Tag) and (obj in session.deleted or (
+                        obj not in session.new and session.is_modified(obj, include_collections=False))):
+                    ids.add(None)
+        
+        @event.listens_for(db.session, 'do_orm_execute')
+        def track_bulk_writes(state):
+            statement = state.statement
+            if state.is_insert or state.is_update or state.is_delete or (
+                    isinstance(statement, TextClause) and not statement.text.lstrip().upper().startswith('SELECT')):
+                state.session.info.setdefault('gtex_changed_texts', set()).add(None)
+        
+        # No rollback os ids também contam: com isolation_level None cada comando já foi
+        # efetivado, e um id a mais só custa uma comparação
+        @event.listens_for(db.session, 'after_commit')
+        @event.listens_for(db.session, 'after_rollback')
+        def publish_changed_texts(session):
+            ids = session.info.pop('gtex_changed_texts', None)
+            if ids:
+                with changed_lock:
+                    changed_texts.update(ids)
+        
+        def current_snapshot():
+            """Textos e etiquetas lidos em uma única consulta com JOIN, mais os ids dos textos
+            alterados desde o snapshot anterior (None se desconhecidos)"""
+            from sqlalchemy import select
+            with changed_lock:
+                changed = None if None in changed_texts else set(changed_texts)
+                changed_texts.clear()
+            try:
+                with app.app_context():
+                    rows = db.session.execute(
+                        select(Text.id, Text.title, Text.content, Text.created_at, Text.updated_at,
+                               Tag.id.label('tag_id'), Tag.name.label('tag_name'), Tag.color.label('tag_color'))
+                        .outerjoin(text_tags, text_tags.c.text_id == Text.id)
+                        .outerjoin(Tag, Tag.id == text_tags.c.tag_id)
+                        .order_by(Text.id)
+                    )
+                    texts = []
+                    for row in rows:
+                        if not texts or texts[-1]['id'] != row.id:
+                            texts.append({
+                                'id': row.id,
+                                'title': row.title,
+                                'content': row.content,
+                                'created_at': row.created_at.isoformat() if row.created_at else None,
+                                'updated_at': row.updated_at.isoformat() if row.updated_at else None,
+                                'tags': []
+                            })
+                        if row.tag_id is not None:
+                            # Sem text_count: um dado derivado mudaria o snapshot de todo texto da etiqueta
+                            texts[-1]['tags'].append({'id': row.tag_id, 'name': row.tag_name,
+                                                      'color': row.tag_color})
+                    tags = [{'id': row.id, 'name': row.name, 'color': row.color}
+                            for row in db.session.execute(select(Tag.id, Tag.name, Tag.color))]
+            except Exception:
+                with changed_lock:
+                    changed_texts.update(changed if changed is not None else {None})
+                raise
+            return texts, tags, changed
+        
+        app.autosaver = DebouncedSaver(
+            lambda texts, tags, changed=None: ultimate_manager.save_data(texts, tags, changed=changed),
+            current_snapshot,
+            window=float(os.environ.get('GTEX_AUTOSAVE_WINDOW', 2.0)),
+            max_delay=float(os.environ.get('GTEX_AUTOSAVE_MAX_DELAY', 10.0))
+        )
+        # Registrado depois do manager: o atexit roda em ordem inversa, então o
+        # último salvamento acontece antes de as camadas serem encerradas
+        atexit.register(app.autosaver.close)
+        
+        # Snapshots a quente do banco principal (API de backup online do SQLite)
+        from src.utils.sqlite_snapshot import SQLiteSnapshotManager
+        app.snapshot_manager = SQLiteSnapshotManager(
+            db_path,
+            os.path.join(data_dir, 'backups', 'snapshots'),
+            keep=int(os.environ.get('GTEX_SNAPSHOT_KEEP', 5))
+        )
+        
         print("🎉 Sistema definitivo inicializado rapidamente!")
         
     except Exception as e:
@@ -126,6 +292,16 @@ with app.app_context():
         except Exception as e2:
             print(f"❌ Erro no fallback: {e2}")
 
+@app.after_request
+def schedule_autosave(response):
+    """Agendar o salvamento nas camadas após qualquer escrita bem-sucedida na API"""
+    autosaver = getattr(app, 'autosaver', None)
+    # As camadas guardam o banco principal; bancos de tenant têm backup próprio (tenant_router)
+    if (autosaver is not None and not g.get('tenant') and request.method in ('POST', 'PUT', 'PATCH', 'DELETE')
+            and request.path.startswith('/api/') and response.status_code < 400):
+        autosaver.request_save()
+    return response
+
 @app.route('/api/backup', methods=['POST', 'GET'])
 def backup_data():
     """Endpoint para backup e restauração de dados"""
@@ -134,7 +310,7 @@ def backup_data():
             backup_data = request.get_json()
             
             # Salvar backup em arquivo no servidor (backup local)
-            backup_dir = os.path.join(os.path.dirname(__file__), 'backups')
+            backup_dir = os.path.join(data_dir, 'backups')
             os.makedirs(backup_dir, exist_ok=True)
             
             backup_file = os.path.join(backup_dir, 'gtex_backup.json')
@@ -144,11 +320,18 @@ def backup_data():
             # Tentar salvar no GitHub também (backup na nuvem)
             try:
                 from src.utils.github_backup import github_backup
-                github_result = github_backup.save_to_github(backup_data)
+                
+                # Atualizar o mesmo Gist, enviando só os shards que mudaram
+                gist_file = os.path.join(backup_dir, 'gist_id.txt')
+                gist_id = None
+                if os.path.exists(gist_file):
+                    with open(gist_file, 'r') as f:
+                        gist_id = f.read().strip() or None
+                github_backup.state_file = os.path.join(backup_dir, 'gist_state.json')
+                github_result = github_backup.save_to_github(backup_data, gist_id=gist_id)
                 
                 if github_result['success']:
                     # Salvar o ID do Gist para futuras consultas
-                    gist_file = os.path.join(backup_dir, 'gist_id.txt')
                     with open(gist_file, 'w') as f:
                         f.write(github_result['gist_id'])
                     
@@ -176,7 +359,7 @@ def backup_data():
     else:  # GET
         try:
             # Tentar carregar do GitHub primeiro
-            backup_dir = os.path.join(os.path.dirname(__file__), 'backups')
+            backup_dir = os.path.join(data_dir, 'backups')
             gist_file = os.path.join(backup_dir, 'gist_id.txt')
             
             if os.path.exists(gist_file):
@@ -206,6 +389,137 @@ def backup_data():
         except Exception as e:
             return jsonify({'error': str(e)}), 500
 
+@app.route('/api/backup/stream', methods=['GET', 'POST'])
+def backup_stream():
+    """Backup/restauração em NDJSON (um registro por linha), em memória constante"""
+    from src.utils.streaming_backup import header_record, iter_batches
+    from sqlalchemy import bindparam, text as sql_text
+    
+    if request.method == 'GET':
+        def generate():
+            yield json.dumps(header_record('gtex_persistent'), ensure_ascii=False, separators=(',', ':')) + '\n'
+            
+            tag_names = {}
+            for row in db.session.execute(sql_text("SELECT id, name, color FROM tag ORDER BY id")):
+                tag_names[row.id] = row.name
+                yield json.dumps({'type': 'tag', 'id': row.id, 'name': row.name, 'color': row.color},
+                                 ensure_ascii=False, separators=(',', ':')) + '\n'
+            
+            rows = db.session.execute(
+                sql_text("""
+                    SELECT t.id, t.title, t.content, t.created_at, t.updated_at,
+                           (SELECT GROUP_CONCAT(tt.tag_id) FROM text_tags tt WHERE tt.text_id = t.id) AS tag_ids
+                    FROM text t ORDER BY t.id
+                """),
+                execution_options={'yield_per': 1000}
+            )
+            for row in rows:
+                tag_ids = [int(i) for i in row.tag_ids.split(',')] if row.tag_ids else []
+                record = {
+                    'type': 'text',
+                    'id': row.id,
+                    'title': row.title,
+                    'content': row.content,
+                    'created_at': str(row.created_at) if row.created_at else None,
+                    'updated_at': str(row.updated_at) if row.updated_at else None,
+                    'tags': [tag_names[i] for i in tag_ids if i in tag_names]
+                }
+                yield json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n'
+        
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    
+    # POST: importar lendo o corpo da requisição linha a linha
+    try:
+        if request.headers.get('Content-Encoding') == 'gzip':
+            import gzip
+            lines = gzip.GzipFile(fileobj=request.stream)
+        else:
+            lines = request.stream
+        
+        def records():
+            for line in lines:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+        
+        # Mesma semântica de streaming_backup.import_sqlite: textos com o mesmo id são
+        # substituídos (reimportar o mesmo backup não duplica nada) e etiquetas casam pelo nome
+        stats = {'texts': 0, 'tags': 0}
+        tag_ids = {row.name: row.id for row in db.session.execute(sql_text("SELECT id, name FROM tag"))}
+        
+        for batch in iter_batches(records(), 1000):
+            tags = [record for record in batch if record.get('type') == 'tag']
+            texts = [record for record in batch if record.get('type') == 'text']
+            
+            if tags:
+                db.session.execute(
+                    sql_text("INSERT INTO tag (name, color) VALUES (:name, :color) "
+                             "ON CONFLICT(name) DO UPDATE SET color = excluded.color"),
+                    [{'name': record['name'], 'color': record['color']} for record in tags]
+                )
+                new_names = list({record['name'] for record in tags} - tag_ids.keys())
+                if new_names:
+                    tag_ids.update((row.name, row.id) for row in db.session.execute(
+                        sql_text("SELECT id, name FROM tag WHERE name IN :names")
+                        .bindparams(bindparam('names', expanding=True)),
+                        {'names': new_names}
+                    ))
+                stats['tags'] += len(tags)
+            
+            with_id = [record for record in texts if record.get('id') is not None]
+            if with_id:
+                db.session.execute(
+                    sql_text("INSERT INTO text (id, title, content, created_at, updated_at) "
+                             "VALUES (:id, :title, :content, COALESCE(:created_at, CURRENT_TIMESTAMP), "
+                             "COALESCE(:updated_at, CURRENT_TIMESTAMP)) "
+                             "ON CONFLICT(id) DO UPDATE SET title = excluded.title, content = excluded.content, "
+                             "created_at = excluded.created_at, updated_at = excluded.updated_at"),
+                    [{'id': record['id'], 'title': record['title'], 'content': record['content'],
+                      'created_at': record.get('created_at'), 'updated_at': record.get('updated_at')}
+                     for record in with_id]
+                )
+                db.session.execute(sql_text("DELETE FROM text_tags WHERE text_id = :id"),
+                                   [{'id': record['id']} for record in with_id])
+            for record in texts:
+                if record.get('id') is None:
+                    result = db.session.execute(
+                        Text.__table__.insert().values(title=record['title'], content=record['content'])
+                    )
+                    record['id'] = result.inserted_primary_key[0]
+            
+            links = [{'text_id': record['id'], 'tag_id': tag_ids[name]}
+                     for record in texts for name in record.get('tags', []) if name in tag_ids]
+            if links:
+                db.session.execute(
+                    sql_text("INSERT OR IGNORE INTO text_tags (text_id, tag_id) VALUES (:text_id, :tag_id)"),
+                    links
+                )
+            stats['texts'] += len(texts)
+            db.session.commit()
+        
+        return jsonify({'success': True, **stats})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/snapshots', methods=['POST', 'GET'])
+def snapshots():
+    """Criar (POST) ou listar (GET) snapshots do banco principal"""
+    manager = getattr(app, 'snapshot_manager', None)
+    if manager is None:
+        return jsonify({'error': 'Snapshots indisponíveis'}), 503
+    
+    if request.method == 'POST':
+        snapshot_path = manager.create_snapshot()
+        if snapshot_path is None:
+            return jsonify({'error': 'Falha ao criar snapshot'}), 500
+        return jsonify({'success': True, 'snapshot': os.path.basename(snapshot_path), **manager.status()}), 201
+    
+    return jsonify({
+        'snapshots': [os.path.basename(p) for p in manager.list_snapshots()],
+        **manager.status()
+    })
+
 @app.route('/api/reset-data', methods=['POST'])
 def reset_data():
     """Endpoint para recriar dados iniciais"""
@@ -0,0 +1,271 @@
+import threading
+from itertools import chain, islice
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from src.utils.suggest_index import fold
+
+EMPTY = np.uint32(0xFFFFFFFF)
+_MIX = np.uint64(0x100000001B3)
+
+
+def _union_find_roots(pairs: np.ndarray) -> Dict[int, int]:
+    """Componente (menor membro) de cada item que aparece nos pares"""
+    parent: Dict[int, int] = {}
+
+    def find(item: int) -> int:
+        parent.setdefault(item, item)
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]
+            item = parent[item]
+        return item
+
+    for a, b in pairs.tolist():
+        root_a, root_b = find(a), find(b)
+        if root_a != root_b:
+            parent[max(root_a, root_b)] = min(root_a, root_b)
+    return {item: find(item) for item in parent}
+
+
+class MinHashIndex:
+    """Assinaturas MinHash do conteúdo dos textos, com busca por LSH (bandas).
+
+    O conteúdo é normalizado (minúsculas, sem acentos) e quebrado em
+    shingles de `shingle_size` palavras. As assinaturas são calculadas em
+    lotes com NumPy e ficam em um único array (linhas, num_perm) uint32;
+    cada assinatura é dividida em `bands` bandas, e dois textos são
+    candidatos quando alguma banda coincide. A similaridade de Jaccard é
+    estimada pela fração de posições iguais das assinaturas.
+
+    Os hashes das palavras usam hash() do Python, que muda a cada processo:
+    as assinaturas só valem dentro do processo e não devem ser gravadas.
+    """
+
+    def __init__(self, num_perm: int = 128, bands: int = 32, shingle_size: int = 3, seed: int = 1,
+                 batch_size: int = 1000):
+        if num_perm % bands:
+            raise ValueError('num_perm deve ser múltiplo de bands')
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows_per_band = num_perm // bands
+        self.shingle_size = shingle_size
+        self.batch_size = batch_size
+
+        rng = np.random.default_rng(seed)
+        # Hash multiply-shift: ((a * x + b) mod 2^64) >> 32, com `a` ímpar
+        self._a = rng.integers(1, 2 ** 63, size=num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self._b = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)
+        self._band_mix = rng.integers(1, 2 ** 63, size=self.rows_per_band, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+
+        self._lock = threading.RLock()
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._signatures = np.zeros((0, num_perm), dtype=np.uint32)
+        self._band_keys = np.zeros((0, bands), dtype=np.uint64)
+        self._empty = np.zeros(0, dtype=bool)
+        self._rows: Dict[int, int] = {}
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, text_id: int) -> bool:
+        return text_id in self._rows
+
+    # Assinaturas
+
+    def shingles(self, contents: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Hashes uint64 dos shingles de palavras de um lote, em ordem de texto, e quantos há por texto.
+
+        Um texto com menos de `shingle_size` palavras vira um único shingle
+        com as palavras que tem; um texto sem palavras não tem shingles.
+        """
+        words = [fold(content).split() for content in contents]
+        counts = np.fromiter((len(item) for item in words), dtype=np.int64, count=len(words))
+        total = int(counts.sum())
+        hashes = np.fromiter(map(hash, chain.from_iterable(words)), dtype=np.int64, count=total).view(np.uint64)
+
+        # Combinação polinomial das palavras de cada janela (a ordem importa), calculada
+        # para todas as posições do lote de uma vez
+        combined = hashes.copy()
+        for offset in range(1, self.shingle_size):
+            combined[:total - offset] = combined[:total - offset] * _MIX ^ hashes[offset:]
+
+        ends = np.cumsum(counts)
+        document = np.repeat(np.arange(len(words)), counts)
+        valid = np.arange(total) + self.shingle_size <= np.repeat(ends, counts)
+        # Textos curtos: a janela inteira passaria do fim do texto; o shingle usa só as suas palavras
+        for position in np.flatnonzero((counts > 0) & (counts < self.shingle_size)).tolist():
+            first = int(ends[position] - counts[position])
+            value = hashes[first]
+            with np.errstate(over='ignore'):
+                for word_hash in hashes[first + 1:ends[position]]:
+                    value = value * _MIX ^ word_hash
+            combined[first] = value
+            valid[first] = True
+
+        return combined[valid], np.bincount(document[valid], minlength=len(words))
+
+    def signatures(self, contents: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Assinaturas (n, num_perm) de um lote de conteúdos e a máscara dos vazios"""
+        shingles, lengths = self.shingles(contents)
+        empty = lengths == 0
+        result = np.full((len(contents), self.num_perm), EMPTY, dtype=np.uint32)
+        if empty.all():
+            return result, empty
+
+        starts = np.concatenate(([0], np.cumsum(lengths[~empty])[:-1]))
+        # Blocos de permutações para limitar a memória do produto (perms x shingles)
+        step = max(1, 4_000_000 // max(1, len(shingles)))
+        with np.errstate(over='ignore'):
+            for first in range(0, self.num_perm, step):
+                a = self._a[first:first + step, None]
+                b = self._b[first:first + step, None]
+                hashed = a * shingles[None, :]
+                hashed += b
+                hashed >>= np.uint64(32)
+                result[~empty, first:first + step] = np.minimum.reduceat(hashed, starts, axis=1).T
+        return result, empty
+
+    def _band_keys_of(self, signatures: np.ndarray) -> np.ndarray:
+        shaped = signatures.reshape(len(signatures), self.bands, self.rows_per_band).astype(np.uint64)
+        with np.errstate(over='ignore'):
+            return (shaped * self._band_mix).sum(axis=2, dtype=np.uint64)
+
+    # Atualização
+
+    def _reserve(self, extra: int):
+        needed = self._size + extra
+        if needed <= len(self._ids):
+            return
+        capacity = max(needed, 2 * len(self._ids), 1024)
+        for name in ('_ids', '_signatures', '_band_keys', '_empty'):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self._size] = old[:self._size]
+            setattr(self, name, new)
+
+    def _store(self, ids: List[int], contents: List[str]):
+        signatures, empty = self.signatures(contents)
+        band_keys = self._band_keys_of(signatures)
+        with self._lock:
+            self._reserve(len(ids))
+            for position, text_id in enumerate(ids):
+                row = self._rows.get(text_id)
+                if row is None:
+                    row = self._rows[text_id] = self._size
+                    self._size += 1
+                self._ids[row] = text_id
+                self._signatures[row] = signatures[position]
+                self._band_keys[row] = band_keys[position]
+                self._empty[row] = empty[position]
+
+    def update_many(self, items: Iterable[Tuple[int, str]]):
+        """Incluir ou atualizar textos (id, conteúdo) em lotes de `batch_size`"""
+        iterator = iter(items)
+        while True:
+            batch = list(islice(iterator, self.batch_size))
+            if not batch:
+                break
+            self._store([text_id for text_id, _ in batch], [content or '' for _, content in batch])
+
+    def update(self, text_id: int, content: str):
+        self._store([text_id], [content or ''])
+
+    def remove(self, text_id: int):
+        with self._lock:
+            row = self._rows.pop(text_id, None)
+            if row is None:
+                return
+            last = self._size - 1
+            if row != last:
+                # A última linha ocupa a vaga: o array continua compacto
+                moved = int(self._ids[last])
+                for array in (self._ids, self._signatures, self._band_keys, self._empty):
+                    array[row] = array[last]
+                self._rows[moved] = row
+            self._size -= 1
+
+    # Consultas
+
+    def similarity(self, first_id: int, second_id: int) -> float:
+        with self._lock:
+            first, second = self._signatures[self._rows[first_id]], self._signatures[self._rows[second_id]]
+            return float(np.mean(first == second))
+
+    def similar(self, text_id: int, threshold: float = 0.5, limit: int = 10) -> List[Tuple[int, float]]:
+        """Textos que compartilham alguma banda com `text_id` e têm similaridade >= threshold"""
+        with self._lock:
+            row = self._rows[text_id]
+            if self._empty[row]:
+                return []
+            size = self._size
+            matches = (self._band_keys[:size] == self._band_keys[row]).any(axis=1)
+            matches[row] = False
+            matches &= ~self._empty[:size]
+            candidates = np.flatnonzero(matches)
+            scores = (self._signatures[candidates] == self._signatures[row]).mean(axis=1)
+            ids = self._ids[candidates]
+
+        keep = scores >= threshold
+        order = np.argsort(-scores[keep], kind='stable')[:limit]
+        return [(int(ids[keep][i]), float(scores[keep][i])) for i in order]
+
+    def duplicate_groups(self, threshold: float = 0.8, max_bucket: int = 1000) -> List[Dict]:
+        """Grupos de quase-duplicatas do corpus inteiro, sem comparar todos os pares.
+
+        Em cada banda os textos são ordenados pela chave e só os de um mesmo
+        balde viram pares candidatos; baldes maiores que `max_bucket`
+        (conteúdo muito repetido, ex.: modelos) são ignorados.
+        """
+        with self._lock:
+            size = self._size
+            valid = np.flatnonzero(~self._empty[:size])
+            band_keys = self._band_keys[valid]
+            signatures = self._signatures[valid]
+            ids = self._ids[valid].copy()
+
+        pairs = []
+        for band in range(self.bands):
+            keys = band_keys[:, band]
+            order = np.argsort(keys, kind='stable')
+            sorted_keys = keys[order]
+            boundaries = np.flatnonzero(np.diff(sorted_keys)) + 1
+            starts = np.concatenate(([0], boundaries))
+            ends = np.concatenate((boundaries, [len(sorted_keys)]))
+            for start, end in zip(starts[(ends - starts) > 1], ends[(ends - starts) > 1]):
+                if end - start > max_bucket:
+                    continue
+                members = order[start:end]
+                first, second = np.triu_indices(len(members), 1)
+                pairs.append(np.stack((members[first], members[second]), axis=1))
+        if not pairs:
+            return []
+
+        pairs = np.unique(np.sort(np.concatenate(pairs), axis=1), axis=0)
+        scores = np.empty(len(pairs))
+        for first in range(0, len(pairs), 100_000):
+            chunk = pairs[first:first + 100_000]
+            scores[first:first + 100_000] = (signatures[chunk[:, 0]] == signatures[chunk[:, 1]]).mean(axis=1)
+        confirmed = pairs[scores >= threshold]
+        pair_scores = scores[scores >= threshold]
+
+        roots = _union_find_roots(confirmed)
+        members: Dict[int, List[int]] = {}
+        for item, root in roots.items():
+            members.setdefault(root, []).append(int(ids[item]))
+        # Similaridade mínima e máxima dos pares confirmados de cada grupo
+        pair_roots = np.fromiter((roots[a] for a in confirmed[:, 0].tolist()), dtype=np.int64,
+                                 count=len(confirmed))
+        order = np.argsort(pair_roots, kind='stable')
+        group_roots, starts = np.unique(pair_roots[order], return_index=True)
+        lowest = np.minimum.reduceat(pair_scores[order], starts)
+        highest = np.maximum.reduceat(pair_scores[order], starts)
+
+        groups = [{
+            'ids': sorted(members[int(root)]),
+            'min_similarity': float(low),
+            'max_similarity': float(high)
+        } for root, low, high in zip(group_roots, lowest, highest)]
+        groups.sort(key=lambda group: (-len(group['ids']), group['ids'][0]))
+        return groups
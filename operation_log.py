@@ -0,0 +1,323 @@
+import hashlib
+import json
+import os
+import struct
+import threading
+import zlib
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Cada registro: tamanho (4 bytes) + CRC32 (4 bytes) + JSON compacto
+RECORD_HEADER = struct.Struct('>II')
+SNAPSHOT_FILE = 'snapshot.gtxs'
+SEGMENT_PREFIX = 'oplog_'
+SEGMENT_SUFFIX = '.log'
+
+
+def _encode(record: Dict) -> bytes:
+    payload = json.dumps(record, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8')
+    return RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def read_segment(path: str) -> Tuple[List[Dict], int]:
+    """Ler os registros válidos de um segmento.
+
+    Devolve os registros e o offset do fim do último registro íntegro; um
+    registro truncado ou com checksum errado encerra a leitura (escrita
+    interrompida no meio).
+    """
+    records = []
+    valid_end = 0
+    with open(path, 'rb') as f:
+        data = f.read()
+    offset = 0
+    while offset + RECORD_HEADER.size <= len(data):
+        length, checksum = RECORD_HEADER.unpack_from(data, offset)
+        start = offset + RECORD_HEADER.size
+        payload = data[start:start + length]
+        if len(payload) < length or zlib.crc32(payload) != checksum:
+            break
+        records.append(json.loads(payload.decode('utf-8')))
+        offset = start + length
+        valid_end = offset
+    return records, valid_end
+
+
+def _text_hash(text: Dict) -> str:
+    payload = json.dumps(text, ensure_ascii=False, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+class OperationLogStore:
+    """Armazenamento log-structured para textos e etiquetas.
+
+    Cada mutação vira um registro anexado ao segmento atual. A cada
+    `compact_every` registros o estado é gravado em um snapshot e um novo
+    segmento é iniciado; a recuperação lê o snapshot e reaplica apenas a
+    cauda do log.
+
+    Em memória ficam só o hash de cada texto, as etiquetas e os textos
+    gravados desde o último snapshot; o conteúdo dos demais é lido do
+    snapshot quando preciso (load e compactação).
+    """
+
+    def __init__(self, directory: str, compact_every: int = 1000):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.compact_every = compact_every
+        self._lock = threading.Lock()
+        self.tags = {}
+        self._hashes = {}
+        # Textos alterados desde o snapshot: chave -> dados (None se removido)
+        self._tail = {}
+        self._segment = 1
+        self._records_since_compaction = 0
+        self._file = None
+        self.recover()
+
+    # Arquivos
+
+    def _segment_path(self, number: int) -> str:
+        return os.path.join(self.directory, f'{SEGMENT_PREFIX}{number:08d}{SEGMENT_SUFFIX}')
+
+    def _snapshot_path(self) -> str:
+        return os.path.join(self.directory, SNAPSHOT_FILE)
+
+    def _segments(self) -> List[int]:
+        numbers = []
+        for name in os.listdir(self.directory):
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX):
+                numbers.append(int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]))
+        return sorted(numbers)
+
+    def _open_segment(self):
+        if self._file is not None:
+            self._file.close()
+        self._file = open(self._segment_path(self._segment), 'ab')
+
+    def _fsync_directory(self):
+        if hasattr(os, 'O_DIRECTORY'):
+            fd = os.open(self.directory, os.O_DIRECTORY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+    # Snapshot
+
+    @staticmethod
+    def _snapshot_texts(reader) -> Iterator[Tuple[str, str, Dict]]:
+        # Entradas [chave, hash, texto]; snapshots antigos não guardavam o hash
+        for entry in reader.section('texts'):
+            if len(entry) == 2:
+                yield entry[0], _text_hash(entry[1]), entry[1]
+            else:
+                yield entry[0], entry[1], entry[2]
+
+    def _iter_texts(self, reader) -> Iterator[Tuple[str, str, Dict]]:
+        """Estado atual dos textos: snapshot com a cauda do log aplicada por cima"""
+        if reader is not None:
+            for key, content_hash, text in self._snapshot_texts(reader):
+                if key not in self._tail:
+                    yield key, content_hash, text
+        for key, text in self._tail.items():
+            if text is not None:
+                yield key, self._hashes[key], text
+
+    def _open_snapshot(self):
+        from src.utils.binary_snapshot import SnapshotReader
+        path = self._snapshot_path()
+        return SnapshotReader(path) if os.path.exists(path) else None
+
+    # Recuperação
+
+    def recover(self):
+        """Reconstruir o estado: snapshot + registros dos segmentos posteriores"""
+        with self._lock:
+            self.tags, self._hashes, self._tail = {}, {}, {}
+            self._segment = 1
+            reader = self._open_snapshot()
+            if reader is not None:
+                with reader:
+                    self.tags = {key: tag for key, tag in reader.section('tags')}
+                    self._hashes = {key: content_hash for key, content_hash, _ in self._snapshot_texts(reader)}
+                    self._segment = reader.meta['next_segment']
+
+            replayed = 0
+            for number in self._segments():
+                if number < self._segment:
+                    continue
+                path = self._segment_path(number)
+                records, valid_end = read_segment(path)
+                for record in records:
+                    self._apply_record(record)
+                replayed += len(records)
+                if valid_end < os.path.getsize(path):
+                    # Descartar a cauda corrompida para que novos registros fiquem legíveis
+                    with open(path, 'r+b') as f:
+                        f.truncate(valid_end)
+                self._segment = number
+
+            self._records_since_compaction = replayed
+            self._open_segment()
+
+    def _apply_record(self, record: Dict):
+        op = record['op']
+        if op == 'put_text':
+            self._tail[record['key']] = record['data']
+            self._hashes[record['key']] = record.get('hash') or _text_hash(record['data'])
+        elif op == 'del_text':
+            self._tail[record['key']] = None
+            self._hashes.pop(record['key'], None)
+        elif op == 'put_tag':
+            self.tags[record['key']] = record['data']
+        elif op == 'del_tag':
+            self.tags.pop(record['key'], None)
+
+    # Escrita
+
+    def _append(self, records: List[Dict]):
+        if not records:
+            return
+        self._file.write(b''.join(_encode(record) for record in records))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._records_since_compaction += len(records)
+
+    def apply(self, texts: List[Dict], tags: List[Dict], changed: Optional[Iterable] = None) -> int:
+        """Gravar apenas a diferença entre o estado atual e o snapshot recebido.
+
+        `changed` lista os ids dos textos alterados desde o último apply; com
+        ele, só esses textos (e os que o log ainda não tem) são comparados
+        pelo hash. Sem ele, todos são. Textos sem id são identificados pelo
+        hash do conteúdo e sempre comparados. Devolve o número de registros
+        anexados ao log.
+        """
+        changed = None if changed is None else set(changed)
+        with self._lock:
+            records = []
+
+            wanted_tags = {tag['name']: tag for tag in tags}
+            for name in list(self.tags):
+                if name not in wanted_tags:
+                    records.append({'op': 'del_tag', 'key': name})
+            for name, tag in wanted_tags.items():
+                if self.tags.get(name) != tag:
+                    records.append({'op': 'put_tag', 'key': name, 'data': dict(tag)})
+
+            wanted = set()
+            duplicates = {}
+            puts = {}
+            for text in texts:
+                text_id = text.get('id')
+                if text_id is None:
+                    # Duplicados sem id recebem um contador na chave
+                    content_hash = _text_hash(text)
+                    duplicates[content_hash] = duplicates.get(content_hash, 0) + 1
+                    key = f"h:{content_hash}:{duplicates[content_hash]}"
+                else:
+                    key = f"id:{text_id}"
+                    if changed is not None and text_id not in changed and key in self._hashes:
+                        wanted.add(key)
+                        continue
+                    content_hash = _text_hash(text)
+                wanted.add(key)
+                if self._hashes.get(key) != content_hash:
+                    puts[key] = (content_hash, text)
+                else:
+                    puts.pop(key, None)
+
+            for key in self._hashes:
+                if key not in wanted:
+                    records.append({'op': 'del_text', 'key': key})
+            for key, (content_hash, text) in puts.items():
+                # Registro serializado a partir de uma cópia: alterações posteriores do
+                # chamador não podem vazar para a cauda em memória
+                records.append({'op': 'put_text', 'key': key, 'hash': content_hash,
+                                'data': json.loads(json.dumps(text, default=str))})
+
+            if records:
+                timestamp = datetime.utcnow().isoformat()
+                for record in records:
+                    record['ts'] = timestamp
+                self._append(records)
+                for record in records:
+                    self._apply_record(record)
+
+            if self._records_since_compaction >= self.compact_every:
+                self._compact()
+            return len(records)
+
+    # Compactação
+
+    def _compact(self):
+        from src.utils.binary_snapshot import write_snapshot
+        next_segment = self._segment + 1
+        reader = self._open_snapshot()
+        try:
+            # O snapshot novo é montado em fluxo a partir do antigo e da cauda
+            write_snapshot(self._snapshot_path(), {
+                'texts': ([key, content_hash, text] for key, content_hash, text in self._iter_texts(reader)),
+                'tags': ([key, tag] for key, tag in self.tags.items())
+            }, meta={'next_segment': next_segment, 'timestamp': datetime.utcnow().isoformat()})
+        finally:
+            if reader is not None:
+                reader.close()
+        self._tail = {}
+        self._segment = next_segment
+        self._open_segment()
+        self._fsync_directory()
+
+        for number in self._segments():
+            if number < next_segment:
+                os.remove(self._segment_path(number))
+        self._records_since_compaction = 0
+
+    def compact(self):
+        """Forçar a compactação: snapshot do estado atual + novo segmento"""
+        with self._lock:
+            self._compact()
+
+    def iter_texts(self) -> Iterator[Dict]:
+        """Textos um por vez, lidos do snapshot bloco a bloco (sem montar a lista inteira)"""
+        with self._lock:
+            reader = self._open_snapshot()
+            try:
+                for _, _, text in self._iter_texts(reader):
+                    yield text
+            finally:
+                if reader is not None:
+                    reader.close()
+
+    def load_tags(self) -> List[Dict]:
+        with self._lock:
+            return list(self.tags.values())
+
+    def load(self) -> Tuple[List[Dict], List[Dict]]:
+        with self._lock:
+            reader = self._open_snapshot()
+            try:
+                texts = [text for _, _, text in self._iter_texts(reader)]
+            finally:
+                if reader is not None:
+                    reader.close()
+            return texts, list(self.tags.values())
+
+    def is_empty(self) -> bool:
+        with self._lock:
+            return not self._hashes and not self.tags
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'texts': len(self._hashes),
+                'tags': len(self.tags),
+                'segment': self._segment,
+                'records_since_compaction': self._records_since_compaction
+            }
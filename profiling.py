@@ -0,0 +1,151 @@
+import cProfile
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+PROFILE_HEADER = 'HTTP_X_GTEX_PROFILE'
+PROFILE_SUFFIX = '.prof'
+
+
+class RequestProfiler:
+    """Middleware WSGI que roda requisições escolhidas sob o cProfile.
+
+    Uma requisição é perfilada se o caminho começar com um prefixo de
+    `allow_paths` ou se trouxer o cabeçalho `X-Gtex-Profile` com o `token`
+    configurado. Cada perfil vira um arquivo .prof (pstats) em
+    `profile_dir`; só os `keep` mais recentes são mantidos.
+    """
+
+    def __init__(self, wsgi_app, profile_dir: str, keep: int = 50, token: Optional[str] = None,
+                 allow_paths: Iterable[str] = ()):
+        self.wsgi_app = wsgi_app
+        self.profile_dir = profile_dir
+        os.makedirs(profile_dir, exist_ok=True)
+        self.keep = keep
+        self.token = token
+        self.allow_paths = tuple(path for path in allow_paths if path)
+        self._lock = threading.Lock()
+
+    def _wanted(self, environ) -> bool:
+        if self.token and environ.get(PROFILE_HEADER) == self.token:
+            return True
+        return environ.get('PATH_INFO', '').startswith(self.allow_paths) if self.allow_paths else False
+
+    def __call__(self, environ, start_response):
+        if not self._wanted(environ):
+            return self.wsgi_app(environ, start_response)
+
+        profile = cProfile.Profile()
+        started = time.perf_counter()
+
+        def run():
+            # O corpo é consumido dentro do perfil para incluir respostas em streaming
+            result = self.wsgi_app(environ, start_response)
+            try:
+                return list(result)
+            finally:
+                if hasattr(result, 'close'):
+                    result.close()
+
+        body = profile.runcall(run)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self._save(profile, environ, elapsed_ms)
+        return body
+
+    def _save(self, profile: cProfile.Profile, environ, elapsed_ms: float):
+        slug = re.sub(r'[^A-Za-z0-9]+', '_', environ.get('PATH_INFO', '')).strip('_') or 'root'
+        name = (f"profile_{datetime.utcnow().strftime('%Y%m%d_%H%M%S_%f')}_"
+                f"{environ.get('REQUEST_METHOD', 'GET')}_{slug[:60]}_{elapsed_ms:.0f}ms{PROFILE_SUFFIX}")
+        try:
+            profile.dump_stats(os.path.join(self.profile_dir, name))
+            with self._lock:
+                self._rotate()
+            print(f"✓ Perfil salvo: {name}")
+        except OSError as e:
+            print(f"✗ Erro ao salvar perfil: {e}")
+
+    def _rotate(self):
+        profiles = self.list_profiles()
+        for name in profiles[:-self.keep] if self.keep > 0 else profiles:
+            try:
+                os.remove(os.path.join(self.profile_dir, name))
+            except FileNotFoundError:
+                pass
+
+    def list_profiles(self) -> List[str]:
+        """Perfis do anel, do mais antigo para o mais recente"""
+        return sorted(name for name in os.listdir(self.profile_dir)
+                      if name.startswith('profile_') and name.endswith(PROFILE_SUFFIX))
+
+
+def _short(value, limit: int = 200) -> str:
+    text = repr(value)
+    return text if len(text) <= limit else text[:limit] + '…'
+
+
+class SlowQueryLog:
+    """Registra comandos SQL acima de `threshold_ms` com parâmetros e EXPLAIN QUERY PLAN"""
+
+    EXPLAINABLE = ('SELECT', 'UPDATE', 'DELETE', 'INSERT', 'WITH', 'REPLACE')
+
+    def __init__(self, threshold_ms: float = 100.0, history: int = 100):
+        self.threshold = threshold_ms / 1000.0
+        self.recent = deque(maxlen=history)
+        self._lock = threading.Lock()
+
+    def explain(self, connection, statement: str, parameters) -> List[str]:
+        """Plano de consulta do SQLite; vazio se o comando não puder ser explicado"""
+        if not statement.lstrip().upper().startswith(self.EXPLAINABLE):
+            return []
+        try:
+            # Cursor simples: o EXPLAIN não deve passar de novo pela instrumentação
+            cursor = sqlite3.Cursor(connection)
+            rows = cursor.execute(f'EXPLAIN QUERY PLAN {statement}', parameters or ()).fetchall()
+        except Exception as e:
+            return [f'(sem plano: {e})']
+        return [row[-1] for row in rows]
+
+    def observe(self, connection, statement: str, parameters, elapsed: float):
+        if elapsed < self.threshold:
+            return
+        plan = self.explain(connection, statement, parameters) if connection is not None else []
+        # SCAN sem índice ou ordenação em B-tree temporária indicam varredura completa
+        full_scan = any(step.startswith('SCAN') or 'USE TEMP B-TREE' in step for step in plan)
+        entry: Dict = {
+            'timestamp': datetime.utcnow().isoformat(),
+            'elapsed_ms': elapsed * 1000,
+            'statement': ' '.join(statement.split()),
+            'parameters': _short(parameters),
+            'plan': plan,
+            'full_scan': full_scan
+        }
+        with self._lock:
+            self.recent.append(entry)
+
+        lines = [f"⚠ Consulta lenta ({entry['elapsed_ms']:.1f} ms): {entry['statement']}",
+                 f"   parâmetros: {entry['parameters']}"]
+        lines += [f"   plano: {step}" for step in plan]
+        if full_scan:
+            lines.append("   ⚠ varredura completa ou ordenação sem índice")
+        print('\n'.join(lines))
+
+    def instrument_engine(self, engine):
+        """Cronometrar os comandos de uma engine do SQLAlchemy (o plano só é obtido no SQLite)"""
+        from sqlalchemy import event
+        is_sqlite = engine.dialect.name == 'sqlite'
+
+        @event.listens_for(engine, 'before_cursor_execute')
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault('_slow_query_started', []).append(time.perf_counter())
+
+        @event.listens_for(engine, 'after_cursor_execute')
+        def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            elapsed = time.perf_counter() - conn.info['_slow_query_started'].pop()
+            if executemany:
+                parameters = parameters[0] if parameters else ()
+            self.observe(cursor.connection if is_sqlite else None, statement, parameters, elapsed)
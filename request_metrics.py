@@ -0,0 +1,275 @@
+import sqlite3
+import threading
+import time
+from typing import Dict, Tuple
+
+from flask import Response, g, has_request_context, request
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+class Histogram:
+    """Histograma cumulativo no formato do Prometheus"""
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+
+def _labels(**labels) -> str:
+    parts = []
+    for key, value in labels.items():
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{key}="{value}"')
+    return '{' + ','.join(parts) + '}'
+
+
+def _record_statement(statement: str = None):
+    # Chamado pelo callback de trace do sqlite3: conta comandos da requisição atual
+    if has_request_context():
+        stats = g.get('_request_metrics')
+        if stats is not None:
+            stats['queries'] += 1
+
+
+def _add_sql_time(elapsed: float):
+    if has_request_context():
+        stats = g.get('_request_metrics')
+        if stats is not None:
+            stats['sql_time'] += elapsed
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor que soma o tempo gasto em execute e na leitura das linhas.
+
+    O tempo de cada comando vai de execute até a última linha lida; ao
+    final ele é entregue ao `slow_query_log` da conexão, se houver.
+    """
+
+    _statement = None
+    _elapsed = 0.0
+
+    def _timed(self, method, *args):
+        started = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            elapsed = time.perf_counter() - started
+            self._elapsed += elapsed
+            _add_sql_time(elapsed)
+
+    def _finish(self):
+        if self._statement is not None:
+            sql, parameters = self._statement
+            self._statement = None
+            slow_query_log = getattr(self.connection, 'slow_query_log', None)
+            if slow_query_log is not None:
+                slow_query_log.observe(self.connection, sql, parameters, self._elapsed)
+
+    def _start(self, method, sql, parameters):
+        self._finish()
+        self._statement = (sql, parameters)
+        self._elapsed = 0.0
+        result = self._timed(method, sql, parameters)
+        if self.description is None:
+            # Sem linhas para ler (INSERT/UPDATE/DELETE): o comando já terminou
+            self._finish()
+        return result
+
+    def execute(self, sql, parameters=()):
+        return self._start(super().execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        seq_of_parameters = list(seq_of_parameters)
+        self._finish()
+        self._statement = (sql, seq_of_parameters[0] if seq_of_parameters else ())
+        self._elapsed = 0.0
+        result = self._timed(super().executemany, sql, seq_of_parameters)
+        self._finish()
+        return result
+
+    def fetchone(self):
+        row = self._timed(super().fetchone)
+        if row is None:
+            self._finish()
+        return row
+
+    def fetchall(self):
+        rows = self._timed(super().fetchall)
+        self._finish()
+        return rows
+
+    def __next__(self):
+        try:
+            return self._timed(super().__next__)
+        except StopIteration:
+            self._finish()
+            raise
+
+    def close(self):
+        self._finish()
+        super().close()
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Conexão sqlite3 para `sqlite3.connect(..., factory=InstrumentedConnection)`"""
+
+    # SlowQueryLog (profiling.py) compartilhado pelas conexões, quando ativado
+    slow_query_log = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.set_trace_callback(_record_statement)
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, *args):
+        return self.cursor().execute(*args)
+
+    def executemany(self, *args):
+        return self.cursor().executemany(*args)
+
+
+class RequestMetrics:
+    """Métricas por rota (latência, consultas SQL, tamanho da resposta) expostas em /metrics.
+
+    Requisições com mais de `n_plus_one_threshold` comandos SQL são
+    registradas como suspeitas de N+1.
+    """
+
+    def __init__(self, app=None, n_plus_one_threshold: int = 20, endpoint: str = '/metrics'):
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.endpoint = endpoint
+        self._lock = threading.Lock()
+        self.latency: Dict[Tuple[str, str], Histogram] = {}
+        self.queries: Dict[Tuple[str, str], Histogram] = {}
+        self.response_size: Dict[Tuple[str, str], Histogram] = {}
+        self.sql_seconds: Dict[Tuple[str, str], float] = {}
+        self.requests: Dict[Tuple[str, str, int], int] = {}
+        self.n_plus_one: Dict[Tuple[str, str], int] = {}
+        self.cache: Dict[Tuple[str, str], int] = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.add_url_rule(self.endpoint, 'request_metrics', self.export)
+        app.extensions['request_metrics'] = self
+
+    def instrument_engine(self, engine):
+        """Contar e cronometrar os comandos de uma engine do SQLAlchemy"""
+        from sqlalchemy import event
+
+        @event.listens_for(engine, 'before_cursor_execute')
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault('_metrics_started', []).append(time.perf_counter())
+            _record_statement(statement)
+
+        @event.listens_for(engine, 'after_cursor_execute')
+        def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            started = conn.info['_metrics_started'].pop()
+            _add_sql_time(time.perf_counter() - started)
+
+    # Cache
+
+    def record_cache(self, cache: str, hit: bool):
+        with self._lock:
+            key = (cache, 'hit' if hit else 'miss')
+            self.cache[key] = self.cache.get(key, 0) + 1
+
+    # Ciclo da requisição
+
+    def _before_request(self):
+        g._request_metrics = {'started': time.perf_counter(), 'queries': 0, 'sql_time': 0.0}
+
+    def _after_request(self, response):
+        stats = g.pop('_request_metrics', None)
+        if stats is None or request.path == self.endpoint:
+            return response
+
+        elapsed = time.perf_counter() - stats['started']
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        key = (request.method, route)
+        # Respostas em streaming não têm tamanho conhecido aqui, e o SQL feito durante o
+        # streaming acontece depois deste ponto (não entra na contagem)
+        size = None if response.is_streamed else response.calculate_content_length()
+
+        with self._lock:
+            self.latency.setdefault(key, Histogram(LATENCY_BUCKETS)).observe(elapsed)
+            self.queries.setdefault(key, Histogram(QUERY_BUCKETS)).observe(stats['queries'])
+            self.sql_seconds[key] = self.sql_seconds.get(key, 0.0) + stats['sql_time']
+            if size is not None:
+                self.response_size.setdefault(key, Histogram(SIZE_BUCKETS)).observe(size)
+            status_key = key + (response.status_code,)
+            self.requests[status_key] = self.requests.get(status_key, 0) + 1
+            if response.status_code == 304:
+                cache_key = ('http', 'hit')
+                self.cache[cache_key] = self.cache.get(cache_key, 0) + 1
+            if stats['queries'] > self.n_plus_one_threshold:
+                self.n_plus_one[key] = self.n_plus_one.get(key, 0) + 1
+
+        if stats['queries'] > self.n_plus_one_threshold:
+            print(f"⚠ Possível N+1 em {request.method} {request.full_path.rstrip('?')}: "
+                  f"{stats['queries']} comandos SQL ({stats['sql_time'] * 1000:.1f} ms)")
+        return response
+
+    # Exportação
+
+    @staticmethod
+    def _histogram_lines(name: str, help_text: str, histograms: Dict[Tuple[str, str], Histogram]):
+        lines = [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+        for (method, route), histogram in sorted(histograms.items()):
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                lines.append(f'{name}_bucket{_labels(method=method, route=route, le=bound)} {count}')
+            lines.append(f'{name}_bucket{_labels(method=method, route=route, le="+Inf")} {histogram.count}')
+            lines.append(f'{name}_sum{_labels(method=method, route=route)} {histogram.sum}')
+            lines.append(f'{name}_count{_labels(method=method, route=route)} {histogram.count}')
+        return lines
+
+    def render(self) -> str:
+        with self._lock:
+            lines = []
+            lines += self._histogram_lines('gtex_http_request_duration_seconds',
+                                           'Latência das requisições por rota', self.latency)
+            lines += self._histogram_lines('gtex_http_request_sql_queries',
+                                           'Comandos SQL por requisição', self.queries)
+            lines += self._histogram_lines('gtex_http_response_size_bytes',
+                                           'Tamanho das respostas por rota', self.response_size)
+
+            lines += ['# HELP gtex_http_request_sql_seconds_total Tempo gasto em SQL por rota',
+                      '# TYPE gtex_http_request_sql_seconds_total counter']
+            for (method, route), seconds in sorted(self.sql_seconds.items()):
+                lines.append(f'gtex_http_request_sql_seconds_total{_labels(method=method, route=route)} {seconds}')
+
+            lines += ['# HELP gtex_http_requests_total Requisições por rota e status',
+                      '# TYPE gtex_http_requests_total counter']
+            for (method, route, status), count in sorted(self.requests.items()):
+                lines.append(f'gtex_http_requests_total{_labels(method=method, route=route, status=status)} {count}')
+
+            lines += ['# HELP gtex_n_plus_one_suspected_total Requisições acima do limite de comandos SQL',
+                      '# TYPE gtex_n_plus_one_suspected_total counter']
+            for (method, route), count in sorted(self.n_plus_one.items()):
+                lines.append(f'gtex_n_plus_one_suspected_total{_labels(method=method, route=route)} {count}')
+
+            lines += ['# HELP gtex_cache_requests_total Consultas a caches por resultado',
+                      '# TYPE gtex_cache_requests_total counter']
+            for (cache, result), count in sorted(self.cache.items()):
+                lines.append(f'gtex_cache_requests_total{_labels(cache=cache, result=result)} {count}')
+        return '\n'.join(lines) + '\n'
+
+    def export(self):
+        return Response(self.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
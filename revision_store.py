@@ -0,0 +1,304 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import zlib
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS text_revisions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    text_id INTEGER NOT NULL,
+    revision INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    title TEXT,
+    size INTEGER NOT NULL,
+    checksum TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    data BLOB NOT NULL
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_text_revisions_text ON text_revisions (text_id, revision);
+'''
+
+def _common_prefix(a: str, b: str) -> int:
+    # Busca binária comparando fatias (em C): O(n) no total, sem laço por caractere
+    lo, hi = 0, min(len(a), len(b))
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[lo:mid] == b[lo:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def _common_suffix(a: str, b: str, limit: int) -> int:
+    lo, hi = 0, limit
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[len(a) - mid:len(a) - lo] == b[len(b) - mid:len(b) - lo]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def _line_ops(old_lines: List[str], new_lines: List[str], base: int) -> List:
+    """Cópias de linhas de `old` (em ordem, quando possível) e inserções, em tempo linear.
+
+    Cada linha nova continua a cópia corrente se for a próxima linha antiga;
+    senão, copia da ocorrência mais próxima adiante em `old`, ou é inserida.
+    Conteúdo muito repetitivo (logs) não degrada como em um diff ótimo.
+    """
+    offsets = [base]
+    positions: Dict[str, List[int]] = {}
+    for index, line in enumerate(old_lines):
+        offsets.append(offsets[-1] + len(line))
+        positions.setdefault(line, []).append(index)
+
+    ops: List = []
+    expected = 0
+    for line in new_lines:
+        if expected < len(old_lines) and old_lines[expected] == line:
+            index = expected
+        else:
+            candidates = positions.get(line)
+            if not candidates:
+                if ops and isinstance(ops[-1], str):
+                    ops[-1] += line
+                else:
+                    ops.append(line)
+                continue
+            position = bisect_left(candidates, expected)
+            index = candidates[position] if position < len(candidates) else candidates[0]
+        if ops and isinstance(ops[-1], list) and ops[-1][0] + ops[-1][1] == offsets[index]:
+            ops[-1][1] += len(line)
+        else:
+            ops.append([offsets[index], len(line)])
+        expected = index + 1
+    return ops
+
+
+def diff(old: str, new: str) -> List:
+    """Operações que transformam `old` em `new`: [início, tamanho] copia de `old`, str insere"""
+    prefix = _common_prefix(old, new)
+    suffix = _common_suffix(old, new, min(len(old), len(new)) - prefix)
+    old_middle, new_middle = old[prefix:len(old) - suffix], new[prefix:len(new) - suffix]
+
+    ops: List = [[0, prefix]] if prefix else []
+    if old_middle and new_middle:
+        # Várias regiões alteradas no meio: cópias por linhas
+        ops += _line_ops(old_middle.splitlines(keepends=True), new_middle.splitlines(keepends=True), prefix)
+    elif new_middle:
+        ops.append(new_middle)
+    if suffix:
+        if ops and isinstance(ops[-1], list) and ops[-1][0] + ops[-1][1] == len(old) - suffix:
+            ops[-1][1] += suffix
+        else:
+            ops.append([len(old) - suffix, suffix])
+    return ops
+
+
+def patch(old: str, ops: Iterable) -> str:
+    return ''.join(old[op[0]:op[0] + op[1]] if isinstance(op, list) else op for op in ops)
+
+
+def _checksum(content: str) -> str:
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+
+def _encode(payload) -> bytes:
+    return zlib.compress(json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+
+
+class RevisionStore:
+    """Histórico de revisões de textos: quadros-chave completos e diffs entre eles.
+
+    Cada revisão guarda, comprimido com zlib, o conteúdo inteiro (kind
+    'key') ou as operações de `diff` em relação à revisão anterior ('delta').
+    Um novo quadro-chave é gravado a cada `keyframe_interval` revisões ou
+    quando os diffs desde o último passam de `max_delta_ratio` vezes o seu
+    tamanho, então reconstruir qualquer revisão aplica no máximo
+    `keyframe_interval - 1` diffs.
+
+    Os métodos recebem a conexão da requisição e não fazem commit, exceto
+    `prune`, usado em segundo plano com uma conexão própria.
+    """
+
+    def __init__(self, keyframe_interval: int = 32, max_delta_ratio: float = 1.0):
+        self.keyframe_interval = keyframe_interval
+        self.max_delta_ratio = max_delta_ratio
+
+    # Gravação
+
+    def _insert(self, db: sqlite3.Connection, text_id: int, revision: int, kind: str, title: Optional[str],
+                content: str, data: bytes, created_at: Optional[str] = None) -> int:
+        db.execute('''
+            INSERT INTO text_revisions (text_id, revision, kind, title, size, checksum, created_at, data)
+            VALUES (?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP), ?)
+        ''', (text_id, revision, kind, title, len(content), _checksum(content), created_at, data))
+        return len(data)
+
+    def _chain(self, db: sqlite3.Connection, text_id: int) -> Tuple[int, int, int]:
+        """Revisões e bytes de diffs desde o último quadro-chave, e o tamanho dele"""
+        row = db.execute('''
+            SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0) FROM text_revisions
+            WHERE text_id = ? AND revision > (
+                SELECT MAX(revision) FROM text_revisions WHERE text_id = ? AND kind = 'key')
+        ''', (text_id, text_id)).fetchone()
+        key = db.execute('''
+            SELECT LENGTH(data) FROM text_revisions WHERE text_id = ? AND kind = 'key'
+            ORDER BY revision DESC LIMIT 1
+        ''', (text_id,)).fetchone()
+        return row[0], row[1], key[0] if key else 0
+
+    def record(self, db: sqlite3.Connection, text_id: int, title: Optional[str], content: str,
+               previous: Optional[str] = None, previous_title: Optional[str] = None) -> Optional[int]:
+        """Gravar o estado atual de um texto; `previous` e `previous_title` são o estado antes da alteração.
+
+        Devolve o número da revisão, ou None se nada mudou desde a última.
+        """
+        last = db.execute('''
+            SELECT revision, checksum, title FROM text_revisions WHERE text_id = ?
+            ORDER BY revision DESC LIMIT 1
+        ''', (text_id,)).fetchone()
+        checksum = _checksum(content)
+        if last is not None and last[1] == checksum and last[2] == title:
+            return None
+
+        if last is None and previous is not None and (previous != content or previous_title != title):
+            # Texto anterior ao histórico: o estado antigo vira a primeira revisão
+            self._insert(db, text_id, 1, 'key', previous_title, previous, _encode(previous))
+            last = (1, _checksum(previous), previous_title)
+        revision = last[0] + 1 if last else 1
+
+        # O diff só vale se `previous` for mesmo o conteúdo da última revisão
+        if last is not None and previous is not None and last[1] == _checksum(previous):
+            count, delta_bytes, key_bytes = self._chain(db, text_id)
+            if count + 1 < self.keyframe_interval:
+                data = _encode(diff(previous, content))
+                if delta_bytes + len(data) <= self.max_delta_ratio * max(key_bytes, 1):
+                    self._insert(db, text_id, revision, 'delta', title, content, data)
+                    return revision
+        self._insert(db, text_id, revision, 'key', title, content, _encode(content))
+        return revision
+
+    def delete(self, db: sqlite3.Connection, text_id: int):
+        db.execute('DELETE FROM text_revisions WHERE text_id = ?', (text_id,))
+
+    # Leitura
+
+    def list(self, db: sqlite3.Connection, text_id: int) -> List[Dict]:
+        return [{
+            'revision': row[0], 'kind': row[1], 'title': row[2], 'size': row[3],
+            'stored_bytes': row[4], 'created_at': row[5]
+        } for row in db.execute('''
+            SELECT revision, kind, title, size, LENGTH(data), created_at FROM text_revisions
+            WHERE text_id = ? ORDER BY revision DESC
+        ''', (text_id,)).fetchall()]
+
+    def _replay(self, rows: Iterable[tuple], content: str = '') -> str:
+        for kind, data in rows:
+            payload = json.loads(zlib.decompress(data))
+            content = payload if kind == 'key' else patch(content, payload)
+        return content
+
+    def get(self, db: sqlite3.Connection, text_id: int, revision: int) -> Optional[Dict]:
+        """Reconstruir uma revisão a partir do quadro-chave anterior a ela"""
+        row = db.execute('''
+            SELECT title, size, checksum, created_at FROM text_revisions WHERE text_id = ? AND revision = ?
+        ''', (text_id, revision)).fetchone()
+        if row is None:
+            return None
+        rows = db.execute('''
+            SELECT kind, data FROM text_revisions
+            WHERE text_id = ? AND revision <= ? AND revision >= (
+                SELECT MAX(revision) FROM text_revisions WHERE text_id = ? AND revision <= ? AND kind = 'key')
+            ORDER BY revision
+        ''', (text_id, revision, text_id, revision)).fetchall()
+        return {'revision': revision, 'title': row[0], 'size': row[1], 'created_at': row[3],
+                'content': self._replay(rows)}
+
+    # Poda e compactação
+
+    def compact(self, db: sqlite3.Connection, text_id: int, keep: Iterable[int]) -> int:
+        """Manter só as revisões em `keep`, regravando a cadeia de quadros-chave e diffs"""
+        keep = set(keep)
+        rows = db.execute('''
+            SELECT revision, kind, title, created_at, data FROM text_revisions WHERE text_id = ? ORDER BY revision
+        ''', (text_id,)).fetchall()
+        content, kept = '', []
+        for revision, kind, title, created_at, data in rows:
+            content = self._replay([(kind, data)], content)
+            if revision in keep:
+                kept.append((revision, title, created_at, content))
+
+        db.execute('DELETE FROM text_revisions WHERE text_id = ?', (text_id,))
+        previous, since_key, delta_bytes, key_bytes = None, 0, 0, 0
+        for revision, title, created_at, content in kept:
+            if previous is not None and since_key + 1 < self.keyframe_interval:
+                data = _encode(diff(previous, content))
+                if delta_bytes + len(data) <= self.max_delta_ratio * max(key_bytes, 1):
+                    self._insert(db, text_id, revision, 'delta', title, content, data, created_at)
+                    since_key, delta_bytes, previous = since_key + 1, delta_bytes + len(data), content
+                    continue
+            key_bytes = self._insert(db, text_id, revision, 'key', title, content, _encode(content), created_at)
+            since_key, delta_bytes, previous = 0, 0, content
+        return len(rows) - len(kept)
+
+    def prune(self, db: sqlite3.Connection, keep_last: int = 50, keep_daily_days: int = 90) -> Dict:
+        """Podar o histórico: as `keep_last` revisões mais recentes de cada texto ficam;
+        das outras, só a última de cada dia dos últimos `keep_daily_days` dias.
+
+        Revisões de textos apagados são removidas. Cada texto é compactado e
+        gravado em sua própria transação.
+        """
+        stats = {'texts': 0, 'removed': 0}
+        cursor = db.execute('DELETE FROM text_revisions WHERE text_id NOT IN (SELECT id FROM texts)')
+        stats['removed'] += cursor.rowcount
+        db.commit()
+
+        candidates = [row[0] for row in db.execute('''
+            SELECT text_id FROM text_revisions GROUP BY text_id HAVING COUNT(*) > ?
+        ''', (keep_last,)).fetchall()]
+        for text_id in candidates:
+            rows = db.execute('''
+                SELECT revision, date(created_at), created_at >= datetime('now', ?) FROM text_revisions
+                WHERE text_id = ? ORDER BY revision DESC
+            ''', (f'-{keep_daily_days} days', text_id)).fetchall()
+            keep, days = set(), set()
+            for position, (revision, day, recent) in enumerate(rows):
+                if position < keep_last or (recent and day not in days):
+                    keep.add(revision)
+                days.add(day)
+            if len(keep) < len(rows):
+                stats['removed'] += self.compact(db, text_id, keep)
+                stats['texts'] += 1
+                db.commit()
+        return stats
+
+
+class RevisionPruner:
+    """Chama `prune_fn` a cada `interval` segundos em uma thread de fundo"""
+
+    def __init__(self, prune_fn: Callable[[], Dict], interval: float = 3600.0):
+        self.prune_fn = prune_fn
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='gtex-revision-pruner', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                stats = self.prune_fn()
+                if stats.get('removed'):
+                    print(f"✓ Histórico podado: {stats['removed']} revisões de {stats['texts']} textos")
+            except Exception as e:
+                print(f"✗ Erro ao podar o histórico de revisões: {e}")
+
+    def close(self):
+        self._stop.set()
+        self._thread.join(timeout=5)
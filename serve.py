@@ -0,0 +1,418 @@
+"""Servidor de produção em múltiplos processos (pré-fork) para o app.py e o main.py.
+
+    python serve.py --app app:app --workers 8 --bind 0.0.0.0:5000
+    python serve.py --app src.main:app
+
+O processo mestre abre o socket de escuta e cria os processos filhos:
+
+- um escritor, que atende sozinho (uma requisição por vez; com bancos por
+  tenant, uma thread por requisição) em um socket Unix;
+- N leitores, que compartilham o socket de escuta e atendem as leituras.
+  Requisições POST/PUT/PATCH/DELETE são repassadas ao escritor, então só
+  um processo escreve no SQLite e não há disputa pelo lock do banco.
+
+O app é importado depois do fork, em cada filho; cada conexão SQLite do
+filho recebe os PRAGMAs de WORKER_PRAGMAS (WAL, cache e mmap por processo).
+
+Sinais no mestre: SIGHUP recarrega (nova geração de processos, reimportando
+o código, e só então a antiga é encerrada); SIGTERM/SIGINT encerram com
+calma, esperando as requisições em andamento. Requer Linux (fork e sockets Unix).
+"""
+import argparse
+import atexit
+import http.client
+import importlib
+import os
+import random
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional
+from urllib.parse import quote
+
+WRITE_METHODS = frozenset(('POST', 'PUT', 'PATCH', 'DELETE'))
+
+# Aplicados a cada conexão SQLite aberta pelos filhos
+WORKER_PRAGMAS = (
+    'journal_mode=WAL',
+    'synchronous=NORMAL',
+    'busy_timeout=5000',
+    'cache_size=-16000',
+    'mmap_size=268435456',
+    'temp_store=MEMORY',
+)
+
+HOP_BY_HOP = frozenset(('connection', 'keep-alive', 'proxy-authenticate', 'proxy-authorization',
+                        'te', 'trailer', 'trailers', 'transfer-encoding', 'upgrade'))
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTPConnection por um socket Unix"""
+
+    def __init__(self, socket_path: str, timeout: float = 60.0):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        self.sock = sock
+
+
+class WriteForwarder:
+    """Middleware WSGI dos leitores: repassa as escritas ao processo escritor"""
+
+    def __init__(self, wsgi_app, socket_path: str, timeout: float = 60.0):
+        self.wsgi_app = wsgi_app
+        self.socket_path = socket_path
+        self.timeout = timeout
+
+    @staticmethod
+    def _request_headers(environ) -> Dict[str, str]:
+        headers = {}
+        for key, value in environ.items():
+            if key.startswith('HTTP_'):
+                name = key[5:].replace('_', '-').title()
+                if name.lower() not in HOP_BY_HOP:
+                    headers[name] = value
+        if environ.get('CONTENT_TYPE'):
+            headers['Content-Type'] = environ['CONTENT_TYPE']
+        remote = environ.get('REMOTE_ADDR')
+        if remote:
+            forwarded = headers.get('X-Forwarded-For')
+            headers['X-Forwarded-For'] = f'{forwarded}, {remote}' if forwarded else remote
+        return headers
+
+    @staticmethod
+    def _body(environ) -> bytes:
+        stream = environ['wsgi.input']
+        length = environ.get('CONTENT_LENGTH')
+        if length:
+            return stream.read(int(length))
+        return stream.read() if environ.get('wsgi.input_terminated') else b''
+
+    def __call__(self, environ, start_response):
+        method = environ['REQUEST_METHOD']
+        if method not in WRITE_METHODS:
+            return self.wsgi_app(environ, start_response)
+
+        # PATH_INFO chega decodificado em latin-1 (PEP 3333); volta a ser codificado para o escritor
+        path = quote((environ.get('SCRIPT_NAME', '') + environ.get('PATH_INFO', '')).encode('latin-1'),
+                     safe="/:@!$&'()*+,;=-._~")
+        if environ.get('QUERY_STRING'):
+            path += '?' + environ['QUERY_STRING']
+
+        connection = UnixHTTPConnection(self.socket_path, self.timeout)
+        try:
+            connection.request(method, path, self._body(environ), self._request_headers(environ))
+            response = connection.getresponse()
+        except OSError as e:
+            connection.close()
+            print(f"✗ Escritor indisponível para {method} {path}: {e}")
+            start_response('503 Service Unavailable', [('Content-Type', 'application/json'),
+                                                       ('Retry-After', '1')])
+            return [b'{"error": "Servidor de escrita indispon\\u00edvel"}']
+
+        start_response(f'{response.status} {response.reason}',
+                       [(name, value) for name, value in response.getheaders()
+                        if name.lower() not in HOP_BY_HOP])
+
+        def relay():
+            try:
+                while True:
+                    chunk = response.read(65536)
+                    if not chunk:
+                        break
+                    yield chunk
+            finally:
+                connection.close()
+
+        return relay()
+
+
+def load_app(spec: str):
+    """Importar 'modulo:atributo' e devolver (app Flask, módulo)"""
+    module_name, _, attribute = spec.partition(':')
+    if os.getcwd() not in sys.path:
+        sys.path.insert(0, os.getcwd())
+    module = importlib.import_module(module_name)
+    return getattr(module, attribute or 'app'), module
+
+
+def tune_sqlite(flask_app, module, pragmas=WORKER_PRAGMAS):
+    """Aplicar os PRAGMAs às conexões do processo atual (sqlite3 puro e SQLAlchemy)"""
+    if hasattr(module, 'SQLITE_PRAGMAS'):
+        module.SQLITE_PRAGMAS = tuple(pragmas)
+    tenant_router = getattr(module, 'tenant_router', None)
+    if tenant_router is not None:
+        tenant_router.pragmas = tuple(pragmas)
+
+    extension = flask_app.extensions.get('sqlalchemy')
+    if extension is None:
+        return
+    from sqlalchemy import event
+
+    with flask_app.app_context():
+        engine = extension.engine
+    if engine.dialect.name != 'sqlite':
+        return
+
+    @event.listens_for(engine, 'connect')
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(f'PRAGMA {pragma}')
+        cursor.close()
+
+    # Conexões abertas durante a importação não receberam os PRAGMAs acima
+    engine.dispose()
+
+
+class PreforkServer:
+    """Processo mestre: cria, acompanha e substitui os processos filhos"""
+
+    def __init__(self, app_spec: str, host: str = '0.0.0.0', port: int = 5000, workers: int = 4,
+                 graceful_timeout: float = 30.0, socket_dir: Optional[str] = None,
+                 writer_timeout: float = 120.0):
+        self.app_spec = app_spec
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.graceful_timeout = graceful_timeout
+        self.writer_timeout = writer_timeout
+        self._own_socket_dir = socket_dir is None
+        self.socket_dir = socket_dir or tempfile.mkdtemp(prefix='gtex-serve-')
+        self.listener = None
+        self.generation = 0
+        self.writer_pid: Optional[int] = None
+        self.readers: List[int] = []
+        self._stopping = False
+        self._reload_requested = False
+
+    def socket_path(self, generation: int) -> str:
+        return os.path.join(self.socket_dir, f'writer-{generation}.sock')
+
+    # Processos filhos
+
+    def _spawn(self, role: str) -> int:
+        generation = self.generation
+        pid = os.fork()
+        if pid:
+            return pid
+
+        code = 0
+        try:
+            self._child_main(role, generation)
+        except BaseException as e:
+            if not isinstance(e, SystemExit):
+                print(f"✗ Processo {role} {os.getpid()} falhou: {e}")
+            code = e.code if isinstance(e, SystemExit) and isinstance(e.code, int) else 1
+        finally:
+            # O filho não volta para o laço do mestre: roda o atexit (ex.: autosave) e sai
+            atexit._run_exitfuncs()
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os._exit(code)
+
+    def _child_main(self, role: str, generation: int):
+        from werkzeug.serving import make_server
+
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGHUP, signal.SIG_DFL)
+        # Ctrl+C chega ao grupo todo; quem encerra os filhos é o SIGTERM do mestre
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        random.seed()
+        # Permite ao app saber se atende leituras sem receber as escritas (ex.: caches locais)
+        os.environ['GTEX_SERVE_ROLE'] = role
+
+        flask_app, module = load_app(self.app_spec)
+        tune_sqlite(flask_app, module)
+
+        socket_path = self.socket_path(generation)
+        if role == 'writer':
+            if hasattr(module, 'init_db'):
+                module.init_db()
+            self.listener.close()
+            # Uma requisição por vez: as escritas ficam serializadas neste processo. Com um
+            # banco por tenant a disputa já é só dentro do tenant, e o escritor usa threads
+            server = make_server(f'unix://{socket_path}', 0, flask_app,
+                                 threaded=getattr(module, 'tenant_router', None) is not None)
+        else:
+            admission = flask_app.extensions.get('admission')
+            if admission is not None:
+                # Admissão antes do encaminhamento: escritas sem vaga são recusadas aqui,
+                # sem prender uma thread do leitor esperando o socket do escritor
+                admission.wsgi_app = WriteForwarder(admission.wsgi_app, socket_path)
+            else:
+                flask_app.wsgi_app = WriteForwarder(flask_app.wsgi_app, socket_path)
+            server = make_server(self.host, self.port, flask_app, threaded=True, fd=self.listener.fileno())
+            # Encerramento calmo: server_close espera as threads das requisições em andamento
+            server.daemon_threads = False
+            server.block_on_close = True
+
+        signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(
+            target=server.shutdown, daemon=True).start())
+        print(f"✓ {'Escritor' if role == 'writer' else 'Leitor'} {os.getpid()} pronto (geração {generation})")
+        sys.stdout.flush()
+        try:
+            server.serve_forever()
+        finally:
+            server.server_close()
+
+    def _start_generation(self) -> bool:
+        """Criar escritor e leitores de uma nova geração; False se o escritor não subir"""
+        self.generation += 1
+        socket_path = self.socket_path(self.generation)
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+        writer_pid = self._spawn('writer')
+        deadline = time.monotonic() + self.writer_timeout
+        # O socket só aparece depois de o app ser importado e o banco inicializado
+        while not os.path.exists(socket_path):
+            if os.waitpid(writer_pid, os.WNOHANG)[0] or time.monotonic() > deadline:
+                print(f"✗ Escritor da geração {self.generation} não ficou pronto")
+                self._terminate([writer_pid])
+                return False
+            time.sleep(0.05)
+
+        self.writer_pid = writer_pid
+        self.readers = [self._spawn('reader') for _ in range(self.workers)]
+        return True
+
+    def _terminate(self, pids: List[int]):
+        """SIGTERM, espera até graceful_timeout e SIGKILL nos que restarem"""
+        alive = set()
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+                alive.add(pid)
+            except ProcessLookupError:
+                pass
+
+        deadline = time.monotonic() + self.graceful_timeout
+        while alive and time.monotonic() < deadline:
+            for pid in list(alive):
+                try:
+                    if os.waitpid(pid, os.WNOHANG)[0]:
+                        alive.discard(pid)
+                except ChildProcessError:
+                    alive.discard(pid)
+            time.sleep(0.05)
+
+        for pid in alive:
+            print(f"⚠ Processo {pid} não terminou em {self.graceful_timeout:.0f}s; forçando")
+            try:
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+            except (ProcessLookupError, ChildProcessError):
+                pass
+
+    def _stop_generation(self, writer_pid: Optional[int], readers: List[int], generation: int):
+        # Leitores primeiro: as escritas em andamento deles ainda dependem do escritor
+        self._terminate(readers)
+        if writer_pid is not None:
+            self._terminate([writer_pid])
+        socket_path = self.socket_path(generation)
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+    # Laço do mestre
+
+    def _reap(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if not pid:
+                return
+            if self._stopping:
+                continue
+
+            code = os.waitstatus_to_exitcode(status)
+            if pid == self.writer_pid:
+                print(f"✗ Escritor {pid} saiu (código {code}); reiniciando")
+                self.writer_pid = self._spawn('writer')
+            elif pid in self.readers:
+                print(f"✗ Leitor {pid} saiu (código {code}); reiniciando")
+                self.readers[self.readers.index(pid)] = self._spawn('reader')
+
+    def _reload(self):
+        old = (self.writer_pid, list(self.readers), self.generation)
+        print(f"🔄 Recarregando (geração {self.generation + 1})...")
+        if not self._start_generation():
+            # Mantém a geração atual atendendo
+            self.generation -= 1
+            return
+        self._stop_generation(*old)
+        print(f"✓ Geração {self.generation} no ar")
+
+    def run(self):
+        self.listener = socket.socket(socket.AF_INET6 if ':' in self.host else socket.AF_INET,
+                                      socket.SOCK_STREAM)
+        self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.listener.bind((self.host, self.port))
+        self.listener.listen(1024)
+        self.listener.set_inheritable(True)
+
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+        signal.signal(signal.SIGHUP, self._handle_reload)
+
+        print(f"🚀 Mestre {os.getpid()}: {self.app_spec} em {self.host}:{self.port} "
+              f"com {self.workers} leitores + 1 escritor")
+        try:
+            if not self._start_generation():
+                return 1
+            while not self._stopping:
+                if self._reload_requested:
+                    self._reload_requested = False
+                    self._reload()
+                self._reap()
+                time.sleep(0.2)
+            print("🛑 Encerrando...")
+            self._stop_generation(self.writer_pid, self.readers, self.generation)
+            print("✓ Servidor encerrado")
+            return 0
+        finally:
+            self.listener.close()
+            if self._own_socket_dir:
+                shutil.rmtree(self.socket_dir, ignore_errors=True)
+
+    def _handle_stop(self, signum, frame):
+        self._stopping = True
+
+    def _handle_reload(self, signum, frame):
+        self._reload_requested = True
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='python serve.py', description='Servidor de produção do Gtex')
+    parser.add_argument('--app', default=os.environ.get('GTEX_APP', 'app:app'),
+                        help='app WSGI no formato modulo:atributo (ex.: app:app, src.main:app)')
+    parser.add_argument('--bind', default=os.environ.get('GTEX_BIND', '0.0.0.0:5000'), help='host:porta')
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('GTEX_WORKERS', os.cpu_count() or 1)),
+                        help='processos leitores (padrão: número de CPUs)')
+    parser.add_argument('--graceful-timeout', type=float,
+                        default=float(os.environ.get('GTEX_GRACEFUL_TIMEOUT', 30)),
+                        help='segundos para as requisições em andamento terminarem')
+    parser.add_argument('--socket-dir', help='diretório do socket Unix do escritor (padrão: temporário)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    host, _, port = args.bind.rpartition(':')
+    server = PreforkServer(args.app, host.strip('[]') or '0.0.0.0', int(port), max(1, args.workers),
+                           graceful_timeout=args.graceful_timeout, socket_dir=args.socket_dir)
+    return server.run()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,151 @@
+import os
+import sqlite3
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+
+class SnapshotRestarted(Exception):
+    """A cópia incremental foi reiniciada vezes demais por escritas concorrentes"""
+
+
+class SQLiteSnapshotManager:
+    """Snapshots a quente de um banco SQLite usando a API de backup online.
+
+    As páginas são copiadas em passos de `pages_per_step`, com uma pausa de
+    `step_sleep` segundos entre eles para não bloquear os escritores. Cada
+    snapshot é verificado com `PRAGMA integrity_check` antes de entrar na
+    rotação, que mantém apenas os `keep` mais recentes.
+    """
+
+    def __init__(self, db_path: str, snapshot_dir: Optional[str] = None, keep: int = 5,
+                 pages_per_step: int = 1024, step_sleep: float = 0.01, max_restarts: int = 3):
+        self.db_path = db_path
+        self.snapshot_dir = snapshot_dir or os.path.join(os.path.dirname(db_path), 'snapshots')
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        self.keep = keep
+        self.pages_per_step = pages_per_step
+        self.step_sleep = step_sleep
+        self.max_restarts = max_restarts
+        self.prefix = os.path.splitext(os.path.basename(db_path))[0] + '_'
+
+    def _copy(self, source: sqlite3.Connection, target: sqlite3.Connection, pages: int):
+        state = {'remaining': None, 'restarts': 0}
+
+        def progress(status, remaining, total):
+            # Se o total restante cresce, o SQLite reiniciou a cópia por causa de uma escrita
+            if state['remaining'] is not None and remaining > state['remaining']:
+                state['restarts'] += 1
+                if state['restarts'] > self.max_restarts:
+                    raise SnapshotRestarted()
+            state['remaining'] = remaining
+            if remaining and self.step_sleep:
+                time.sleep(self.step_sleep)
+
+        source.backup(target, pages=pages, progress=progress)
+
+    def create_snapshot(self) -> Optional[str]:
+        """Criar um snapshot verificado e devolver seu caminho (None em caso de falha)"""
+        timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S_%f")
+        snapshot_path = os.path.join(self.snapshot_dir, f'{self.prefix}{timestamp}.db')
+        tmp_path = snapshot_path + '.tmp'
+        started = time.monotonic()
+
+        try:
+            source = sqlite3.connect(self.db_path, timeout=30)
+            target = sqlite3.connect(tmp_path)
+            try:
+                try:
+                    self._copy(source, target, self.pages_per_step)
+                except SnapshotRestarted:
+                    # Escritas constantes reiniciam a cópia incremental. Em modo WAL uma
+                    # cópia em passo único só segura um snapshot de leitura e não
+                    # bloqueia os escritores, então terminamos assim.
+                    journal_mode = source.execute("PRAGMA journal_mode").fetchone()[0]
+                    if journal_mode.lower() != 'wal':
+                        raise
+                    self._copy(source, target, -1)
+
+                result = target.execute("PRAGMA integrity_check").fetchone()[0]
+                if result != 'ok':
+                    raise sqlite3.DatabaseError(f"integrity_check falhou: {result}")
+                # O snapshot é um arquivo isolado; não precisa de WAL
+                target.execute("PRAGMA journal_mode=DELETE")
+            finally:
+                target.close()
+                source.close()
+
+            os.replace(tmp_path, snapshot_path)
+            self.rotate()
+
+            elapsed = time.monotonic() - started
+            print(f"✓ Snapshot criado: {os.path.basename(snapshot_path)} ({elapsed:.2f}s)")
+            return snapshot_path
+
+        except Exception as e:
+            print(f"✗ Erro ao criar snapshot: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return None
+
+    def list_snapshots(self) -> List[str]:
+        """Listar snapshots do mais antigo para o mais recente"""
+        names = [f for f in os.listdir(self.snapshot_dir)
+                 if f.startswith(self.prefix) and f.endswith('.db')]
+        return [os.path.join(self.snapshot_dir, f) for f in sorted(names)]
+
+    def rotate(self) -> int:
+        """Remover snapshots além dos `keep` mais recentes"""
+        snapshots = self.list_snapshots()
+        removed = 0
+        for path in snapshots[:max(0, len(snapshots) - self.keep)]:
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError as e:
+                print(f"✗ Erro ao remover snapshot antigo: {e}")
+        return removed
+
+    def verify(self, snapshot_path: str) -> bool:
+        """Rodar integrity_check em um snapshot existente"""
+        try:
+            conn = sqlite3.connect(f"file:{snapshot_path}?mode=ro", uri=True)
+            try:
+                return conn.execute("PRAGMA integrity_check").fetchone()[0] == 'ok'
+            finally:
+                conn.close()
+        except Exception as e:
+            print(f"✗ Erro ao verificar snapshot: {e}")
+            return False
+
+    def latest(self) -> Optional[str]:
+        snapshots = self.list_snapshots()
+        return snapshots[-1] if snapshots else None
+
+    def restore(self, snapshot_path: Optional[str] = None) -> bool:
+        """Restaurar um snapshot (o mais recente por padrão) sobre o banco ativo"""
+        snapshot_path = snapshot_path or self.latest()
+        if not snapshot_path or not self.verify(snapshot_path):
+            return False
+
+        try:
+            source = sqlite3.connect(snapshot_path)
+            target = sqlite3.connect(self.db_path, timeout=30)
+            try:
+                source.backup(target, pages=self.pages_per_step)
+            finally:
+                source.close()
+                target.close()
+            print(f"✓ Snapshot restaurado: {os.path.basename(snapshot_path)}")
+            return True
+        except Exception as e:
+            print(f"✗ Erro ao restaurar snapshot: {e}")
+            return False
+
+    def status(self) -> Dict:
+        snapshots = self.list_snapshots()
+        return {
+            'count': len(snapshots),
+            'latest': os.path.basename(snapshots[-1]) if snapshots else None,
+            'bytes': sum(os.path.getsize(p) for p in snapshots)
+        }
@@ -0,0 +1,215 @@
+import gzip
+import json
+import os
+import sqlite3
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+# Versão do formato NDJSON (uma linha JSON por registro)
+NDJSON_VERSION = 1
+DEFAULT_BATCH_SIZE = 1000
+
+
+def _is_gzip(path: str) -> bool:
+    return path.endswith('.gz')
+
+
+def open_backup(path: str, mode: str, compress: Optional[bool] = None):
+    """Abrir arquivo de backup em modo texto, com gzip se a extensão for .gz"""
+    if compress is None:
+        compress = _is_gzip(path)
+    if compress:
+        return gzip.open(path, mode + 't', encoding='utf-8', compresslevel=6)
+    return open(path, mode, encoding='utf-8')
+
+
+def write_ndjson(path: str, records: Iterable[Dict[str, Any]]) -> int:
+    """Gravar registros, um JSON por linha, sem materializar a coleção inteira"""
+    count = 0
+    tmp_path = path + '.tmp'
+    with open_backup(tmp_path, 'w', compress=_is_gzip(path)) as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')))
+            f.write('\n')
+            count += 1
+    os.replace(tmp_path, path)
+    return count
+
+
+def read_ndjson(path: str) -> Iterator[Dict[str, Any]]:
+    """Ler registros incrementalmente, linha a linha"""
+    with open_backup(path, 'r') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"Linha {line_number} inválida em {path}: {e}")
+
+
+def iter_batches(records: Iterable[Any], batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[List[Any]]:
+    """Agrupar um iterável em lotes de tamanho limitado"""
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def header_record(source: str) -> Dict[str, Any]:
+    return {
+        'type': 'meta',
+        'version': NDJSON_VERSION,
+        'source': source,
+        'timestamp': datetime.utcnow().isoformat()
+    }
+
+
+def iter_dataset_records(texts: Iterable[Dict], tags: Iterable[Dict], source: str = 'memory') -> Iterator[Dict[str, Any]]:
+    """Converter listas de textos/etiquetas no formato de registros NDJSON"""
+    yield header_record(source)
+    for tag in tags:
+        record = dict(tag)
+        record['type'] = 'tag'
+        yield record
+    for text in texts:
+        record = dict(text)
+        record['tags'] = [t['name'] if isinstance(t, dict) else t for t in text.get('tags', [])]
+        record['type'] = 'text'
+        yield record
+
+
+def iter_sqlite_records(db_path: str, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[Dict[str, Any]]:
+    """Percorrer o banco SQLite (tabelas texts/tags/text_tags) pelo cursor"""
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    try:
+        yield header_record(os.path.basename(db_path))
+
+        # Etiquetas são poucas: mantemos apenas o mapa id -> nome
+        tag_names = {}
+        for row in conn.execute("SELECT id, name, color FROM tags ORDER BY id"):
+            tag_names[row['id']] = row['name']
+            yield {'type': 'tag', 'id': row['id'], 'name': row['name'], 'color': row['color']}
+
+        cursor = conn.execute("""
+            SELECT t.id, t.title, t.content, t.created_at, t.updated_at,
+                   (SELECT GROUP_CONCAT(tt.tag_id) FROM text_tags tt WHERE tt.text_id = t.id) AS tag_ids
+            FROM texts t
+            ORDER BY t.id
+        """)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                tag_ids = [int(i) for i in row['tag_ids'].split(',')] if row['tag_ids'] else []
+                yield {
+                    'type': 'text',
+                    'id': row['id'],
+                    'title': row['title'],
+                    'content': row['content'],
+                    'created_at': row['created_at'],
+                    'updated_at': row['updated_at'],
+                    'tags': [tag_names[i] for i in tag_ids if i in tag_names]
+                }
+    finally:
+        conn.close()
+
+
+def export_sqlite(db_path: str, path: str, batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """Exportar o banco SQLite para NDJSON (gzip se path terminar em .gz)"""
+    return write_ndjson(path, iter_sqlite_records(db_path, batch_size))
+
+
+def import_sqlite(db_path: str, path: str, batch_size: int = DEFAULT_BATCH_SIZE,
+                  text_hash: Optional[Callable[[str, str, List[str]], str]] = None) -> Dict[str, int]:
+    """Importar um backup NDJSON no banco SQLite em lotes limitados.
+
+    Os registros são aplicados sobre os dados existentes: textos com o mesmo
+    id são substituídos e etiquetas são casadas pelo nome. Com `text_hash`
+    (título, conteúdo, etiquetas associadas), a coluna content_hash de cada
+    texto é preenchida no mesmo lote.
+    """
+    conn = sqlite3.connect(db_path)
+    stats = {'texts': 0, 'tags': 0}
+    try:
+        cursor = conn.cursor()
+        tag_ids = {name: tag_id for tag_id, name in cursor.execute("SELECT id, name FROM tags")}
+
+        for batch in iter_batches(read_ndjson(path), batch_size):
+            texts = []
+            for record in batch:
+                kind = record.get('type')
+                if kind == 'tag':
+                    cursor.execute(
+                        "INSERT INTO tags (name, color) VALUES (?, ?) "
+                        "ON CONFLICT(name) DO UPDATE SET color = excluded.color",
+                        (record['name'], record['color'])
+                    )
+                    if record['name'] not in tag_ids:
+                        tag_ids[record['name']] = cursor.execute(
+                            "SELECT id FROM tags WHERE name = ?", (record['name'],)
+                        ).fetchone()[0]
+                    stats['tags'] += 1
+                elif kind == 'text':
+                    texts.append(record)
+
+            if texts:
+                _insert_text_batch(cursor, texts, tag_ids, text_hash)
+                stats['texts'] += len(texts)
+            conn.commit()
+    finally:
+        conn.close()
+    return stats
+
+
+def _insert_text_batch(cursor: sqlite3.Cursor, texts: List[Dict], tag_ids: Dict[str, int],
+                       text_hash: Optional[Callable[[str, str, List[str]], str]] = None):
+    # Só etiquetas existentes são associadas; o hash reflete isso
+    names = [[name for name in text.get('tags', []) if name in tag_ids] for text in texts]
+    columns = 'title, content, created_at, updated_at'
+    placeholders = '?, ?, COALESCE(?, CURRENT_TIMESTAMP), COALESCE(?, CURRENT_TIMESTAMP)'
+    if text_hash is not None:
+        columns += ', content_hash'
+        placeholders += ', ?'
+
+    def values(text, text_names):
+        row = (text['title'], text['content'], text.get('created_at'), text.get('updated_at'))
+        return row + (text_hash(text['title'], text['content'], text_names),) if text_hash else row
+
+    with_id = [(t, n) for t, n in zip(texts, names) if t.get('id') is not None]
+    without_id = [(t, n) for t, n in zip(texts, names) if t.get('id') is None]
+
+    if with_id:
+        cursor.executemany(
+            f"INSERT OR REPLACE INTO texts (id, {columns}) VALUES (?, {placeholders})",
+            [(t['id'],) + values(t, n) for t, n in with_id]
+        )
+        cursor.executemany("DELETE FROM text_tags WHERE text_id = ?", [(t['id'],) for t, _ in with_id])
+
+    for text, text_names in without_id:
+        cursor.execute(f"INSERT INTO texts ({columns}) VALUES ({placeholders})", values(text, text_names))
+        text['id'] = cursor.lastrowid
+
+    links = [(text['id'], tag_ids[name]) for text, text_names in zip(texts, names) for name in text_names]
+    cursor.executemany("INSERT OR IGNORE INTO text_tags (text_id, tag_id) VALUES (?, ?)", links)
+
+
+def load_dataset(path: str) -> tuple[List[Dict], List[Dict]]:
+    """Carregar um backup NDJSON para listas (útil para arquivos pequenos)"""
+    texts = []
+    tags = []
+    for record in read_ndjson(path):
+        kind = record.pop('type', None)
+        if kind == 'text':
+            texts.append(record)
+        elif kind == 'tag':
+            tags.append(record)
+    return texts, tags
+
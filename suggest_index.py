@@ -0,0 +1,163 @@
+import heapq
+import re
+import threading
+import unicodedata
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Limite de palavras indexadas por rótulo: cada palavra inicia uma chave de prefixo
+MAX_WORDS = 8
+# Faixas com mais chaves que isto têm o ranking guardado em cache: inclusões e usos
+# o atualizam no lugar, remoções o descartam
+CACHE_RANGE = 256
+CACHE_DEPTH = 50
+
+_END = '\U0010ffff'
+
+
+# Marcas combinantes (acentos) que sobram depois da decomposição NFKD
+_COMBINING = re.compile('[\u0300-\u036f\u1ab0-\u1aff\u1dc0-\u1dff\u20d0-\u20ff\ufe20-\ufe2f]')
+
+
+def fold(text: str) -> str:
+    """Minúsculas, sem acentos e com espaços normalizados ('Ação  Já' -> 'acao ja')"""
+    text = text or ''
+    if not text.isascii():
+        text = _COMBINING.sub('', unicodedata.normalize('NFKD', text))
+    return ' '.join(text.casefold().split())
+
+
+def _keys(folded: str) -> List[str]:
+    # Uma chave a partir de cada palavra: 'lista de compras' também responde a 'comp'
+    words = folded.split(' ')[:MAX_WORDS]
+    return sorted({' '.join(words[i:]) for i in range(len(words))} - {''})
+
+
+class SuggestIndex:
+    """Índice de prefixos em memória (lista ordenada + bisect) para títulos e nomes de etiquetas.
+
+    Cada entrada é identificada por (tipo, id) e tem um rótulo e um contador
+    de uso; `suggest` devolve as entradas cujo rótulo tem uma palavra que
+    começa com o prefixo, das mais usadas para as menos usadas.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._sorted: List[Tuple[str, str, int]] = []
+        self._entries: Dict[Tuple[str, int], Dict] = {}
+        self._cache: Dict[Tuple[str, Optional[str]], List[Tuple[str, int]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @classmethod
+    def build(cls, entries: Iterable[Tuple[str, int, str, int]]) -> 'SuggestIndex':
+        """Montar o índice de uma vez a partir de tuplas (tipo, id, rótulo, uso)"""
+        index = cls()
+        for kind, item_id, label, usage in entries:
+            folded = fold(label)
+            keys = _keys(folded)
+            index._entries[(kind, item_id)] = {'label': label, 'keys': keys, 'usage': usage}
+            index._sorted.extend((key, kind, item_id) for key in keys)
+        index._sorted.sort()
+        return index
+
+    @staticmethod
+    def _prefixes(keys: Iterable[str]) -> set:
+        return {key[:end] for key in keys for end in range(1, len(key) + 1)}
+
+    def _rank_key(self, item: Tuple[str, int]):
+        entry = self._entries[item]
+        return -entry['usage'], entry['label'].casefold()
+
+    def _invalidate(self, keys: Iterable[str]):
+        """Descartar rankings em cache que podem ter perdido uma entrada"""
+        if not self._cache:
+            return
+        for prefix in self._prefixes(keys):
+            for kind in (None, 'tag', 'text'):
+                self._cache.pop((prefix, kind), None)
+
+    def _promote(self, kind: str, item_id: int):
+        """Uma entrada nova ou mais usada só pode subir: atualiza os rankings em cache no lugar"""
+        if not self._cache:
+            return
+        item = (kind, item_id)
+        rank = self._rank_key(item)
+        for prefix in self._prefixes(self._entries[item]['keys']):
+            for cache_key in ((prefix, None), (prefix, kind)):
+                cached = self._cache.get(cache_key)
+                if cached is None:
+                    continue
+                if item not in cached:
+                    # Ranking cheio e a entrada não supera o último: nada muda
+                    if len(cached) >= CACHE_DEPTH and rank >= self._rank_key(cached[-1]):
+                        continue
+                    cached.append(item)
+                cached.sort(key=self._rank_key)
+                del cached[CACHE_DEPTH:]
+
+    def _unlink(self, kind: str, item_id: int) -> Optional[Dict]:
+        entry = self._entries.pop((kind, item_id), None)
+        if entry is not None:
+            for key in entry['keys']:
+                position = bisect_left(self._sorted, (key, kind, item_id))
+                if position < len(self._sorted) and self._sorted[position] == (key, kind, item_id):
+                    del self._sorted[position]
+            self._invalidate(entry['keys'])
+        return entry
+
+    def add(self, kind: str, item_id: int, label: str, usage: Optional[int] = None):
+        """Incluir ou renomear uma entrada; sem `usage`, uma renomeação mantém o contador"""
+        with self._lock:
+            previous = self._unlink(kind, item_id)
+            if usage is None:
+                usage = previous['usage'] if previous else 0
+            keys = _keys(fold(label))
+            self._entries[(kind, item_id)] = {'label': label, 'keys': keys, 'usage': usage}
+            for key in keys:
+                insort(self._sorted, (key, kind, item_id))
+            self._promote(kind, item_id)
+
+    def remove(self, kind: str, item_id: int):
+        with self._lock:
+            self._unlink(kind, item_id)
+
+    def set_usage(self, kind: str, item_id: int, usage: int):
+        with self._lock:
+            entry = self._entries.get((kind, item_id))
+            if entry is not None and entry['usage'] != usage:
+                decreased = usage < entry['usage']
+                entry['usage'] = usage
+                if decreased:
+                    self._invalidate(entry['keys'])
+                else:
+                    self._promote(kind, item_id)
+
+    def add_usage(self, kind: str, item_id: int, delta: int = 1):
+        with self._lock:
+            entry = self._entries.get((kind, item_id))
+            if entry is not None:
+                self.set_usage(kind, item_id, entry['usage'] + delta)
+
+    def _rank(self, prefix: str, kind: Optional[str], lo: int, hi: int, limit: int) -> List[Tuple[str, int]]:
+        candidates = {(item_kind, item_id) for _, item_kind, item_id in self._sorted[lo:hi]
+                      if kind is None or item_kind == kind}
+        return heapq.nsmallest(limit, candidates, key=self._rank_key)
+
+    def suggest(self, prefix: str, limit: int = 10, kind: Optional[str] = None) -> List[Dict]:
+        folded = fold(prefix)
+        if not folded:
+            return []
+        with self._lock:
+            cached = self._cache.get((folded, kind))
+            if cached is None or len(cached) < min(limit, CACHE_DEPTH):
+                lo = bisect_left(self._sorted, (folded,))
+                hi = bisect_left(self._sorted, (folded + _END,), lo)
+                if hi - lo > CACHE_RANGE and limit <= CACHE_DEPTH:
+                    cached = self._cache[(folded, kind)] = self._rank(folded, kind, lo, hi, CACHE_DEPTH)
+                else:
+                    cached = self._rank(folded, kind, lo, hi, limit)
+            return [{'type': item_kind, 'id': item_id, 'label': self._entries[(item_kind, item_id)]['label'],
+                     'usage': self._entries[(item_kind, item_id)]['usage']}
+                    for item_kind, item_id in cached[:limit]]
@@ -0,0 +1,176 @@
+import threading
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+EPOCH = date(1970, 1, 1)
+
+
+def day_number(value) -> int:
+    """Dias desde 1970-01-01 de uma data ('2025-06-01', '2025-06-01 10:00:00' ou date)"""
+    if isinstance(value, date):
+        return (value - EPOCH).days
+    return (date.fromisoformat(str(value)[:10]) - EPOCH).days
+
+
+class TagStats:
+    """Contagens por etiqueta, coocorrência e histogramas diários em arrays NumPy.
+
+    A matriz de coocorrência (etiquetas x etiquetas) tem na diagonal o total
+    de textos de cada etiqueta. O histograma (etiquetas x dias) conta os
+    textos de cada etiqueta pela data de criação. Cada mudança nas etiquetas
+    de um texto é aplicada com `change_text`, sem consultar a tabela de textos.
+    """
+
+    def __init__(self, tag_ids: Iterable[int] = ()):
+        self._lock = threading.RLock()
+        self._columns: Dict[int, int] = {}
+        self._free: List[int] = []
+        self._used = 0
+        self._tag_ids = np.full(0, -1, dtype=np.int64)
+        self._cooccurrence = np.zeros((0, 0), dtype=np.int64)
+        self._histogram = np.zeros((0, 0), dtype=np.int64)
+        self._first_day = 0
+        for tag_id in tag_ids:
+            self.add_tag(tag_id)
+
+    @classmethod
+    def build(cls, tag_ids: Sequence[int], links: Iterable[tuple], chunk: int = 2048) -> 'TagStats':
+        """Montar a partir de (text_id, tag_id, data de criação), agrupados por texto"""
+        stats = cls(tag_ids)
+        rows = [(text_id, tag_id, day) for text_id, tag_id, day in links if tag_id in stats._columns]
+        if not rows:
+            return stats
+
+        text_ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+        columns = np.fromiter((stats._columns[row[1]] for row in rows), dtype=np.int64, count=len(rows))
+        days = np.array([str(row[2])[:10] for row in rows], dtype='datetime64[D]').astype(np.int64)
+
+        with stats._lock:
+            stats._ensure_days(int(days.min()), int(days.max()))
+            np.add.at(stats._histogram, (columns, days - stats._first_day), 1)
+
+            # Coocorrência = Xᵀ·X, com X a matriz de incidência textos x etiquetas, em blocos de textos
+            _, text_rows = np.unique(text_ids, return_inverse=True)
+            width = stats._used
+            for first in range(0, int(text_rows.max()) + 1, chunk):
+                selected = (text_rows >= first) & (text_rows < first + chunk)
+                incidence = np.zeros((chunk, width), dtype=np.float64)
+                incidence[text_rows[selected] - first, columns[selected]] = 1.0
+                stats._cooccurrence[:width, :width] += np.rint(incidence.T @ incidence).astype(np.int64)
+        return stats
+
+    # Etiquetas e dias
+
+    def add_tag(self, tag_id: int):
+        with self._lock:
+            if tag_id in self._columns:
+                return
+            if self._free:
+                column = self._free.pop()
+            else:
+                column = self._used
+                if column == len(self._tag_ids):
+                    self._grow(max(16, 2 * column))
+                self._used += 1
+            self._columns[tag_id] = column
+            self._tag_ids[column] = tag_id
+
+    def _grow(self, capacity: int):
+        old = len(self._cooccurrence)
+        tag_ids = np.full(capacity, -1, dtype=np.int64)
+        tag_ids[:len(self._tag_ids)] = self._tag_ids
+        cooccurrence = np.zeros((capacity, capacity), dtype=np.int64)
+        cooccurrence[:old, :old] = self._cooccurrence
+        histogram = np.zeros((capacity, self._histogram.shape[1]), dtype=np.int64)
+        histogram[:old] = self._histogram
+        self._tag_ids, self._cooccurrence, self._histogram = tag_ids, cooccurrence, histogram
+
+    def remove_tag(self, tag_id: int):
+        with self._lock:
+            column = self._columns.pop(tag_id, None)
+            if column is None:
+                return
+            self._cooccurrence[column, :] = 0
+            self._cooccurrence[:, column] = 0
+            self._histogram[column, :] = 0
+            self._tag_ids[column] = -1
+            self._free.append(column)
+
+    def _ensure_days(self, first: int, last: int):
+        days = self._histogram.shape[1]
+        if days == 0:
+            self._first_day = first
+            self._histogram = np.zeros((len(self._cooccurrence), last - first + 1), dtype=np.int64)
+            return
+        before = max(0, self._first_day - first)
+        after = max(0, last - (self._first_day + days - 1))
+        if before or after:
+            # Margem extra à direita: os textos novos caem quase sempre no dia atual
+            after = after and after + 30
+            self._histogram = np.pad(self._histogram, ((0, 0), (before, after)))
+            self._first_day -= before
+
+    # Mudanças
+
+    def change_text(self, created, old_tag_ids: Iterable[int] = (), new_tag_ids: Iterable[int] = ()):
+        """Trocar as etiquetas de um texto criado em `created` de old_tag_ids para new_tag_ids"""
+        with self._lock:
+            old = np.array(sorted({self._columns[t] for t in old_tag_ids if t in self._columns}), dtype=np.int64)
+            new = np.array(sorted({self._columns[t] for t in new_tag_ids if t in self._columns}), dtype=np.int64)
+            if not len(old) and not len(new):
+                return
+            day = day_number(created)
+            self._ensure_days(day, day)
+            offset = day - self._first_day
+            if len(old):
+                self._cooccurrence[np.ix_(old, old)] -= 1
+                self._histogram[old, offset] -= 1
+            if len(new):
+                self._cooccurrence[np.ix_(new, new)] += 1
+                self._histogram[new, offset] += 1
+
+    # Consultas
+
+    def counts(self) -> Dict[int, int]:
+        with self._lock:
+            return {tag_id: int(self._cooccurrence[column, column]) for tag_id, column in self._columns.items()}
+
+    def cooccurrence(self, limit: Optional[int] = None) -> List[Dict]:
+        """Pares de etiquetas que aparecem juntas, dos mais frequentes para os menos"""
+        with self._lock:
+            size = self._used
+            upper = np.triu(self._cooccurrence[:size, :size], 1)
+            first, second = np.nonzero(upper)
+            counts = upper[first, second]
+            tag_ids = self._tag_ids.copy()
+        order = np.argsort(-counts, kind='stable')[:limit]
+        return [{'tag_ids': sorted((int(tag_ids[first[i]]), int(tag_ids[second[i]]))), 'count': int(counts[i])}
+                for i in order]
+
+    def daily(self, start, end, tag_ids: Optional[Iterable[int]] = None) -> Dict:
+        """Textos por dia de cada etiqueta entre `start` e `end` (inclusive)"""
+        first, last = day_number(start), day_number(end)
+        with self._lock:
+            columns = dict(self._columns) if tag_ids is None else {t: self._columns[t] for t in tag_ids
+                                                             if t in self._columns}
+            days = self._histogram.shape[1]
+            window = np.zeros((len(columns), max(0, last - first + 1)), dtype=np.int64)
+            low, high = max(first, self._first_day), min(last, self._first_day + days - 1)
+            if days and low <= high:
+                rows = np.fromiter(columns.values(), dtype=np.int64, count=len(columns))
+                window[:, low - first:high - first + 1] = \
+                    self._histogram[rows, low - self._first_day:high - self._first_day + 1]
+        series = {tag_id: window[i].tolist() for i, tag_id in enumerate(columns) if window[i].any()}
+        return {
+            'dates': [(EPOCH + timedelta(days=day)).isoformat() for day in range(first, last + 1)],
+            'series': series
+        }
+
+    def last_day(self) -> Optional[date]:
+        with self._lock:
+            if not self._histogram.shape[1]:
+                return None
+            active = np.flatnonzero(self._histogram.any(axis=0))
+            return EPOCH + timedelta(days=self._first_day + int(active[-1])) if len(active) else None
@@ -0,0 +1,363 @@
+import argparse
+import hashlib
+import os
+import re
+import sqlite3
+import sys
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence
+
+TENANT_HEADER = 'X-Gtex-Tenant'
+TENANT_PATTERN = re.compile(r'^[A-Za-z0-9][A-Za-z0-9_.-]{0,63}$')
+TENANT_SUFFIX = '.db'
+
+
+class TenantError(ValueError):
+    """Identificador de tenant inválido"""
+
+
+def schema_from_metadata(metadata) -> str:
+    """DDL (CREATE TABLE IF NOT EXISTS) das tabelas de um MetaData do SQLAlchemy, no dialeto SQLite"""
+    from sqlalchemy.dialects import sqlite
+    from sqlalchemy.schema import CreateTable
+
+    dialect = sqlite.dialect()
+    return ';\n'.join(str(CreateTable(table, if_not_exists=True).compile(dialect=dialect)).strip()
+                      for table in metadata.sorted_tables) + ';'
+
+
+class TenantRouter:
+    """Um arquivo SQLite por tenant, com um LRU limitado de conexões abertas.
+
+    Os arquivos ficam em `base_dir/<2 primeiros hex do sha1>/<tenant>.db`,
+    para que dezenas de milhares de tenants não caiam no mesmo diretório.
+    O banco de um tenant é criado na primeira vez que é usado, com `schema`;
+    as `migrations` (scripts SQL) são aplicadas em ordem conforme o
+    PRAGMA user_version do arquivo, então cada tenant migra sozinho.
+
+    `checkout`/`checkin` emprestam conexões: as ociosas ficam no LRU e as
+    menos usadas são fechadas quando o total de abertas passa de `max_open`.
+    """
+
+    def __init__(self, base_dir: str, max_open: int = 256, schema: str = '', migrations: Sequence[str] = (),
+                 pragmas: Sequence[str] = (), connection_factory=sqlite3.Connection,
+                 on_connect: Optional[Callable[[sqlite3.Connection], None]] = None, timeout: float = 30.0):
+        self.base_dir = base_dir
+        os.makedirs(base_dir, exist_ok=True)
+        self.max_open = max_open
+        self.schema = schema
+        self.migrations = tuple(migrations)
+        # Lido a cada nova conexão: o serve.py ajusta por processo após o fork
+        self.pragmas = tuple(pragmas)
+        self.connection_factory = connection_factory
+        self.on_connect = on_connect
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        # tenant -> conexões ociosas; a ordem do dicionário é a ordem de uso (LRU)
+        self._idle: 'OrderedDict[str, List[sqlite3.Connection]]' = OrderedDict()
+        self._owners: Dict[int, str] = {}
+        self._ready = set()
+        self._prepare_locks: Dict[str, threading.Lock] = {}
+        self.stats = {'hits': 0, 'misses': 0, 'evicted': 0}
+
+    # Arquivos
+
+    @staticmethod
+    def validate(tenant: str) -> str:
+        if not tenant or not TENANT_PATTERN.match(tenant):
+            raise TenantError(f'Tenant inválido: {tenant!r}')
+        return tenant
+
+    def path(self, tenant: str) -> str:
+        shard = hashlib.sha1(self.validate(tenant).encode('utf-8')).hexdigest()[:2]
+        return os.path.join(self.base_dir, shard, tenant + TENANT_SUFFIX)
+
+    def exists(self, tenant: str) -> bool:
+        return os.path.exists(self.path(tenant))
+
+    def tenants(self) -> Iterator[str]:
+        """Tenants com banco criado (ordem dos diretórios)"""
+        for shard in sorted(os.listdir(self.base_dir)):
+            shard_dir = os.path.join(self.base_dir, shard)
+            if not os.path.isdir(shard_dir):
+                continue
+            for name in sorted(os.listdir(shard_dir)):
+                if name.endswith(TENANT_SUFFIX):
+                    yield name[:-len(TENANT_SUFFIX)]
+
+    def _connect(self, path: str) -> sqlite3.Connection:
+        # check_same_thread=False: a conexão volta ao LRU e pode ser emprestada a outra thread
+        connection = sqlite3.connect(path, timeout=self.timeout, factory=self.connection_factory,
+                                     check_same_thread=False)
+        for pragma in self.pragmas:
+            connection.execute(f'PRAGMA {pragma}')
+        return connection
+
+    def prepare(self, tenant: str) -> str:
+        """Criar o banco do tenant e aplicar migrações pendentes; devolve o caminho"""
+        path = self.path(tenant)
+        if tenant in self._ready:
+            return path
+        with self._lock:
+            prepare_lock = self._prepare_locks.setdefault(tenant, threading.Lock())
+        with prepare_lock:
+            if tenant not in self._ready:
+                self.migrate(tenant)
+                self._ready.add(tenant)
+        with self._lock:
+            self._prepare_locks.pop(tenant, None)
+        return path
+
+    def migrate(self, tenant: str) -> int:
+        """Aplicar schema e migrações pendentes; devolve quantas migrações rodaram"""
+        path = self.path(tenant)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        connection = sqlite3.connect(path, timeout=self.timeout)
+        try:
+            version = connection.execute('PRAGMA user_version').fetchone()[0]
+            if version == 0 and self.schema:
+                connection.executescript(self.schema)
+            pending = self.migrations[version:]
+            for number, script in enumerate(pending, start=version + 1):
+                connection.executescript(f'BEGIN; {script}; PRAGMA user_version = {number}; COMMIT;')
+            return len(pending)
+        finally:
+            connection.close()
+
+    # Empréstimo de conexões
+
+    def checkout(self, tenant: str) -> sqlite3.Connection:
+        path = self.prepare(tenant)
+        with self._lock:
+            idle = self._idle.get(tenant)
+            if idle:
+                self.stats['hits'] += 1
+                connection = idle.pop()
+                if not idle:
+                    del self._idle[tenant]
+                return connection
+            self.stats['misses'] += 1
+
+        connection = self._connect(path)
+        if self.on_connect is not None:
+            self.on_connect(connection)
+        with self._lock:
+            self._owners[id(connection)] = tenant
+            evicted = self._evict_locked()
+        self._close_all(evicted)
+        return connection
+
+    def checkin(self, connection: sqlite3.Connection):
+        if connection.in_transaction:
+            connection.rollback()
+        with self._lock:
+            tenant = self._owners.get(id(connection))
+            if tenant is None:
+                evicted = [connection]
+            else:
+                self._idle.setdefault(tenant, []).append(connection)
+                self._idle.move_to_end(tenant)
+                evicted = self._evict_locked()
+        self._close_all(evicted)
+
+    @contextmanager
+    def connection(self, tenant: str):
+        connection = self.checkout(tenant)
+        try:
+            yield connection
+        finally:
+            self.checkin(connection)
+
+    def _evict_locked(self) -> List[sqlite3.Connection]:
+        # Só fecha conexões ociosas; emprestadas continuam contando até voltarem
+        evicted = []
+        while len(self._owners) > self.max_open and self._idle:
+            tenant, idle = next(iter(self._idle.items()))
+            connection = idle.pop(0)
+            if not idle:
+                del self._idle[tenant]
+            del self._owners[id(connection)]
+            evicted.append(connection)
+        self.stats['evicted'] += len(evicted)
+        return evicted
+
+    @staticmethod
+    def _close_all(connections: List[sqlite3.Connection]):
+        for connection in connections:
+            try:
+                connection.close()
+            except sqlite3.Error:
+                pass
+
+    def release(self, tenant: str) -> int:
+        """Fechar as conexões ociosas de um tenant (antes de VACUUM, restauração, remoção)"""
+        with self._lock:
+            idle = self._idle.pop(tenant, [])
+            for connection in idle:
+                del self._owners[id(connection)]
+        self._close_all(idle)
+        return len(idle)
+
+    def open_connections(self) -> int:
+        with self._lock:
+            return len(self._owners)
+
+    def close(self):
+        with self._lock:
+            idle = [connection for connections in self._idle.values() for connection in connections]
+            self._idle.clear()
+            self._owners.clear()
+        self._close_all(idle)
+
+    # Manutenção por tenant
+
+    def vacuum(self, tenant: str) -> Dict:
+        """VACUUM do banco de um tenant; devolve o tamanho antes e depois"""
+        path = self.prepare(tenant)
+        before = os.path.getsize(path)
+        self.release(tenant)
+        connection = sqlite3.connect(path, timeout=self.timeout)
+        try:
+            connection.execute('VACUUM')
+            connection.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        finally:
+            connection.close()
+        after = os.path.getsize(path)
+        print(f"✓ VACUUM do tenant {tenant}: {before} -> {after} bytes")
+        return {'tenant': tenant, 'bytes_before': before, 'bytes_after': after}
+
+    def snapshot_manager(self, tenant: str, backup_dir: str, keep: int = 5):
+        """SQLiteSnapshotManager do tenant, com snapshots em `backup_dir/<shard>/<tenant>/`"""
+        from src.utils.sqlite_snapshot import SQLiteSnapshotManager
+        path = self.prepare(tenant)
+        shard = os.path.basename(os.path.dirname(path))
+        return SQLiteSnapshotManager(path, os.path.join(backup_dir, shard, tenant), keep=keep)
+
+    def backup(self, tenant: str, backup_dir: str, keep: int = 5) -> Optional[str]:
+        """Snapshot a quente (API de backup online) do banco de um tenant"""
+        return self.snapshot_manager(tenant, backup_dir, keep).create_snapshot()
+
+
+class TenantEngines:
+    """LRU de engines do SQLAlchemy, uma por tenant, sobre os arquivos de um TenantRouter.
+
+    Uma engine despejada do LRU é descartada com dispose(), o que fecha as
+    conexões ociosas do seu pool; o total de arquivos abertos fica limitado
+    a `max_engines` vezes o tamanho do pool.
+    """
+
+    def __init__(self, router: TenantRouter, max_engines: int = 64, engine_options: Optional[Dict] = None):
+        self.router = router
+        self.max_engines = max_engines
+        self.engine_options = dict(engine_options or {})
+        self._engines = OrderedDict()
+        self._lock = threading.Lock()
+
+    def engine(self, tenant: str):
+        with self._lock:
+            engine = self._engines.get(tenant)
+            if engine is not None:
+                self._engines.move_to_end(tenant)
+                return engine
+
+        from sqlalchemy import create_engine, event
+        path = self.router.prepare(tenant)
+        engine = create_engine(f'sqlite:///{path}', **self.engine_options)
+
+        @event.listens_for(engine, 'connect')
+        def apply_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for pragma in self.router.pragmas:
+                cursor.execute(f'PRAGMA {pragma}')
+            cursor.close()
+
+        evicted = []
+        with self._lock:
+            existing = self._engines.get(tenant)
+            if existing is not None:
+                # Outra thread criou a engine ao mesmo tempo; fica a primeira
+                evicted.append(engine)
+                engine = existing
+            else:
+                self._engines[tenant] = engine
+                while len(self._engines) > self.max_engines:
+                    evicted.append(self._engines.popitem(last=False)[1])
+        for old in evicted:
+            old.dispose()
+        return engine
+
+    def release(self, tenant: str):
+        with self._lock:
+            engine = self._engines.pop(tenant, None)
+        if engine is not None:
+            engine.dispose()
+
+    def close(self):
+        with self._lock:
+            engines = list(self._engines.values())
+            self._engines.clear()
+        for engine in engines:
+            engine.dispose()
+
+
+def _tenant_session_class():
+    from flask import current_app, g, has_app_context
+    from flask_sqlalchemy.session import Session
+
+    class TenantSession(Session):
+        """Sessão do Flask-SQLAlchemy que usa a engine do tenant da requisição (g.tenant)"""
+
+        def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+            if bind is None and has_app_context():
+                engines = current_app.extensions.get('tenant_engines')
+                tenant = g.get('tenant')
+                if engines is not None and tenant:
+                    return engines.engine(tenant)
+            return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    return TenantSession
+
+
+def install_tenant_session(app, db, engines: TenantEngines):
+    """Trocar db.session por uma sessão que roteia cada requisição para o banco do tenant"""
+    app.extensions['tenant_engines'] = engines
+    # O Flask-SQLAlchemy só aceita session_options no construtor; a sessão é refeita aqui
+    db.session = db._make_scoped_session({'class_': _tenant_session_class()})
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m src.utils.tenant_router',
+                                     description='Manutenção dos bancos por tenant')
+    parser.add_argument('base_dir', help='diretório dos bancos (GTEX_TENANT_DIR)')
+    parser.add_argument('command', choices=('list', 'vacuum', 'backup'))
+    parser.add_argument('tenants', nargs='*', help='tenants (padrão: todos)')
+    parser.add_argument('--backup-dir', help='destino dos snapshots (padrão: <base_dir>/../tenant_backups)')
+    parser.add_argument('--keep', type=int, default=5, help='snapshots mantidos por tenant')
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    router = TenantRouter(args.base_dir)
+    tenants = args.tenants or list(router.tenants())
+    backup_dir = args.backup_dir or os.path.join(os.path.dirname(os.path.abspath(args.base_dir)),
+                                                 'tenant_backups')
+    failures = 0
+    for tenant in tenants:
+        try:
+            if args.command == 'list':
+                print(f"{tenant}\t{os.path.getsize(router.path(tenant))}")
+            elif args.command == 'vacuum':
+                router.vacuum(tenant)
+            elif router.backup(tenant, backup_dir, args.keep) is None:
+                failures += 1
+        except (TenantError, OSError, sqlite3.Error) as e:
+            print(f"✗ {tenant}: {e}")
+            failures += 1
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
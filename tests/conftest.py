@@ -0,0 +1,37 @@
+import pytest
+
+
+@pytest.fixture
+def gtex_app(tmp_path, monkeypatch):
+    """Módulo app.py com um banco vazio em tmp_path e índices derivados zerados"""
+    import src.utils.app as gtex_app
+
+    monkeypatch.setattr(gtex_app, 'DATABASE', str(tmp_path / 'gtex.db'))
+    gtex_app.derived_indexes.clear()
+    gtex_app.init_db()
+    yield gtex_app
+    # Aberturas pendentes vão para o banco do teste, não para o do atexit
+    gtex_app.flush_usage()
+    gtex_app.usage_flushed.clear()
+    for state in gtex_app.derived_indexes.values():
+        if state['watch'] is not None:
+            state['watch'].close()
+    gtex_app.derived_indexes.clear()
+
+
+@pytest.fixture(scope='session')
+def main_app(tmp_path_factory):
+    """app Flask do main.py, com banco e armazenamentos em um diretório temporário da sessão"""
+    import os
+    os.environ['GTEX_DATA_DIR'] = str(tmp_path_factory.mktemp('main'))
+    os.environ.setdefault('GTEX_AUTOSAVE_WINDOW', '0.01')
+    from src.main import app
+    return app
+
+
+@pytest.fixture
+def gist_stub():
+    from benchmarks.gist_stub import GistStub
+    stub = GistStub()
+    yield stub
+    stub.close()
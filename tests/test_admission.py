@@ -0,0 +1,143 @@
+import threading
+import time
+
+import pytest
+from flask import Flask
+
+from src.utils.admission import AdmissionController, RouteClass, _client, install_from_env
+
+
+class GatedApp:
+    """App WSGI que registra a ordem de entrada e segura cada requisição até o seu `gtex.gate`"""
+
+    def __init__(self):
+        self.entered = []
+        self.lock = threading.Lock()
+
+    def __call__(self, environ, start_response):
+        with self.lock:
+            self.entered.append(environ.get('gtex.name'))
+        gate = environ.get('gtex.gate')
+        if gate is not None:
+            gate.wait(5)
+        start_response('200 OK', [('Content-Type', 'text/plain')])
+        return [b'ok']
+
+
+def _environ(method='GET', path='/api/texts', remote='10.0.0.1', **extra):
+    return dict({'REQUEST_METHOD': method, 'PATH_INFO': path, 'REMOTE_ADDR': remote}, **extra)
+
+
+def _call(controller, environ, results=None):
+    responses = []
+    body = b''.join(controller(environ, lambda status, headers: responses.append((status, dict(headers)))))
+    status, headers = responses[0]
+    if results is not None:
+        results.append((environ.get('gtex.name'), int(status[:3]), headers.get('Retry-After')))
+    return int(status[:3]), headers, body
+
+
+def _background(controller, environ, results):
+    thread = threading.Thread(target=_call, args=(controller, environ, results), daemon=True)
+    thread.start()
+    return thread
+
+
+def _wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+def test_forwarded_for_is_trusted_only_from_local_peers():
+    assert _client(_environ(remote='', HTTP_X_FORWARDED_FOR='1.1.1.1, 2.2.2.2')) == '2.2.2.2'
+    assert _client(_environ(remote='<local>', HTTP_X_FORWARDED_FOR='3.3.3.3')) == '3.3.3.3'
+    assert _client(_environ(remote='10.0.0.9', HTTP_X_FORWARDED_FOR='3.3.3.3')) == '10.0.0.9'
+
+
+def test_full_queue_gets_429_and_non_api_passes():
+    app = GatedApp()
+    controller = AdmissionController(app, {'read': RouteClass('read', limit=1, queue=0, deadline=1)})
+    gate = threading.Event()
+    results = []
+    holder = _background(controller, _environ(**{'gtex.gate': gate}), results)
+    _wait_for(lambda: app.entered)
+
+    status, headers, body = _call(controller, _environ())
+    assert status == 429 and int(headers['Retry-After']) >= 1 and b'retry_after' in body
+    assert _call(controller, _environ(path='/static/app.js'))[0] == 200
+
+    gate.set()
+    holder.join()
+    assert controller.stats['read'] == {'admitted': 1, 'queued': 0, 'rejected_full': 1, 'rejected_deadline': 0}
+
+
+def test_queued_request_runs_when_a_slot_opens_or_times_out():
+    app = GatedApp()
+    controller = AdmissionController(app, {'read': RouteClass('read', limit=1, queue=4, deadline=0.2)})
+    gate = threading.Event()
+    results = []
+    holder = _background(controller, _environ(**{'gtex.gate': gate, 'gtex.name': 'primeira'}), results)
+    _wait_for(lambda: app.entered)
+
+    # O prazo vence com a vaga ainda ocupada
+    assert _call(controller, _environ())[0] == 503
+
+    waiting = _background(controller, _environ(**{'gtex.name': 'segunda'}), results)
+    _wait_for(lambda: controller._queued['read'] == 1)
+    gate.set()
+    holder.join()
+    waiting.join()
+    assert sorted(results) == [('primeira', 200, None), ('segunda', 200, None)]
+    assert controller.stats['read']['rejected_deadline'] == 1
+
+
+def test_reads_are_served_before_queued_writes():
+    app = GatedApp()
+    controller = AdmissionController(app, {
+        'read': RouteClass('read', limit=1, queue=4, deadline=5, priority=0),
+        'write': RouteClass('write', limit=1, queue=4, deadline=5, priority=1),
+    }, max_in_flight=1)
+    gate = threading.Event()
+    results = []
+    threads = [_background(controller, _environ(**{'gtex.gate': gate, 'gtex.name': 'ocupa'}), results)]
+    _wait_for(lambda: app.entered)
+
+    threads.append(_background(controller, _environ('POST', **{'gtex.name': 'escrita'}), results))
+    _wait_for(lambda: controller._queued['write'] == 1)
+    threads.append(_background(controller, _environ(**{'gtex.name': 'leitura'}), results))
+    _wait_for(lambda: controller._queued['read'] == 1)
+
+    gate.set()
+    for thread in threads:
+        thread.join()
+    assert app.entered == ['ocupa', 'leitura', 'escrita']
+
+
+def test_per_client_limit():
+    app = GatedApp()
+    controller = AdmissionController(app, {
+        'write': RouteClass('write', limit=4, queue=4, deadline=5, per_client=1)})
+    gate = threading.Event()
+    results = []
+    holder = _background(controller, _environ('POST', **{'gtex.gate': gate}), results)
+    _wait_for(lambda: app.entered)
+
+    assert _call(controller, _environ('POST'))[0] == 429
+    assert _call(controller, _environ('POST', remote='10.0.0.2'))[0] == 200
+    gate.set()
+    holder.join()
+    assert controller._clients == {}
+
+
+@pytest.mark.parametrize('value, installed', [('0', False), ('1', True)])
+def test_install_from_env(monkeypatch, value, installed):
+    monkeypatch.setenv('GTEX_ADMISSION', value)
+    monkeypatch.setenv('GTEX_ADMISSION_WRITES', '3')
+    flask_app = Flask(__name__)
+    controller = install_from_env(flask_app)
+    assert (controller is not None) == installed
+    if installed:
+        assert flask_app.wsgi_app is controller and flask_app.extensions['admission'] is controller
+        assert controller.classes['write'].limit == 3
@@ -0,0 +1,79 @@
+import threading
+import time
+
+from src.utils.autosave import DebouncedSaver
+
+
+class Recorder:
+    def __init__(self, result=True):
+        self.result = result
+        self.calls = []
+        self.saved = threading.Event()
+
+    def __call__(self, *args):
+        self.calls.append(args)
+        self.saved.set()
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+def test_burst_becomes_one_save_with_latest_payload():
+    save = Recorder()
+    saver = DebouncedSaver(save, window=0.05, max_delay=5)
+    for i in range(5):
+        saver.request_save([{'id': i}], [])
+    assert save.saved.wait(2)
+    time.sleep(0.1)
+    saver.close()
+
+    assert save.calls == [([{'id': 4}], [])]
+    assert saver.stats == {'requests': 5, 'saves': 1, 'failures': 0}
+
+
+def test_max_delay_bounds_a_continuous_burst():
+    save = Recorder()
+    saver = DebouncedSaver(save, window=0.2, max_delay=0.1)
+    started = time.monotonic()
+    while not save.saved.is_set() and time.monotonic() - started < 2:
+        saver.request_save([], [])
+        time.sleep(0.01)
+    saver.close()
+    assert save.saved.is_set()
+    assert time.monotonic() - started < 1
+
+
+def test_snapshot_fn_supplies_extra_arguments():
+    save = Recorder()
+    saver = DebouncedSaver(save, snapshot_fn=lambda: (['t'], ['g'], frozenset({1})), window=60)
+    saver.request_save()
+    assert saver.flush()
+    saver.close()
+    assert save.calls == [(['t'], ['g'], frozenset({1}))]
+
+
+def test_flush_returns_the_real_result():
+    save = Recorder(result=False)
+    saver = DebouncedSaver(save, window=60)
+    assert saver.flush()
+
+    saver.request_save([], [])
+    assert not saver.flush()
+    # Sem nada pendente, flush devolve o resultado do último salvamento
+    assert not saver.flush()
+
+    save.result = RuntimeError('disco cheio')
+    saver.request_save([], [])
+    assert not saver.flush()
+    saver.close()
+    assert saver.stats['failures'] == 2
+
+
+def test_close_saves_pending_and_ignores_later_requests():
+    save = Recorder()
+    saver = DebouncedSaver(save, window=60)
+    saver.request_save([{'id': 1}], [])
+    saver.close()
+    saver.request_save([{'id': 2}], [])
+    assert saver.flush()
+    assert save.calls == [([{'id': 1}], [])]
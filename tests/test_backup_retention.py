@@ -0,0 +1,84 @@
+import json
+import os
+import time
+from datetime import datetime, timedelta
+
+from src.utils.backup_retention import (MANIFEST_FILE, BackupManifest, BackupRetentionEngine, RetentionPolicy,
+                                        parse_backup_name)
+
+START = datetime(2025, 1, 6, 0, 0, 0)
+
+
+def _backup(directory, timestamp, engine=None):
+    name = f"backup_{timestamp.strftime('%Y%m%d_%H%M%S')}.json"
+    (directory / name).write_text('{}', encoding='utf-8')
+    if engine is not None:
+        engine.register(name, timestamp)
+    return name
+
+
+def test_parse_backup_name():
+    assert parse_backup_name('backup_20250101_120000.json') == datetime(2025, 1, 1, 12, 0, 0)
+    assert parse_backup_name('backup_quebrado.json') is None
+    assert parse_backup_name('outro_20250101_120000.json') is None
+
+
+def test_policy_keeps_last_and_one_per_period():
+    entries = [{'name': str(i), 'timestamp': (START + timedelta(minutes=30 * i)).strftime('%Y%m%d_%H%M%S')}
+               for i in range(96)]
+    keep = RetentionPolicy(keep_last=3, hourly=4, daily=2, weekly=0).select(entries)
+    # 3 últimos, o último de cada uma das 4 horas mais recentes e o último do dia anterior
+    assert keep == {'95', '94', '93', '91', '89', '47'}
+
+
+def test_manifest_round_trip_and_out_of_order(tmp_path):
+    manifest = BackupManifest(str(tmp_path))
+    manifest.add('backup_b.json', START + timedelta(hours=1))
+    manifest.add('backup_a.json', START)
+    manifest.add('backup_b.json', START + timedelta(hours=1))
+    assert [e['name'] for e in manifest.snapshot()] == ['backup_a.json', 'backup_b.json']
+
+    reopened = BackupManifest(str(tmp_path))
+    assert reopened.latest() == 'backup_b.json'
+    assert not os.path.exists(manifest.path + '.tmp')
+
+
+def test_corrupted_manifest_is_rebuilt_from_directory(tmp_path):
+    names = [_backup(tmp_path, START + timedelta(hours=h)) for h in (2, 0, 1)]
+    (tmp_path / MANIFEST_FILE).write_text('{"entries": [', encoding='utf-8')
+
+    manifest = BackupManifest(str(tmp_path))
+    assert [e['name'] for e in manifest.snapshot()] == sorted(names)
+
+
+def test_latest_path_rebuilds_when_file_is_missing(tmp_path):
+    engine = BackupRetentionEngine(str(tmp_path))
+    older = _backup(tmp_path, START, engine)
+    newer = _backup(tmp_path, START + timedelta(hours=1), engine)
+    os.remove(tmp_path / newer)
+
+    assert engine.latest_path() == str(tmp_path / older)
+    with open(tmp_path / MANIFEST_FILE, encoding='utf-8') as f:
+        assert [e['name'] for e in json.load(f)['entries']] == [older]
+
+
+def test_prune_removes_files_and_manifest_entries(tmp_path):
+    engine = BackupRetentionEngine(str(tmp_path), RetentionPolicy(keep_last=2, hourly=0, daily=0, weekly=0))
+    names = [_backup(tmp_path, START + timedelta(minutes=m), engine) for m in range(5)]
+    os.remove(tmp_path / names[0])
+
+    assert engine.prune() == 3
+    assert sorted(f for f in os.listdir(tmp_path) if f != MANIFEST_FILE) == names[-2:]
+    assert [e['name'] for e in engine.manifest.snapshot()] == names[-2:]
+
+
+def test_prune_async_runs_in_background(tmp_path):
+    engine = BackupRetentionEngine(str(tmp_path), RetentionPolicy(keep_last=1, hourly=0, daily=0, weekly=0))
+    names = [_backup(tmp_path, START + timedelta(minutes=m), engine) for m in range(3)]
+    for _ in range(3):
+        engine.prune_async()
+
+    deadline = time.monotonic() + 5
+    while engine._worker is not None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert [e['name'] for e in engine.manifest.snapshot()] == names[-1:]
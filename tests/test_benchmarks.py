@@ -0,0 +1,65 @@
+import sqlite3
+
+from benchmarks.generator import DatasetSpec, generate_dataset, populate_sqlite
+from benchmarks.harness import Scenario, compare, percentile, run_scenario
+
+
+def test_same_seed_generates_same_dataset():
+    spec = DatasetSpec(texts=50, tags=10, seed=7)
+    assert generate_dataset(spec) == generate_dataset(DatasetSpec(texts=50, tags=10, seed=7))
+    assert generate_dataset(spec) != generate_dataset(DatasetSpec(texts=50, tags=10, seed=8))
+
+
+def test_dataset_respects_spec():
+    texts, tags = generate_dataset(DatasetSpec(texts=200, tags=8, content_max=300, tags_per_text=(1, 3)))
+    assert len(texts) == 200 and len(tags) == 8
+    assert len({tag['name'] for tag in tags}) == 8
+    names = {tag['name'] for tag in tags}
+    for text in texts:
+        assert 1 <= len(text['tags']) <= 3 and set(text['tags']) <= names
+        assert 1 <= len(text['content']) <= 300
+
+
+def test_populate_sqlite_shifts_ids_after_existing_rows(gtex_app, tmp_path):
+    conn = sqlite3.connect(gtex_app.DATABASE)
+    existing = conn.execute('SELECT COUNT(*) FROM texts').fetchone()[0]
+    conn.close()
+    texts, tags = generate_dataset(DatasetSpec(texts=30, tags=5))
+
+    text_offset, tag_offset = populate_sqlite(gtex_app.DATABASE, texts, tags)
+    conn = sqlite3.connect(gtex_app.DATABASE)
+    try:
+        assert conn.execute('SELECT COUNT(*) FROM texts').fetchone()[0] == existing + 30
+        assert conn.execute('SELECT title FROM texts WHERE id = ?', (text_offset + 1,)).fetchone()[0] == \
+            texts[0]['title']
+        assert conn.execute('SELECT COUNT(*) FROM text_tags WHERE text_id > ?', (text_offset,)).fetchone()[0] == \
+            sum(len(text['tags']) for text in texts)
+        assert conn.execute('SELECT MIN(id) FROM tags WHERE name LIKE ?', ('tag-%',)).fetchone()[0] == tag_offset + 1
+    finally:
+        conn.close()
+
+
+def test_percentile_interpolates():
+    assert percentile([], 0.5) == 0.0
+    assert percentile([1.0, 2.0, 3.0, 4.0], 0.5) == 2.5
+    assert percentile([1.0, 2.0, 3.0, 4.0], 1.0) == 4.0
+
+
+def test_run_scenario_reports_metrics_and_errors():
+    result = run_scenario(Scenario('soma', lambda: sum(range(100))), iterations=5, warmup=1)
+    assert result['iterations'] == 5
+    assert 0 <= result['p50_ms'] <= result['p95_ms'] <= result['max_ms']
+
+    def broken():
+        raise ValueError('falhou')
+
+    assert run_scenario(Scenario('quebrado', broken)) == {'error': 'ValueError: falhou'}
+
+
+def test_compare_flags_only_regressions_beyond_threshold():
+    baseline = {'a': {'p50_ms': 10.0, 'ops_per_sec': 100.0}, 'b': {'p50_ms': 10.0}, 'c': {'error': 'x'}}
+    results = {'a': {'p50_ms': 11.0, 'ops_per_sec': 70.0}, 'b': {'p50_ms': 13.0}, 'c': {'p50_ms': 99.0},
+               'novo': {'p50_ms': 1.0}}
+    regressions = compare(results, baseline)
+    assert [(r['scenario'], r['metric']) for r in regressions] == [('a', 'ops_per_sec'), ('b', 'p50_ms')]
+    assert compare(results, baseline, {'p50_ms': 0.5, 'ops_per_sec': 0.5}) == []
@@ -0,0 +1,120 @@
+import json
+import os
+
+import pytest
+
+from src.utils.binary_snapshot import (FORMAT_VERSION, HEADER, MAGIC, SnapshotFormatError, SnapshotReader,
+                                       read_snapshot, write_snapshot)
+from src.utils.data_manager import PersistentDataManager
+
+TEXTS = [{'id': i, 'title': f'Texto {i}', 'content': 'ç' * (i % 7), 'tags': ['ideia'] if i % 2 else []}
+         for i in range(25)]
+TAGS = [{'id': 1, 'name': 'ideia', 'color': '#ff0000'}]
+
+
+def _snapshot(tmp_path, block_size=10):
+    path = str(tmp_path / 'backup.gtxs')
+    counts = write_snapshot(path, {'texts': iter(TEXTS), 'tags': TAGS, 'vazia': []},
+                            meta={'origem': 'teste'}, block_size=block_size)
+    assert counts == {'texts': 25, 'tags': 1, 'vazia': 0}
+    return path
+
+
+def _corrupt(path, offset, data):
+    with open(path, 'r+b') as f:
+        f.seek(offset)
+        f.write(data)
+
+
+def test_round_trip(tmp_path):
+    path = _snapshot(tmp_path)
+    assert not os.path.exists(path + '.tmp')
+    assert read_snapshot(path) == {'texts': TEXTS, 'tags': TAGS, 'vazia': []}
+
+
+def test_lazy_section_access(tmp_path):
+    with SnapshotReader(_snapshot(tmp_path, block_size=4)) as reader:
+        texts = reader.section('texts')
+        assert reader.meta == {'origem': 'teste'}
+        assert reader.verify()
+        assert len(texts) == 25
+        assert texts[0] == TEXTS[0] and texts[13] == TEXTS[13] and texts[-1] == TEXTS[-1]
+        assert texts[3:9] == TEXTS[3:9]
+        assert list(texts) == TEXTS
+        with pytest.raises(IndexError):
+            texts[25]
+
+
+def test_failed_write_keeps_previous_snapshot(tmp_path):
+    path = _snapshot(tmp_path)
+
+    def broken():
+        yield {'id': 1}
+        raise RuntimeError('origem falhou')
+
+    with pytest.raises(RuntimeError):
+        write_snapshot(path, {'texts': broken()})
+    assert not os.path.exists(path + '.tmp')
+    assert read_snapshot(path)['texts'] == TEXTS
+
+
+@pytest.mark.parametrize('cut', [1, 20, 200])
+def test_truncated_snapshot_is_rejected(tmp_path, cut):
+    path = _snapshot(tmp_path)
+    with open(path, 'r+b') as f:
+        f.truncate(os.path.getsize(path) - cut)
+    with pytest.raises(SnapshotFormatError):
+        SnapshotReader(path)
+
+
+def test_corrupted_block_fails_crc(tmp_path):
+    path = _snapshot(tmp_path)
+    with SnapshotReader(path) as reader:
+        offset = reader.section('texts')._blocks[1][0]
+    _corrupt(path, offset + 20, b'\xff\xff')
+
+    with SnapshotReader(path) as reader:
+        assert not reader.verify()
+        texts = reader.section('texts')
+        assert texts[0] == TEXTS[0]
+        with pytest.raises(SnapshotFormatError, match='checksum'):
+            texts[10]
+
+
+def test_corrupted_index_is_rejected(tmp_path):
+    path = _snapshot(tmp_path)
+    with SnapshotReader(path) as reader:
+        index_offset = reader._data_end
+    _corrupt(path, index_offset + 2, b'X')
+    with pytest.raises(SnapshotFormatError, match='índice'):
+        SnapshotReader(path)
+
+
+def test_unknown_codec_is_rejected(tmp_path):
+    path = _snapshot(tmp_path)
+    _corrupt(path, HEADER.size, b'm')
+    with SnapshotReader(path) as reader:
+        with pytest.raises(SnapshotFormatError, match='codec'):
+            reader.section('texts')[0]
+
+
+def test_header_checks(tmp_path):
+    path = _snapshot(tmp_path)
+    _corrupt(path, 0, HEADER.pack(MAGIC, FORMAT_VERSION + 1, 0))
+    with pytest.raises(SnapshotFormatError, match='versão'):
+        SnapshotReader(path)
+
+    _corrupt(path, 0, b'NOTSNAP\x00')
+    with pytest.raises(SnapshotFormatError):
+        SnapshotReader(path)
+
+
+def test_persistent_manager_prefers_snapshot_over_legacy_json(tmp_path):
+    manager = PersistentDataManager(str(tmp_path))
+    with open(manager.texts_file, 'w', encoding='utf-8') as f:
+        json.dump({'data': [{'id': 99}]}, f)
+    assert manager.restore_data() == ([{'id': 99}], [])
+
+    assert manager.backup_data(TEXTS, TAGS)
+    assert manager.restore_data() == (TEXTS, TAGS)
+    assert len(manager.restore_compact().texts) == 25
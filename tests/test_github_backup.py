@@ -0,0 +1,120 @@
+import json
+
+import pytest
+
+from src.utils.github_backup import LEGACY_FILE, MANIFEST_FILE, META_FILE, GitHubBackupManager
+from src.utils.http_transport import CloudTransport
+
+
+def _data(count=25, title='Texto'):
+    return {
+        'texts': [{'id': i, 'title': f'{title} {i}', 'content': 'x'} for i in range(count)] + [{'title': 'Sem id'}],
+        'tags': [{'id': 1, 'name': 'ideia'}],
+        'version': '2.0'
+    }
+
+
+@pytest.fixture
+def make_manager(gist_stub, tmp_path):
+    managers = []
+
+    def make(**kwargs):
+        kwargs.setdefault('state_file', str(tmp_path / 'gist_state.json'))
+        manager = GitHubBackupManager(api_url=gist_stub.url, token='teste', shard_size=10, **kwargs)
+        manager.transport = CloudTransport(max_retries=1, backoff_base=0, backoff_max=0)
+        managers.append(manager)
+        return manager
+
+    yield make
+    for manager in managers:
+        manager.transport.close()
+
+
+def test_round_trip_in_shards(gist_stub, make_manager):
+    manager = make_manager()
+    result = manager.save_to_github(_data())
+    assert result['success'] and result['uploaded'] == 6
+
+    files = gist_stub.gists[result['gist_id']]
+    assert sorted(files) == sorted([META_FILE, MANIFEST_FILE, 'gtex_tags_000000.json', 'gtex_texts_000000.json',
+                                    'gtex_texts_000001.json', 'gtex_texts_000002.json', 'gtex_texts_rest.json'])
+    assert make_manager(state_file=None).load_from_github(result['gist_id']) == {'success': True, 'data': _data()}
+
+
+def test_resave_sends_only_changed_shards(gist_stub, make_manager):
+    manager = make_manager()
+    gist_id = manager.save_to_github(_data())['gist_id']
+    gist_stub.reset_log()
+
+    assert manager.save_to_github(_data())['uploaded'] == 0
+    assert gist_stub.log == []
+
+    data = _data()
+    data['texts'][12]['title'] = 'Editado'
+    result = manager.save_to_github(data)
+    assert result == {'success': True, 'gist_id': gist_id, 'url': result['url'], 'uploaded': 1, 'unchanged': 5}
+    assert [method for method, _, _ in gist_stub.log] == ['PATCH']
+    assert manager.load_from_github(gist_id)['data'] == data
+
+
+def test_stale_shards_are_deleted(gist_stub, make_manager):
+    manager = make_manager()
+    gist_id = manager.save_to_github(_data())['gist_id']
+
+    assert manager.save_to_github(_data(count=5))['success']
+    assert 'gtex_texts_000001.json' not in gist_stub.gists[gist_id]
+    assert 'gtex_texts_000002.json' not in gist_stub.gists[gist_id]
+    assert manager.load_from_github(gist_id)['data'] == _data(count=5)
+
+
+def test_lost_state_lists_remote_files(gist_stub, make_manager, tmp_path):
+    gist_id = make_manager().save_to_github(_data())['gist_id']
+
+    manager = make_manager(state_file=str(tmp_path / 'outro_estado.json'))
+    assert manager.save_to_github(_data(count=5), gist_id=gist_id)['success']
+    assert gist_stub.requests('GET') == 1
+    assert 'gtex_texts_000002.json' not in gist_stub.gists[gist_id]
+    assert manager.load_from_github(gist_id)['data'] == _data(count=5)
+
+
+def test_deleted_gist_starts_a_new_one(gist_stub, make_manager):
+    manager = make_manager()
+    gist_id = manager.save_to_github(_data())['gist_id']
+    del gist_stub.gists[gist_id]
+
+    result = manager.save_to_github(_data(title='Novo'))
+    assert result['success'] and result['gist_id'] != gist_id
+    assert manager.load_from_github(result['gist_id'])['data'] == _data(title='Novo')
+
+
+def test_failed_batch_resumes_without_resending(gist_stub, make_manager, monkeypatch):
+    manager = make_manager(files_per_request=1)
+    gist_id = manager.save_to_github(_data())['gist_id']
+    assert gist_stub.requests('POST') == 1 and gist_stub.requests('PATCH') == 5
+
+    # O primeiro lote é aceito; o seguinte recebe um erro que não se repete
+    save_state = manager._save_state
+
+    def fail_after_first_batch(state):
+        save_state(state)
+        gist_stub.fail('PATCH', 422)
+
+    monkeypatch.setattr(manager, '_save_state', fail_after_first_batch)
+    gist_stub.reset_log()
+    result = manager.save_to_github(_data(title='Novo'))
+    assert not result['success'] and '422' in result['error']
+    assert gist_stub.requests('PATCH') == 2
+    # O manifesto vai no último lote: o Gist continua apontando para o backup anterior
+    assert json.loads(gist_stub.gists[gist_id][MANIFEST_FILE]) == manager.build_shards(_data())[1]
+
+    monkeypatch.setattr(manager, '_save_state', save_state)
+    gist_stub.reset_log()
+    assert manager.save_to_github(_data(title='Novo'))['uploaded'] == 2
+    assert gist_stub.requests('PATCH') == 2
+    assert manager.load_from_github(gist_id)['data'] == _data(title='Novo')
+
+
+def test_loads_legacy_single_file_gist(gist_stub, make_manager):
+    gist_stub.gists['antigo'] = {LEGACY_FILE: json.dumps(_data())}
+    assert make_manager().load_from_github('antigo') == {'success': True, 'data': _data()}
+    assert not make_manager().load_from_github('inexistente')['success']
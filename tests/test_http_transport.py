@@ -0,0 +1,102 @@
+import socket
+from urllib.parse import urlsplit
+
+import pytest
+import requests
+
+from src.utils.http_transport import CloudTransport
+
+FILES = {'files': {'gtex.json': {'content': 'x' * 4096}}}
+
+
+@pytest.fixture
+def transport():
+    transport = CloudTransport(max_retries=2, backoff_base=0, backoff_max=0, timeout=5)
+    yield transport
+    transport.close()
+
+
+def _gist(stub, transport):
+    return transport.post(f'{stub.url}/gists', FILES, compress=False).json()['id']
+
+
+def test_idempotent_methods_are_retried(gist_stub, transport):
+    gist_id = _gist(gist_stub, transport)
+    gist_stub.fail('GET', 503, times=2)
+
+    assert transport.get(f'{gist_stub.url}/gists/{gist_id}').status_code == 200
+    assert gist_stub.requests('GET') == 3
+    stats = transport.metrics.snapshot()[urlsplit(gist_stub.url).netloc]
+    assert stats['retries'] == 2 and stats['errors'] == 0
+
+
+def test_retries_stop_after_max_retries(gist_stub, transport):
+    gist_stub.fail('GET', 503, times=5)
+    assert transport.get(f'{gist_stub.url}/gists/nada').status_code == 503
+    assert gist_stub.requests('GET') == 3
+
+
+def test_post_and_patch_are_not_retried(gist_stub, transport):
+    gist_stub.fail('POST', 502, after_apply=True)
+    assert transport.post(f'{gist_stub.url}/gists', FILES).status_code == 502
+    assert gist_stub.requests('POST') == 1
+    assert len(gist_stub.gists) == 1
+
+    gist_id = next(iter(gist_stub.gists))
+    gist_stub.fail('PATCH', 503)
+    assert transport.patch(f'{gist_stub.url}/gists/{gist_id}', FILES).status_code == 503
+    assert gist_stub.requests('PATCH') == 1
+
+    gist_stub.fail('PATCH', 503)
+    assert transport.patch(f'{gist_stub.url}/gists/{gist_id}', FILES, idempotent=True).status_code == 200
+    assert gist_stub.requests('PATCH') == 3
+
+
+def test_large_bodies_are_gzipped(gist_stub, transport):
+    gist_id = _gist(gist_stub, transport)
+    gist_stub.reset_log()
+    transport.patch(f'{gist_stub.url}/gists/{gist_id}', {'files': {'a.json': {'content': 'a'}}})
+    transport.patch(f'{gist_stub.url}/gists/{gist_id}', FILES)
+    assert [encoding for _, _, encoding in gist_stub.log] == [None, 'gzip']
+    assert gist_stub.gists[gist_id]['gtex.json'] == 'x' * 4096
+
+
+def test_rejected_gzip_falls_back_to_plain_body(gist_stub, transport):
+    gist_stub.reject_gzip = True
+    response = transport.post(f'{gist_stub.url}/gists', FILES)
+    assert response.status_code == 201
+    assert [encoding for _, _, encoding in gist_stub.log] == ['gzip', None]
+
+    # O host passa a receber corpos sem compressão
+    gist_stub.reset_log()
+    transport.post(f'{gist_stub.url}/gists', FILES)
+    assert [encoding for _, _, encoding in gist_stub.log] == [None]
+
+
+def test_validation_error_does_not_disable_gzip(gist_stub, transport):
+    invalid = {'files': 'x' * 4096}
+    assert transport.post(f'{gist_stub.url}/gists', invalid).status_code == 400
+    assert [encoding for _, _, encoding in gist_stub.log] == ['gzip', None]
+
+    gist_stub.reset_log()
+    transport.post(f'{gist_stub.url}/gists', FILES)
+    assert [encoding for _, _, encoding in gist_stub.log] == ['gzip']
+
+
+def test_connection_errors_are_raised_after_retries(transport):
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]
+    url = f'http://127.0.0.1:{port}/gists'
+
+    with pytest.raises(requests.ConnectionError):
+        transport.get(url)
+    stats = transport.metrics.snapshot()[f'127.0.0.1:{port}']
+    assert stats['requests'] == 1 and stats['errors'] == 1 and stats['retries'] == 2
+
+
+def test_retry_after_is_capped_by_backoff_max():
+    transport = CloudTransport(backoff_max=0.5)
+    assert transport._backoff(0, '120') == 0.5
+    assert transport._backoff(0, '0.1') == 0.1
+    assert 0 <= transport._backoff(10, 'depois') <= 0.5
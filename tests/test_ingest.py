@@ -0,0 +1,130 @@
+import os
+import sqlite3
+
+import pytest
+
+from src.utils.ingest import Ingester, ingest, main, parse_file, parse_front_matter
+
+NOTE = '''---
+title: "Reunião de planejamento"
+tags: [trabalho, "#planejamento"]
+date: 2024-03-05T10:00:00Z
+---
+# Outro título
+
+Pauta da reunião.
+'''
+
+
+def _write(directory, name, content):
+    path = directory / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content, encoding='utf-8')
+    return str(path)
+
+
+def _parse(path):
+    stat = os.stat(path)
+    return parse_file((path, stat.st_mtime_ns, stat.st_size))
+
+
+def test_front_matter_subset():
+    assert parse_front_matter('title: "x: y"\nkeywords:\n  - a\n  - b\n# comentário\nsem valor') == {
+        'title': 'x: y', 'keywords': ['a', 'b']}
+
+
+def test_parse_file_title_tags_and_date(tmp_path):
+    parsed = _parse(_write(tmp_path, 'nota.md', NOTE))
+    assert parsed['title'] == 'Reunião de planejamento'
+    assert parsed['tags'] == ['trabalho', 'planejamento']
+    assert parsed['created_at'] == '2024-03-05 10:00:00'
+    assert parsed['content'].startswith('# Outro título')
+
+    assert _parse(_write(tmp_path, 'b.md', 'texto\n## Cabeçalho ##\n'))['title'] == 'Cabeçalho'
+    untitled = _parse(_write(tmp_path, 'lista_de-compras.txt', '﻿leite, pão'))
+    assert untitled['title'] == 'lista de compras' and untitled['content'] == 'leite, pão'
+    assert 'error' in parse_file((str(tmp_path / 'sumiu.md'), 0, 0))
+
+
+def _rows(db_path, sql, params=()):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+
+def test_ingest_into_app_schema_and_resume(gtex_app, tmp_path, capsys):
+    notes = tmp_path / 'notas'
+    first = _write(notes, 'reuniao.md', NOTE)
+    _write(notes, 'sub/ideia.txt', 'uma ideia solta')
+    _write(notes, 'sub/copia.md', 'uma ideia solta\n')
+    _write(notes, '.oculto/x.md', 'ignorado')
+    _write(notes, 'imagem.png', 'ignorado')
+    db_path = gtex_app.DATABASE
+
+    stats = ingest(str(notes), db_path, workers=1, batch_size=2)
+    assert (stats['created'], stats['duplicates'], stats['failed']) == (2, 1, 0)
+    text_id = _rows(db_path, 'SELECT id FROM texts WHERE title = ?', ('Reunião de planejamento',))[0][0]
+    assert sorted(row[0] for row in _rows(db_path, '''
+        SELECT g.name FROM text_tags tt JOIN tags g ON g.id = tt.tag_id WHERE tt.text_id = ?''', (text_id,))) == \
+        ['planejamento', 'trabalho']
+    assert _rows(db_path, 'SELECT COUNT(*) FROM text_revisions WHERE text_id = ?', (text_id,)) == [(1,)]
+    assert ('text', text_id) in _rows(db_path, 'SELECT kind, item_id FROM index_changes')
+
+    # Segunda rodada: nada mudou
+    assert ingest(str(notes), db_path, workers=1)['unchanged'] == 3
+
+    # Arquivo alterado atualiza o mesmo texto
+    with open(first, 'a', encoding='utf-8') as f:
+        f.write('\nNovo item.\n')
+    stats = ingest(str(notes), db_path, workers=1)
+    assert (stats['updated'], stats['created'], stats['unchanged']) == (1, 0, 2)
+    assert _rows(db_path, 'SELECT content FROM texts WHERE id = ?', (text_id,))[0][0].endswith('Novo item.')
+    assert _rows(db_path, 'SELECT COUNT(*) FROM text_revisions WHERE text_id = ?', (text_id,)) == [(2,)]
+    assert 'GTEX_INDEX_REFRESH' in capsys.readouterr().out
+
+
+def test_content_created_through_the_api_is_not_duplicated(gtex_app, tmp_path):
+    client = gtex_app.app.test_client()
+    text_id = client.post('/api/texts', json={'title': 'Da API', 'content': 'mesmo conteúdo'}).get_json()['id']
+    _write(tmp_path / 'notas', 'a.md', 'mesmo conteúdo\n')
+
+    stats = ingest(str(tmp_path / 'notas'), gtex_app.DATABASE, workers=1)
+    assert (stats['created'], stats['duplicates']) == (0, 1)
+    assert _rows(gtex_app.DATABASE, 'SELECT text_id FROM ingest_files') == [(text_id,)]
+
+
+def test_ingest_into_main_schema(tmp_path):
+    from src.models.text import db
+    from src.utils.tenant_router import schema_from_metadata
+
+    db_path = str(tmp_path / 'gtex_persistent.db')
+    conn = sqlite3.connect(db_path)
+    conn.executescript(schema_from_metadata(db.metadata))
+    conn.close()
+    _write(tmp_path / 'notas', 'a.md', NOTE)
+
+    stats = ingest(str(tmp_path / 'notas'), db_path, workers=1)
+    assert stats['created'] == 1
+    assert _rows(db_path, 'SELECT title FROM text') == [('Reunião de planejamento',)]
+    assert sorted(_rows(db_path, 'SELECT name FROM tag')) == [('planejamento',), ('trabalho',)]
+
+
+def test_failed_files_are_counted_and_batch_rolls_back(gtex_app, tmp_path, monkeypatch):
+    ingester = Ingester(gtex_app.DATABASE)
+    files, hashes = ingester.known()
+    ingester.write_batch([{'path': 'x.md', 'error': 'sem permissão'}], files, hashes)
+    assert ingester.stats['failed'] == 1
+
+    item = _parse(_write(tmp_path, 'a.md', 'conteúdo novo'))
+    monkeypatch.setattr(ingester, '_tag_id', lambda name: 1 / 0)
+    with pytest.raises(ZeroDivisionError):
+        ingester.write_batch([dict(item, tags=['x'])], files, hashes)
+    ingester.close()
+    assert _rows(gtex_app.DATABASE, 'SELECT COUNT(*) FROM texts WHERE content = ?', ('conteúdo novo',)) == [(0,)]
+
+
+def test_main_reports_errors(tmp_path):
+    assert main([str(tmp_path / 'nada')]) == 1
+    assert main([str(tmp_path), '--db', str(tmp_path / 'vazio.db'), '--workers', '1']) == 1
@@ -0,0 +1,127 @@
+import sqlite3
+
+import pytest
+
+from src.utils.large_content import SCHEMA, LargeContentStore, UploadError
+
+BIG = 'ação ' * 100  # 700 bytes em UTF-8
+
+
+@pytest.fixture
+def db():
+    db = sqlite3.connect(':memory:')
+    db.executescript(SCHEMA)
+    yield db
+    db.close()
+
+
+def test_store_and_read_ranges(db):
+    store = LargeContentStore(threshold=100, preview_chars=8)
+    assert store.is_large(BIG) and not store.is_large('ç' * 25) and store.is_large('ç' * 51)
+
+    assert store.store(db, 1, BIG) == 'ação açã'
+    assert store.size(db, 1) == len(BIG.encode('utf-8'))
+    assert store.read_text(db, 1) == BIG
+    assert store.read(db, 1, 5, 3) == BIG.encode('utf-8')[5:8]
+    assert store.read(db, 1, 650, 100) == BIG.encode('utf-8')[650:]
+    assert store.read_preview(db, 1) == 'ação açã'
+    assert store.read(db, 2) is None
+
+    store.store(db, 1, 'novo ' * 50)
+    assert db.execute('SELECT COUNT(*) FROM text_blobs').fetchone()[0] == 1
+    store.delete(db, 1)
+    assert store.size(db, 1) is None
+
+
+def test_chunked_upload_and_failures(db):
+    store = LargeContentStore(threshold=100)
+    data = BIG.encode('utf-8')
+    upload = store.begin_upload(db, 1, len(data))['upload_id']
+
+    store.write_chunk(db, 1, upload, 0, data[:250])
+    with pytest.raises(UploadError, match='Offset esperado: 250'):
+        store.write_chunk(db, 1, upload, 300, data[300:])
+    with pytest.raises(UploadError, match='ultrapassa'):
+        store.write_chunk(db, 1, upload, 250, data[250:] + b'x')
+    assert store.upload_status(db, 1, upload) == {'upload_id': upload, 'size': len(data), 'received': 250,
+                                                   'complete': False}
+    assert store.size(db, 1) is None
+
+    assert store.write_chunk(db, 1, upload, 250, data[250:])['complete']
+    assert store.read(db, 1) == data
+    with pytest.raises(UploadError, match='não encontrado'):
+        store.write_chunk(db, 1, upload, len(data), b'')
+    with pytest.raises(UploadError):
+        store.begin_upload(db, 1, -1)
+
+
+def test_prune_removes_only_stale_incomplete_uploads(db):
+    store = LargeContentStore(threshold=10)
+    store.store(db, 1, 'x' * 50)
+    stale = store.begin_upload(db, 2, 10)['upload_id']
+    fresh = store.begin_upload(db, 3, 10)['upload_id']
+    db.execute("UPDATE text_blobs SET created_at = datetime('now', '-2 days') WHERE id IN (?, 1)", (stale,))
+
+    assert store.prune_uploads(db) == 1
+    assert store.upload_status(db, 2, stale) is None
+    assert store.upload_status(db, 3, fresh) is not None
+    assert store.size(db, 1) == 50
+
+
+@pytest.fixture
+def client(gtex_app, monkeypatch):
+    monkeypatch.setattr(gtex_app.large_content, 'threshold', 100)
+    monkeypatch.setattr(gtex_app.large_content, 'preview_chars', 10)
+    return gtex_app.app.test_client()
+
+
+def test_large_text_routes(gtex_app, client):
+    text_id = client.post('/api/texts', json={'title': 'Grande', 'content': BIG}).get_json()['id']
+    assert client.get(f'/api/texts/{text_id}').get_json()['content'] == BIG
+    conn = sqlite3.connect(gtex_app.DATABASE)
+    assert conn.execute('SELECT content FROM texts WHERE id = ?', (text_id,)).fetchone()[0] == BIG[:10]
+    conn.close()
+
+    size = len(BIG.encode('utf-8'))
+    full = client.get(f'/api/texts/{text_id}/content')
+    assert full.status_code == 200 and full.data.decode('utf-8') == BIG
+    part = client.get(f'/api/texts/{text_id}/content?offset=10&length=20')
+    assert part.status_code == 206
+    assert part.headers['Content-Range'] == f'bytes 10-29/{size}'
+    assert part.data == BIG.encode('utf-8')[10:30]
+
+
+@pytest.mark.parametrize('query', ['offset=700', 'offset=9999', 'length=0'])
+def test_unsatisfiable_ranges_return_416(client, query):
+    text_id = client.post('/api/texts', json={'title': 'Grande', 'content': BIG}).get_json()['id']
+    response = client.get(f'/api/texts/{text_id}/content?{query}')
+    assert response.status_code == 416
+    assert response.headers['Content-Range'] == f'bytes */{len(BIG.encode("utf-8"))}'
+
+
+def test_small_and_empty_content_ranges(client):
+    small = client.post('/api/texts', json={'title': 'p', 'content': 'olá'}).get_json()['id']
+    assert client.get(f'/api/texts/{small}/content?offset=2').data == 'olá'.encode('utf-8')[2:]
+    assert client.get(f'/api/texts/{small}/content?offset=-1').status_code == 400
+
+    empty = client.post('/api/texts', json={'title': 'v', 'content': ''}).get_json()['id']
+    response = client.get(f'/api/texts/{empty}/content')
+    assert response.status_code == 200 and response.data == b''
+    assert client.get('/api/texts/9999/content').status_code == 404
+
+
+def test_chunked_upload_routes(client):
+    text_id = client.post('/api/texts', json={'title': 'Envio', 'content': 'x'}).get_json()['id']
+    data = BIG.encode('utf-8')
+    upload = client.post(f'/api/texts/{text_id}/content/uploads', json={'size': len(data)}).get_json()
+    url = f"/api/texts/{text_id}/content/uploads/{upload['upload_id']}"
+
+    assert client.put(f'{url}?offset=0', data=data[:300]).get_json()['received'] == 300
+    conflict = client.put(f'{url}?offset=0', data=data[300:])
+    assert conflict.status_code == 409 and conflict.get_json()['received'] == 300
+    assert client.put(f'{url}?offset=300', data=data[300:]).get_json()['complete']
+
+    assert client.get(f'/api/texts/{text_id}').get_json()['content'] == BIG
+    assert client.get(f'{url}').get_json()['complete']
+    assert client.post(f'/api/texts/{text_id}/content/uploads', json={}).status_code == 400
+    assert client.get(f'/api/texts/{text_id}/content/uploads/9999').status_code == 404
@@ -0,0 +1,118 @@
+import sqlite3
+
+import pytest
+
+from src.utils import index_changes
+from src.utils.minhash_index import MinHashIndex
+from src.utils.request_metrics import RequestMetrics
+
+BASE = ('o relatório trimestral mostra crescimento das vendas na região sul com destaque para '
+        'os produtos novos lançados em março e uma queda leve nos custos de distribuição')
+
+
+def test_num_perm_must_divide_into_bands():
+    with pytest.raises(ValueError):
+        MinHashIndex(num_perm=100, bands=32)
+
+
+def test_similar_finds_near_duplicates():
+    index = MinHashIndex()
+    index.update_many([
+        (1, BASE),
+        (2, BASE.upper().replace('relatório', 'RELATORIO')),
+        (3, BASE + ' e mais uma frase no fim'),
+        (4, 'receita de bolo de cenoura com cobertura de chocolate'),
+        (5, ''),
+    ])
+    assert index.similarity(1, 2) == 1.0
+    assert [text_id for text_id, _ in index.similar(1, threshold=0.5)] == [2, 3]
+    assert index.similar(1, threshold=0.99) == [(2, 1.0)]
+    assert index.similar(5) == []
+    assert index.similar(4) == []
+
+
+def test_batches_match_single_updates():
+    contents = [(i, f'{BASE} variação {i}') for i in range(25)] + [(25, 'curto'), (26, '   ')]
+    batched = MinHashIndex(batch_size=4)
+    batched.update_many(contents)
+    single = MinHashIndex()
+    for text_id, content in contents:
+        single.update(text_id, content)
+
+    assert len(batched) == len(single) == 27
+    for text_id, _ in contents:
+        row = batched._rows[text_id]
+        assert (batched._signatures[row] == single._signatures[single._rows[text_id]]).all()
+    assert not batched._empty[batched._rows[25]] and batched._empty[batched._rows[26]]
+
+
+def test_remove_keeps_rows_compact():
+    index = MinHashIndex()
+    index.update_many([(1, BASE), (2, 'outro texto qualquer sobre viagens'), (3, BASE)])
+    index.remove(1)
+    index.remove(99)
+    assert len(index) == 2 and 1 not in index
+    assert index.similar(3) == []
+    index.update(2, BASE)
+    assert index.similar(3) == [(2, 1.0)]
+
+
+def test_duplicate_groups():
+    index = MinHashIndex()
+    index.update_many([(1, BASE), (2, BASE), (3, BASE + ' fim'), (4, 'lista de compras da semana'),
+                       (5, 'lista de compras da semana'), (6, 'algo totalmente diferente aqui'), (7, '')])
+    groups = index.duplicate_groups(threshold=0.8)
+    assert [group['ids'] for group in groups] == [[1, 2, 3], [4, 5]]
+    assert groups[1]['min_similarity'] == groups[1]['max_similarity'] == 1.0
+    assert groups[0]['min_similarity'] < 1.0
+
+
+@pytest.fixture
+def feed():
+    db = sqlite3.connect(':memory:')
+    db.executescript(index_changes.SCHEMA)
+    yield db
+    db.close()
+
+
+def test_changes_since(feed):
+    assert index_changes.changes_since(feed, 0, 10) == (0, set())
+    for kind, item_id in (('text', 1), ('tag', 2), ('text', 1)):
+        index_changes.publish(feed, kind, item_id)
+    assert index_changes.last_seq(feed) == 3
+    assert index_changes.changes_since(feed, 0, 10) == (3, {('text', 1), ('tag', 2)})
+    assert index_changes.changes_since(feed, 2, 10) == (3, {('text', 1)})
+    assert index_changes.changes_since(feed, 0, 2) is None
+
+
+def test_pruned_changes_leave_a_gap(feed, monkeypatch):
+    monkeypatch.setattr(index_changes, 'PRUNE_EVERY', 5)
+    for item_id in range(10):
+        index_changes.publish(feed, 'text', item_id, keep=3)
+    assert feed.execute('SELECT MIN(seq) FROM index_changes').fetchone()[0] == 8
+    assert index_changes.changes_since(feed, 1, 100) is None
+    assert index_changes.changes_since(feed, 7, 100) == (10, {('text', 7), ('text', 8), ('text', 9)})
+
+
+def test_writes_from_another_process_are_applied_incrementally(gtex_app, monkeypatch):
+    metrics = RequestMetrics()
+    monkeypatch.setitem(gtex_app.app.extensions, 'request_metrics', metrics)
+    monkeypatch.setattr(gtex_app, 'INDEX_REFRESH', 1e-9)
+    client = gtex_app.app.test_client()
+    first = client.post('/api/texts', json={'title': 'Relatório', 'content': BASE}).get_json()['id']
+    assert client.get(f'/api/texts/{first}/similar').get_json() == []
+
+    # Outro processo (o escritor do serve.py) grava e publica a mudança
+    db = sqlite3.connect(gtex_app.DATABASE)
+    second = db.execute('INSERT INTO texts (title, content) VALUES (?, ?)', ('Cópia', BASE)).lastrowid
+    index_changes.publish(db, 'text', second)
+    db.commit()
+    db.close()
+
+    assert client.get(f'/api/texts/{first}/similar').get_json() == [
+        {'id': second, 'title': 'Cópia', 'similarity': 1.0}]
+    assert metrics.cache[('similarity', 'miss')] == 1
+    assert metrics.cache[('similarity', 'hit')] == 1
+
+    groups = client.get('/api/texts/duplicates').get_json()['groups']
+    assert [[text['id'] for text in group['texts']] for group in groups] == [[first, second]]
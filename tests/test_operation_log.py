@@ -0,0 +1,120 @@
+import os
+
+from src.utils import operation_log
+from src.utils.binary_snapshot import write_snapshot
+from src.utils.operation_log import SNAPSHOT_FILE, OperationLogStore, read_segment
+
+TAGS = [{'name': 'a', 'color': '#000000'}]
+
+
+def _texts(count, changes=None):
+    texts = [{'id': i, 'title': f't{i}', 'content': 'x' * i, 'tags': ['a']} for i in range(1, count + 1)]
+    for text in texts:
+        text.update((changes or {}).get(text['id'], {}))
+    return texts
+
+
+def _segment_records(store):
+    return sum(len(read_segment(store._segment_path(n))[0]) for n in store._segments())
+
+
+def test_round_trip_after_reopen(tmp_path):
+    store = OperationLogStore(str(tmp_path))
+    assert store.apply(_texts(5), TAGS) == 6
+    assert store.apply(_texts(4, {2: {'title': 'novo'}}), TAGS) == 2  # t5 removido, t2 alterado
+    store.close()
+
+    reopened = OperationLogStore(str(tmp_path))
+    texts, tags = reopened.load()
+    assert sorted(texts, key=lambda t: t['id']) == _texts(4, {2: {'title': 'novo'}})
+    assert tags == TAGS
+    assert reopened.apply(_texts(4, {2: {'title': 'novo'}}), TAGS) == 0
+
+
+def test_changed_ids_limit_hashing(tmp_path, monkeypatch):
+    store = OperationLogStore(str(tmp_path))
+    store.apply(_texts(50), TAGS)
+
+    hashed = []
+    original = operation_log._text_hash
+    monkeypatch.setattr(operation_log, '_text_hash', lambda text: hashed.append(text['id']) or original(text))
+    texts = _texts(51, {7: {'content': 'editado'}})
+    del texts[9]  # id 10 removido
+    assert store.apply(texts, TAGS, changed={7, 10}) == 3
+    # Só o texto alterado e o novo (que o log ainda não tem) passam pelo hash
+    assert sorted(hashed) == [7, 51]
+
+    store.close()
+    loaded = {t['id']: t for t in OperationLogStore(str(tmp_path)).load()[0]}
+    assert loaded[7]['content'] == 'editado' and 10 not in loaded and 51 in loaded
+
+
+def test_truncated_tail_is_discarded(tmp_path):
+    store = OperationLogStore(str(tmp_path))
+    store.apply(_texts(3), TAGS)
+    store.apply(_texts(3, {1: {'title': 'depois'}}), TAGS)
+    path = store._segment_path(store._segment)
+    store.close()
+
+    # Escrita interrompida no meio do último registro
+    with open(path, 'r+b') as f:
+        f.truncate(os.path.getsize(path) - 5)
+
+    reopened = OperationLogStore(str(tmp_path))
+    assert {t['id']: t['title'] for t in reopened.load()[0]} == {1: 't1', 2: 't2', 3: 't3'}
+    assert reopened.apply(_texts(3, {1: {'title': 'depois'}}), TAGS) == 1
+    reopened.close()
+    assert {t['id']: t['title'] for t in OperationLogStore(str(tmp_path)).load()[0]}[1] == 'depois'
+
+
+def test_corrupted_record_stops_replay(tmp_path):
+    store = OperationLogStore(str(tmp_path))
+    store.apply(_texts(2), TAGS)
+    store.apply(_texts(2, {2: {'title': 'perdido'}}), TAGS)
+    path = store._segment_path(store._segment)
+    store.close()
+
+    with open(path, 'r+b') as f:
+        f.seek(-3, os.SEEK_END)
+        f.write(b'zzz')
+    records, valid_end = read_segment(path)
+    assert len(records) == 3 and valid_end < os.path.getsize(path)
+    assert {t['id']: t['title'] for t in OperationLogStore(str(tmp_path)).load()[0]}[2] == 't2'
+
+
+def test_compaction_keeps_state_and_drops_segments(tmp_path):
+    store = OperationLogStore(str(tmp_path), compact_every=10)
+    store.apply(_texts(8), TAGS)
+    store.apply(_texts(9, {3: {'title': 'c'}}), TAGS)  # passa de 10 registros: compacta
+    assert store.stats()['records_since_compaction'] == 0
+    assert _segment_records(store) == 0
+    store.apply(_texts(8, {3: {'title': 'c'}, 4: {'title': 'd'}}), TAGS)
+    store.compact()
+    store.apply(_texts(8, {3: {'title': 'c'}, 4: {'title': 'e'}}), TAGS)
+    store.close()
+
+    reopened = OperationLogStore(str(tmp_path), compact_every=10)
+    assert sorted(reopened.load()[0], key=lambda t: t['id']) == _texts(8, {3: {'title': 'c'}, 4: {'title': 'e'}})
+    assert len(reopened._segments()) == 1
+
+
+def test_reads_snapshot_without_hashes(tmp_path):
+    # Snapshots gravados antes do hash por texto: entradas [chave, texto]
+    texts = _texts(3)
+    write_snapshot(str(tmp_path / SNAPSHOT_FILE), {
+        'texts': ([f"id:{t['id']}", t] for t in texts),
+        'tags': ([tag['name'], tag] for tag in TAGS)
+    }, meta={'next_segment': 2, 'timestamp': '2024-01-01T00:00:00'})
+
+    store = OperationLogStore(str(tmp_path))
+    assert sorted(store.load()[0], key=lambda t: t['id']) == texts
+    assert store.apply(texts, TAGS) == 0
+
+
+def test_texts_without_id_are_keyed_by_content(tmp_path):
+    store = OperationLogStore(str(tmp_path))
+    texts = [{'title': 'igual', 'content': 'x'}, {'title': 'igual', 'content': 'x'}]
+    assert store.apply(texts, []) == 2
+    assert store.apply(texts, [], changed=set()) == 0
+    assert store.apply(texts[:1], [], changed=set()) == 1
+    assert store.load()[0] == texts[:1]
@@ -0,0 +1,105 @@
+import os
+import pstats
+import sqlite3
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from src.utils.profiling import RequestProfiler, SlowQueryLog
+from src.utils.request_metrics import InstrumentedConnection
+
+
+def _wsgi_app(environ, start_response):
+    start_response('200 OK', [('Content-Type', 'text/plain')])
+    return (chunk for chunk in (b'um ', b'dois'))
+
+
+def _call(app, path, **environ):
+    responses = []
+    body = app(dict({'PATH_INFO': path, 'REQUEST_METHOD': 'GET'}, **environ),
+               lambda status, headers: responses.append(status))
+    return responses[0], b''.join(body)
+
+
+def test_profiles_only_selected_requests(tmp_path):
+    profiler = RequestProfiler(_wsgi_app, str(tmp_path), token='segredo', allow_paths=['/api/search', ''])
+
+    assert _call(profiler, '/api/texts') == ('200 OK', b'um dois')
+    assert _call(profiler, '/api/texts', HTTP_X_GTEX_PROFILE='errado') == ('200 OK', b'um dois')
+    assert profiler.list_profiles() == []
+
+    assert _call(profiler, '/api/search', QUERY_STRING='q=x') == ('200 OK', b'um dois')
+    assert _call(profiler, '/api/texts', HTTP_X_GTEX_PROFILE='segredo') == ('200 OK', b'um dois')
+    profiles = profiler.list_profiles()
+    assert len(profiles) == 2 and '_GET_api_search_' in profiles[0]
+    # Arquivos no formato do pstats
+    pstats.Stats(os.path.join(str(tmp_path), profiles[1]))
+
+
+def test_profile_ring_keeps_most_recent(tmp_path):
+    profiler = RequestProfiler(_wsgi_app, str(tmp_path), keep=2, allow_paths=['/'])
+    for path in ('/a', '/b', '/c'):
+        _call(profiler, path)
+    assert [name.split('_GET_')[1].split('_')[0] for name in profiler.list_profiles()] == ['b', 'c']
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(':memory:', factory=InstrumentedConnection)
+    conn.execute("CREATE TABLE texts (id INTEGER PRIMARY KEY, title TEXT)")
+    conn.executemany("INSERT INTO texts (title) VALUES (?)", [(f't{i}',) for i in range(50)])
+    yield conn
+    conn.close()
+
+
+def test_slow_query_log_records_plan_and_full_scans(conn, capsys):
+    log = SlowQueryLog(threshold_ms=0)
+    log.observe(conn, "SELECT * FROM texts WHERE title = ?", ('t1',), 0.5)
+    log.observe(conn, "SELECT * FROM texts WHERE id = ?", (1,), 0.5)
+    log.observe(conn, "PRAGMA table_info(texts)", (), 0.5)
+    log.observe(conn, "SELECT * FROM nada", (), 0.5)
+
+    scan, search, pragma, broken = log.recent
+    assert scan['full_scan'] and scan['plan'][0].startswith('SCAN')
+    assert scan['parameters'] == "('t1',)" and scan['elapsed_ms'] == 500
+    assert not search['full_scan'] and search['plan'][0].startswith('SEARCH')
+    assert pragma['plan'] == []
+    assert broken['plan'][0].startswith('(sem plano')
+    assert 'varredura completa' in capsys.readouterr().out
+
+
+def test_slow_query_log_ignores_fast_queries(conn):
+    log = SlowQueryLog(threshold_ms=100, history=2)
+    log.observe(conn, "SELECT 1", (), 0.01)
+    assert not log.recent
+    for _ in range(3):
+        log.observe(conn, "SELECT 1", (), 0.2)
+    assert len(log.recent) == 2
+
+
+def test_instrumented_connection_reports_after_rows_are_read(conn, monkeypatch):
+    log = SlowQueryLog(threshold_ms=0)
+    monkeypatch.setattr(InstrumentedConnection, 'slow_query_log', log)
+
+    cursor = conn.execute("SELECT title FROM texts ORDER BY title")
+    assert not log.recent
+    assert len(cursor.fetchall()) == 50
+    conn.execute("UPDATE texts SET title = ? WHERE id = ?", ('x', 1))
+    assert [entry['statement'] for entry in log.recent] == [
+        'SELECT title FROM texts ORDER BY title', 'UPDATE texts SET title = ? WHERE id = ?']
+    assert log.recent[0]['full_scan']
+
+
+def test_instrument_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'gtex.db'}")
+    log = SlowQueryLog(threshold_ms=0)
+    log.instrument_engine(engine)
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE texts (id INTEGER PRIMARY KEY, title TEXT)"))
+        connection.execute(text("INSERT INTO texts (title) VALUES (:title)"), [{'title': 'a'}, {'title': 'b'}])
+        assert connection.execute(text("SELECT COUNT(*) FROM texts WHERE title = :t"), {'t': 'a'}).scalar() == 1
+    engine.dispose()
+
+    select = log.recent[-1]
+    assert select['statement'] == 'SELECT COUNT(*) FROM texts WHERE title = ?'
+    assert select['full_scan']
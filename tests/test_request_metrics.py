@@ -0,0 +1,17 @@
+from src.utils.request_metrics import RequestMetrics
+
+
+def test_derived_indexes_report_cache_hits_and_misses(gtex_app, monkeypatch):
+    metrics = RequestMetrics()
+    monkeypatch.setitem(gtex_app.app.extensions, 'request_metrics', metrics)
+    client = gtex_app.app.test_client()
+
+    assert client.post('/api/texts', json={'title': 'Relatório', 'content': 'corpo'}).status_code == 201
+    for _ in range(3):
+        assert client.get('/api/suggest?prefix=rel').status_code == 200
+    assert client.get('/api/tags/stats').status_code == 200
+
+    assert metrics.cache[('suggest', 'miss')] == 1
+    assert metrics.cache[('suggest', 'hit')] == 2
+    assert metrics.cache[('tag_stats', 'miss')] == 1
+    assert 'gtex_cache_requests_total{cache="suggest",result="hit"} 2' in metrics.render()
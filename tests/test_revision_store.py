@@ -0,0 +1,124 @@
+import random
+import sqlite3
+
+import pytest
+
+from src.utils.revision_store import SCHEMA, RevisionStore, diff, patch
+
+
+def _edit(rng, content):
+    lines = content.splitlines(keepends=True) or ['']
+    position = rng.randrange(len(lines))
+    action = rng.randrange(3)
+    if action == 0:
+        lines.insert(position, f'linha nova {rng.random():.6f} ção\n')
+    elif action == 1 and len(lines) > 1:
+        del lines[position]
+    else:
+        lines[position] = lines[position].replace('a', 'á', 1) + 'x'
+    return ''.join(lines)
+
+
+def test_diff_and_patch_round_trip():
+    rng = random.Random(11)
+    cases = [('', ''), ('', 'novo'), ('velho', ''), ('abc', 'abc'), ('a\nb\nc\n', 'c\nb\na\n'),
+             ('log\n' * 50, 'log\n' * 20 + 'erro\n' + 'log\n' * 31)]
+    content = ''.join(f'linha {i} com algum texto\n' for i in range(40))
+    for _ in range(100):
+        edited = _edit(rng, content)
+        cases.append((content, edited))
+        content = edited
+    for old, new in cases:
+        assert patch(old, diff(old, new)) == new
+    # Uma linha alterada no meio de um texto grande vira cópia + inserção + cópia
+    assert len(diff(content, content.replace('linha 20 ', 'LINHA 20 '))) <= 3
+
+
+@pytest.fixture
+def db():
+    db = sqlite3.connect(':memory:')
+    db.executescript(SCHEMA + 'CREATE TABLE texts (id INTEGER PRIMARY KEY, title TEXT, content TEXT);')
+    db.execute("INSERT INTO texts (id, title, content) VALUES (1, 't', '')")
+    yield db
+    db.close()
+
+
+def _record_history(store, db, versions):
+    previous = None
+    for content in versions:
+        store.record(db, 1, 'Título', content, previous, 'Título')
+        previous = content
+
+
+def test_every_revision_is_rebuilt_from_keyframes_and_deltas(db):
+    rng = random.Random(2)
+    store = RevisionStore(keyframe_interval=5)
+    versions = [''.join(f'linha {i}\n' for i in range(200))]
+    for _ in range(12):
+        versions.append(_edit(rng, versions[-1]))
+    _record_history(store, db, versions)
+
+    listed = store.list(db, 1)
+    assert [entry['revision'] for entry in listed] == list(range(13, 0, -1))
+    kinds = [entry['kind'] for entry in reversed(listed)]
+    assert kinds == (['key'] + ['delta'] * 4) * 2 + ['key'] + ['delta'] * 2
+    for revision, content in enumerate(versions, start=1):
+        assert store.get(db, 1, revision)['content'] == content
+    assert store.get(db, 1, 99) is None
+
+
+def test_record_skips_unchanged_and_keys_on_unknown_previous(db):
+    store = RevisionStore()
+    assert store.record(db, 1, 'a', 'um') == 1
+    assert store.record(db, 1, 'a', 'um', 'um', 'a') is None
+    assert store.record(db, 1, 'b', 'um', 'um', 'a') == 2
+    # `previous` diferente da última revisão: o diff não valeria, grava um quadro-chave
+    assert store.record(db, 1, 'b', 'dois', 'outro', 'b') == 3
+    assert store.list(db, 1)[0]['kind'] == 'key'
+
+
+def test_text_older_than_history_gets_its_previous_state_recorded(db):
+    store = RevisionStore()
+    assert store.record(db, 1, 'novo', 'depois', 'antes', 'velho') == 2
+    assert store.get(db, 1, 1) == {'revision': 1, 'title': 'velho', 'size': 5,
+                                   'created_at': store.get(db, 1, 1)['created_at'], 'content': 'antes'}
+    assert store.get(db, 1, 2)['content'] == 'depois'
+
+
+def test_large_deltas_force_a_keyframe(db):
+    store = RevisionStore(max_delta_ratio=0.5)
+    store.record(db, 1, 't', 'curto')
+    store.record(db, 1, 't', 'um conteúdo totalmente diferente e bem mais longo', 'curto', 't')
+    assert [entry['kind'] for entry in store.list(db, 1)] == ['key', 'key']
+
+
+def test_compact_and_prune(db):
+    store = RevisionStore(keyframe_interval=4)
+    versions = [f'versão {i}\n' * 20 for i in range(10)]
+    _record_history(store, db, versions)
+    db.execute("UPDATE text_revisions SET created_at = datetime('now', '-200 days') WHERE revision <= 5")
+    db.execute("UPDATE text_revisions SET created_at = datetime('now', '-2 days') WHERE revision IN (6, 7)")
+
+    assert store.prune(db, keep_last=3, keep_daily_days=90) == {'texts': 1, 'removed': 6}
+    # As 3 últimas e a última de anteontem; as antigas caem fora da janela diária
+    assert [entry['revision'] for entry in store.list(db, 1)] == [10, 9, 8, 7]
+    for revision in (7, 8, 9, 10):
+        assert store.get(db, 1, revision)['content'] == versions[revision - 1]
+    assert store.list(db, 1)[-1]['kind'] == 'key'
+
+    db.execute('DELETE FROM texts')
+    assert store.prune(db)['removed'] == 4
+    assert store.list(db, 1) == []
+
+
+def test_revision_routes(gtex_app):
+    client = gtex_app.app.test_client()
+    text_id = client.post('/api/texts', json={'title': 'Diário', 'content': 'dia 1\n'}).get_json()['id']
+    client.put(f'/api/texts/{text_id}', json={'title': 'Diário', 'content': 'dia 1\ndia 2\n'})
+    client.put(f'/api/texts/{text_id}', json={'title': 'Diário', 'content': 'dia 1\ndia 2\n'})
+
+    revisions = client.get(f'/api/texts/{text_id}/revisions').get_json()
+    assert [entry['revision'] for entry in revisions] == [2, 1]
+    assert client.get(f'/api/texts/{text_id}/revisions/1').get_json()['content'] == 'dia 1\n'
+    assert client.get(f'/api/texts/{text_id}/revisions/3').status_code == 404
+    assert client.get('/api/texts/9999/revisions').status_code == 404
@@ -0,0 +1,125 @@
+import io
+import json
+import socketserver
+import sqlite3
+import threading
+import types
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import text
+
+from serve import WriteForwarder, tune_sqlite
+
+
+class _WriterHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def address_string(self):
+        return 'unix'
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        data = json.dumps({'method': self.command, 'path': self.path, 'body': body.decode('utf-8'),
+                           'headers': dict(self.headers)}).encode('utf-8')
+        self.send_response(201)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.send_header('Keep-Alive', 'timeout=5')
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_PUT = do_DELETE = do_POST
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+@pytest.fixture
+def writer_socket(tmp_path):
+    path = str(tmp_path / 'writer.sock')
+    server = _UnixServer(path, _WriterHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield path
+    server.shutdown()
+    server.server_close()
+
+
+def _local_app(environ, start_response):
+    start_response('200 OK', [('Content-Type', 'text/plain')])
+    return [b'leitor']
+
+
+def _call(app, method, path, body=b'', **environ):
+    responses = []
+    environ = dict({'REQUEST_METHOD': method, 'PATH_INFO': path, 'wsgi.input': io.BytesIO(body),
+                    'CONTENT_LENGTH': str(len(body)) if body else ''}, **environ)
+    result = app(environ, lambda status, headers: responses.append((status, dict(headers))))
+    return responses[0][0], responses[0][1], b''.join(result)
+
+
+def test_reads_stay_in_the_reader(tmp_path):
+    forwarder = WriteForwarder(_local_app, str(tmp_path / 'ausente.sock'))
+    assert _call(forwarder, 'GET', '/api/texts')[::2] == ('200 OK', b'leitor')
+
+
+def test_writes_are_forwarded_to_the_writer(writer_socket):
+    forwarder = WriteForwarder(_local_app, writer_socket)
+    # PATH_INFO chega decodificado em latin-1, como o servidor WSGI entrega
+    path = '/api/tags/ação'.encode('utf-8').decode('latin-1')
+    status, headers, body = _call(
+        forwarder, 'POST', path, b'{"name": "x"}', QUERY_STRING='a=1&b=%20', CONTENT_TYPE='application/json',
+        REMOTE_ADDR='10.0.0.2', HTTP_X_FORWARDED_FOR='192.168.0.1', HTTP_CONNECTION='close',
+        HTTP_X_GTEX_TENANT='acme')
+
+    assert status == '201 Created'
+    assert 'Keep-Alive' not in headers
+    echoed = json.loads(body)
+    assert echoed['path'] == '/api/tags/a%C3%A7%C3%A3o?a=1&b=%20'
+    assert echoed['body'] == '{"name": "x"}'
+    assert echoed['headers']['Content-Type'] == 'application/json'
+    assert echoed['headers']['X-Forwarded-For'] == '192.168.0.1, 10.0.0.2'
+    assert echoed['headers']['X-Gtex-Tenant'] == 'acme'
+
+
+def test_unavailable_writer_returns_503(tmp_path, capsys):
+    forwarder = WriteForwarder(_local_app, str(tmp_path / 'ausente.sock'))
+    status, headers, body = _call(forwarder, 'DELETE', '/api/texts/1')
+    assert status == '503 Service Unavailable'
+    assert headers['Retry-After'] == '1'
+    assert 'error' in json.loads(body)
+    assert 'Escritor indisponível' in capsys.readouterr().out
+
+
+def test_tune_sqlite_sets_module_pragmas():
+    module = types.SimpleNamespace(SQLITE_PRAGMAS=('journal_mode=DELETE',),
+                                   tenant_router=types.SimpleNamespace(pragmas=()))
+    tune_sqlite(Flask(__name__), module, pragmas=['journal_mode=WAL'])
+    assert module.SQLITE_PRAGMAS == ('journal_mode=WAL',)
+    assert module.tenant_router.pragmas == ('journal_mode=WAL',)
+
+
+def test_tune_sqlite_applies_pragmas_to_sqlalchemy(tmp_path):
+    flask_app = Flask(__name__)
+    flask_app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'gtex.db'}"
+    db = SQLAlchemy(flask_app)
+    with flask_app.app_context():
+        db.session.execute(text('SELECT 1'))
+        db.session.remove()
+
+    tune_sqlite(flask_app, types.SimpleNamespace())
+    with flask_app.app_context():
+        assert db.session.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+        assert db.session.execute(text('PRAGMA busy_timeout')).scalar() == 5000
+        db.session.remove()
+        db.engine.dispose()
+    conn = sqlite3.connect(str(tmp_path / 'gtex.db'))
+    assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+    conn.close()
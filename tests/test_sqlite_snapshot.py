@@ -0,0 +1,86 @@
+import os
+import sqlite3
+
+import pytest
+
+from src.utils.sqlite_snapshot import SnapshotRestarted, SQLiteSnapshotManager
+
+
+def _database(path, rows=200, wal=False):
+    conn = sqlite3.connect(path)
+    if wal:
+        conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("CREATE TABLE texts (id INTEGER PRIMARY KEY, content TEXT)")
+    conn.executemany("INSERT INTO texts (content) VALUES (?)", [('x' * 500,)] * rows)
+    conn.commit()
+    conn.close()
+
+
+def _count(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM texts").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_snapshot_and_restore_round_trip(tmp_path):
+    db_path = str(tmp_path / 'gtex.db')
+    _database(db_path)
+    manager = SQLiteSnapshotManager(db_path, pages_per_step=4, step_sleep=0)
+
+    snapshot = manager.create_snapshot()
+    assert snapshot and manager.verify(snapshot)
+    assert not os.path.exists(snapshot + '.tmp')
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("DELETE FROM texts")
+    conn.commit()
+    conn.close()
+
+    assert manager.restore()
+    assert _count(db_path) == 200
+
+
+def test_rotation_keeps_most_recent(tmp_path):
+    db_path = str(tmp_path / 'gtex.db')
+    _database(db_path, rows=1)
+    manager = SQLiteSnapshotManager(db_path, keep=2, step_sleep=0)
+
+    created = [manager.create_snapshot() for _ in range(4)]
+    assert manager.list_snapshots() == created[-2:]
+    assert manager.status()['count'] == 2
+
+
+def test_corrupted_snapshot_is_not_restored(tmp_path):
+    db_path = str(tmp_path / 'gtex.db')
+    _database(db_path, rows=1)
+    manager = SQLiteSnapshotManager(db_path, step_sleep=0)
+    snapshot = manager.create_snapshot()
+    with open(snapshot, 'r+b') as f:
+        f.write(b'isto nao e sqlite')
+
+    assert not manager.verify(snapshot)
+    assert not manager.restore()
+    assert _count(db_path) == 1
+
+
+@pytest.mark.parametrize('wal', [True, False])
+def test_restarted_copy_falls_back_only_in_wal(tmp_path, monkeypatch, wal):
+    db_path = str(tmp_path / 'gtex.db')
+    _database(db_path, wal=wal)
+    manager = SQLiteSnapshotManager(db_path, step_sleep=0)
+    copy = manager._copy
+
+    def restarting(source, target, pages):
+        if pages != -1:
+            raise SnapshotRestarted()
+        copy(source, target, pages)
+
+    monkeypatch.setattr(manager, '_copy', restarting)
+    snapshot = manager.create_snapshot()
+    if wal:
+        assert snapshot and _count(snapshot) == 200
+    else:
+        assert snapshot is None
+        assert os.listdir(manager.snapshot_dir) == []
@@ -0,0 +1,123 @@
+import gzip
+import os
+import sqlite3
+
+import pytest
+
+from src.utils.streaming_backup import (export_sqlite, import_sqlite, iter_batches, iter_dataset_records,
+                                        load_dataset, read_ndjson, write_ndjson)
+from src.utils.ultimate_manager import LocalPostgreSQLManager
+
+TAGS = [{'name': 'ideia', 'color': '#ff0000'}, {'name': 'tarefa', 'color': '#00ff00'}]
+TEXTS = [
+    {'id': 1, 'title': 'Um', 'content': 'linha\noutra', 'tags': ['ideia', 'tarefa']},
+    {'id': 2, 'title': 'Dois', 'content': 'ç ã 🎉', 'tags': [{'name': 'ideia', 'color': '#ff0000'}]},
+    {'id': 3, 'title': 'Três', 'content': '', 'tags': []},
+]
+
+
+def _database(path, texts=TEXTS, tags=TAGS):
+    local = LocalPostgreSQLManager(str(path))
+    local.init_database()
+    local.save_data(texts, tags)
+    return local
+
+
+def _contents(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        texts = conn.execute("""
+            SELECT t.id, t.title, t.content,
+                   (SELECT GROUP_CONCAT(g.name) FROM (SELECT g.name FROM text_tags tt JOIN tags g ON g.id = tt.tag_id
+                                                      WHERE tt.text_id = t.id ORDER BY g.name) g)
+            FROM texts t ORDER BY t.id
+        """).fetchall()
+        tags = conn.execute("SELECT name, color FROM tags ORDER BY name").fetchall()
+        return texts, tags
+    finally:
+        conn.close()
+
+
+@pytest.mark.parametrize('name', ['backup.ndjson', 'backup.ndjson.gz'])
+def test_write_and_read_round_trip(tmp_path, name):
+    path = str(tmp_path / name)
+    assert write_ndjson(path, iter_dataset_records(TEXTS, TAGS)) == 1 + len(TAGS) + len(TEXTS)
+    assert not os.path.exists(path + '.tmp')
+    if name.endswith('.gz'):
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            assert f.readline().startswith('{"type":"meta"')
+
+    texts, tags = load_dataset(path)
+    assert [t['name'] for t in tags] == ['ideia', 'tarefa']
+    assert [t['tags'] for t in texts] == [['ideia', 'tarefa'], ['ideia'], []]
+    assert texts[1]['content'] == 'ç ã 🎉'
+
+
+def test_invalid_line_reports_its_number(tmp_path):
+    path = tmp_path / 'backup.ndjson'
+    path.write_text('{"type":"meta"}\n\n{"type":"tag"\n', encoding='utf-8')
+    records = read_ndjson(str(path))
+    assert next(records) == {'type': 'meta'}
+    with pytest.raises(ValueError, match='Linha 3'):
+        next(records)
+
+
+def test_iter_batches():
+    assert [len(batch) for batch in iter_batches(range(7), 3)] == [3, 3, 1]
+    assert list(iter_batches([], 3)) == []
+
+
+def test_export_import_round_trip(tmp_path):
+    source = _database(tmp_path / 'a' / 'source.db')
+    path = str(tmp_path / 'backup.ndjson.gz')
+    assert export_sqlite(source.db_path, path, batch_size=2) == 1 + len(TAGS) + len(TEXTS)
+
+    target = LocalPostgreSQLManager(str(tmp_path / 'b' / 'target.db'))
+    target.init_database()
+    assert import_sqlite(target.db_path, path, batch_size=2) == {'texts': 3, 'tags': 2}
+    assert _contents(target.db_path) == _contents(source.db_path)
+
+
+def test_reimport_replaces_by_id_and_matches_tags_by_name(tmp_path):
+    local = _database(tmp_path / 'local.db')
+    path = str(tmp_path / 'backup.ndjson')
+    export_sqlite(local.db_path, path)
+    before = _contents(local.db_path)
+
+    import_sqlite(local.db_path, path)
+    assert _contents(local.db_path) == before
+
+    changed = [dict(TEXTS[0], title='Um (editado)', tags=['tarefa']), {'title': 'Sem id', 'content': 'x'}]
+    write_ndjson(path, iter_dataset_records(changed, [{'name': 'ideia', 'color': '#000000'}]))
+    import_sqlite(local.db_path, path)
+    texts, tags = _contents(local.db_path)
+    assert texts[0] == (1, 'Um (editado)', 'linha\noutra', 'tarefa')
+    assert texts[-1][1:] == ('Sem id', 'x', None)
+    assert len(texts) == 4
+    assert tags == [('ideia', '#000000'), ('tarefa', '#00ff00')]
+
+
+def test_import_stops_at_invalid_line_keeping_committed_batches(tmp_path):
+    local = LocalPostgreSQLManager(str(tmp_path / 'local.db'))
+    local.init_database()
+    path = tmp_path / 'backup.ndjson'
+    path.write_text('\n'.join([
+        '{"type":"text","id":1,"title":"a","content":"x"}',
+        '{"type":"text","id":2,"title":"b","content":"y"}',
+        'quebrado',
+    ]), encoding='utf-8')
+    with pytest.raises(ValueError):
+        import_sqlite(local.db_path, str(path), batch_size=1)
+    assert [row[0] for row in _contents(local.db_path)[0]] == [1, 2]
+
+
+def test_main_stream_reimport_does_not_duplicate(main_app):
+    client = main_app.test_client()
+    body = client.get('/api/backup/stream').get_data()
+    assert body.count(b'"type":"text"') > 0
+
+    for _ in range(2):
+        response = client.post('/api/backup/stream', data=gzip.compress(body),
+                               headers={'Content-Encoding': 'gzip'})
+        assert response.status_code == 200
+    assert client.get('/api/backup/stream').get_data().count(b'\n') == body.count(b'\n')
@@ -0,0 +1,90 @@
+import random
+
+from src.utils.suggest_index import CACHE_RANGE, SuggestIndex, fold
+
+
+def _ids(results):
+    return [(item['type'], item['id']) for item in results]
+
+
+def test_fold():
+    assert fold('  Ação   Já ') == 'acao ja'
+    assert fold('ÉTÉ') == 'ete'
+    assert fold(None) == ''
+
+
+def test_matches_any_word_ranked_by_usage_then_label():
+    index = SuggestIndex.build([
+        ('text', 1, 'Lista de compras', 2),
+        ('text', 2, 'Compras do mês', 5),
+        ('tag', 3, 'comprimido', 5),
+        ('text', 4, 'Computador', 0),
+    ])
+    assert _ids(index.suggest('comp')) == [('text', 2), ('tag', 3), ('text', 1), ('text', 4)]
+    assert _ids(index.suggest('COMPR', kind='text')) == [('text', 2), ('text', 1)]
+    assert _ids(index.suggest('de comp')) == [('text', 1)]
+    assert _ids(index.suggest('comp', limit=1)) == [('text', 2)]
+    assert index.suggest('   ') == []
+
+
+def test_rename_keeps_usage_and_remove():
+    index = SuggestIndex()
+    index.add('text', 1, 'Rascunho', usage=3)
+    index.add('text', 1, 'Relatório final')
+    assert index.suggest('ras') == []
+    assert index.suggest('fin') == [{'type': 'text', 'id': 1, 'label': 'Relatório final', 'usage': 3}]
+
+    index.add_usage('text', 1, 2)
+    assert index.suggest('rel')[0]['usage'] == 5
+    index.remove('text', 1)
+    assert index.suggest('rel') == [] and len(index) == 0
+
+
+def _brute_force(labels, usage, prefix, limit, kind):
+    folded = fold(prefix)
+    matches = [item for item, label in labels.items()
+               if (kind is None or item[0] == kind)
+               and any(' '.join(fold(label).split(' ')[i:]).startswith(folded)
+                       for i in range(len(fold(label).split(' '))))]
+    matches.sort(key=lambda item: (-usage[item], labels[item].casefold()))
+    return matches[:limit]
+
+
+def test_cached_rankings_stay_consistent_with_updates():
+    rng = random.Random(3)
+    labels = {('text' if i % 3 else 'tag', i): f'nota {i:04d} {rng.choice(["alfa", "beta"])}'
+              for i in range(CACHE_RANGE * 2)}
+    usage = {item: rng.randrange(20) for item in labels}
+    index = SuggestIndex.build((kind, item_id, labels[(kind, item_id)], usage[(kind, item_id)])
+                               for kind, item_id in labels)
+
+    for step in range(300):
+        item = rng.choice(sorted(labels))
+        action = rng.randrange(4)
+        if action == 0:
+            usage[item] += rng.randrange(1, 30)
+            index.set_usage(*item, usage[item])
+        elif action == 1:
+            usage[item] = max(0, usage[item] - rng.randrange(1, 30))
+            index.set_usage(*item, usage[item])
+        elif action == 2:
+            labels[item] = f'nota renomeada {step}'
+            index.add(*item, labels[item])
+        else:
+            del labels[item], usage[item]
+            index.remove(*item)
+
+        for prefix, limit, kind in (('nota', 10, None), ('no', 50, 'text'), ('not', 5, 'tag')):
+            assert _ids(index.suggest(prefix, limit, kind)) == _brute_force(labels, usage, prefix, limit, kind)
+
+
+def test_suggest_route_orders_by_opens(gtex_app):
+    client = gtex_app.app.test_client()
+    first = client.post('/api/texts', json={'title': 'Plano anual', 'content': 'x'}).get_json()['id']
+    second = client.post('/api/texts', json={'title': 'Plano semanal', 'content': 'x'}).get_json()['id']
+
+    assert [item['id'] for item in client.get('/api/suggest?prefix=plano&type=text').get_json()] == [first, second]
+    for _ in range(2):
+        client.get(f'/api/texts/{second}')
+    assert [item['id'] for item in client.get('/api/suggest?prefix=plano&type=text').get_json()] == [second, first]
+    assert client.get('/api/suggest?prefix=plano&type=outro').status_code == 400
@@ -0,0 +1,119 @@
+"""Sincronização com um PostgreSQL real; roda só com GTEX_TEST_POSTGRES_DSN definido.
+
+Cada teste usa um schema próprio (search_path na DSN), apagado no final.
+"""
+import os
+import uuid
+
+import pytest
+
+psycopg2 = pytest.importorskip('psycopg2')
+from psycopg2.extensions import make_dsn
+
+from src.utils.ultimate_manager import SupabaseManager
+
+DSN = os.environ.get('GTEX_TEST_POSTGRES_DSN')
+pytestmark = pytest.mark.skipif(not DSN, reason='GTEX_TEST_POSTGRES_DSN não definido')
+
+TAGS = [{'name': 'ideia', 'color': '#ff0000'}, {'name': 'tarefa', 'color': '#00ff00'}]
+
+
+@pytest.fixture
+def manager():
+    schema = f'gtex_test_{uuid.uuid4().hex[:12]}'
+    admin = psycopg2.connect(DSN)
+    admin.autocommit = True
+    with admin.cursor() as cursor:
+        cursor.execute(f'CREATE SCHEMA {schema}')
+    manager = SupabaseManager(make_dsn(DSN, options=f'-csearch_path={schema}'), max_connections=2)
+    assert manager.connect()
+    try:
+        yield manager
+    finally:
+        manager.close()
+        with admin.cursor() as cursor:
+            cursor.execute(f'DROP SCHEMA {schema} CASCADE')
+        admin.close()
+
+
+def _texts():
+    return [
+        {'id': 1, 'title': 'Primeiro', 'content': 'vírgula, "aspas" e\nquebra', 'tags': ['ideia', 'tarefa']},
+        {'id': 2, 'title': 'Segundo', 'content': '', 'tags': [{'name': 'ideia'}]},
+        {'id': 3, 'title': 'Terceiro', 'content': 'sem etiquetas', 'tags': []},
+    ]
+
+
+def _rows(manager):
+    with manager._connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute('SELECT id, title, updated_at FROM texts ORDER BY id')
+            return cursor.fetchall()
+
+
+def _simplified(texts):
+    return sorted((t['id'], t['title'], t['content'], sorted(t['tags'])) for t in texts)
+
+
+def test_save_and_load_round_trip(manager):
+    assert manager.save_data(_texts(), TAGS)
+    texts, tags = manager.load_data(raise_errors=True)
+
+    assert _simplified(texts) == [
+        (1, 'Primeiro', 'vírgula, "aspas" e\nquebra', ['ideia', 'tarefa']),
+        (2, 'Segundo', '', ['ideia']),
+        (3, 'Terceiro', 'sem etiquetas', []),
+    ]
+    assert [(t['name'], t['color']) for t in tags] == [('ideia', '#ff0000'), ('tarefa', '#00ff00')]
+
+    dataset = manager.load_compact()
+    assert _simplified(dataset.to_dicts()[0]) == _simplified(texts)
+
+
+def test_resave_applies_only_the_difference(manager):
+    assert manager.save_data(_texts(), TAGS)
+    before = {row[0]: row for row in _rows(manager)}
+
+    texts = _texts()
+    texts[0]['title'] = 'Primeiro (editado)'
+    texts[0]['tags'] = ['ideia']
+    del texts[2]
+    texts.append({'title': 'Sem id', 'content': 'novo', 'tags': ['tarefa']})
+    tags = [{'name': 'ideia', 'color': '#0000ff'}, {'name': 'tarefa', 'color': '#00ff00'}]
+    assert manager.save_data(texts, tags)
+
+    after = {row[0]: row for row in _rows(manager)}
+    assert after[1][1] == 'Primeiro (editado)'
+    assert after[2] == before[2]  # linha inalterada não é reescrita
+    assert 3 not in after
+    new_id = max(after)
+    assert new_id > 3
+
+    loaded, loaded_tags = manager.load_data(raise_errors=True)
+    assert _simplified(loaded) == [
+        (1, 'Primeiro (editado)', 'vírgula, "aspas" e\nquebra', ['ideia']),
+        (2, 'Segundo', '', ['ideia']),
+        (new_id, 'Sem id', 'novo', ['tarefa']),
+    ]
+    assert {t['name']: t['color'] for t in loaded_tags} == {'ideia': '#0000ff', 'tarefa': '#00ff00'}
+
+    # Etiqueta removida do snapshot sai do banco junto com as associações
+    assert manager.save_data(loaded, [tags[0]])
+    loaded, loaded_tags = manager.load_data(raise_errors=True)
+    assert [t['name'] for t in loaded_tags] == ['ideia']
+    assert all('tarefa' not in t['tags'] for t in loaded)
+
+
+def test_server_side_cursor_reads_in_batches(manager):
+    texts = [{'id': i, 'title': f'Texto {i}', 'content': 'x' * i, 'tags': ['ideia']} for i in range(1, 251)]
+    assert manager.save_data(texts, TAGS)
+    streamed = list(manager.iter_texts(batch_size=7))
+    assert _simplified(streamed) == _simplified(texts)
+
+
+def test_failed_save_rolls_back(manager):
+    assert manager.save_data(_texts(), TAGS)
+    broken = _texts() + [{'id': 9, 'title': 'x' * 500, 'content': 'título longo demais', 'tags': []}]
+    assert not manager.save_data(broken, TAGS)
+    assert _simplified(manager.load_data(raise_errors=True)[0]) == _simplified(
+        [dict(t, tags=[tag['name'] if isinstance(tag, dict) else tag for tag in t['tags']]) for t in _texts()])
@@ -0,0 +1,105 @@
+import random
+from datetime import date
+
+import numpy as np
+
+from src.utils.tag_stats import TagStats, day_number
+
+
+def _brute_force(texts):
+    counts, pairs = {}, {}
+    for _, tag_ids in texts.values():
+        for tag_id in tag_ids:
+            counts[tag_id] = counts.get(tag_id, 0) + 1
+        for first in tag_ids:
+            for second in tag_ids:
+                if first < second:
+                    pairs[(first, second)] = pairs.get((first, second), 0) + 1
+    return counts, pairs
+
+
+def _pairs(stats):
+    return {tuple(pair['tag_ids']): pair['count'] for pair in stats.cooccurrence()}
+
+
+def test_day_number():
+    assert day_number('1970-01-02') == 1
+    assert day_number('2025-06-01 10:00:00') == day_number(date(2025, 6, 1))
+
+
+def test_build_and_incremental_changes_match_brute_force():
+    rng = random.Random(5)
+    tag_ids = list(range(100, 120))
+    texts = {text_id: (f'2025-01-{rng.randint(1, 28):02d}', sorted(rng.sample(tag_ids, rng.randint(0, 4))))
+             for text_id in range(300)}
+    links = [(text_id, tag_id, created) for text_id, (created, tags) in sorted(texts.items()) for tag_id in tags]
+    stats = TagStats.build(tag_ids, links, chunk=64)
+
+    counts, pairs = _brute_force(texts)
+    assert {k: v for k, v in stats.counts().items() if v} == counts
+    assert _pairs(stats) == pairs
+
+    for text_id in rng.sample(sorted(texts), 100):
+        created, old = texts[text_id]
+        new = sorted(rng.sample(tag_ids, rng.randint(0, 4)))
+        stats.change_text(created, old, new)
+        texts[text_id] = (created, new)
+    counts, pairs = _brute_force(texts)
+    assert {k: v for k, v in stats.counts().items() if v} == counts
+    assert _pairs(stats) == pairs
+
+    daily = stats.daily('2025-01-01', '2025-01-31')
+    assert len(daily['dates']) == 31
+    assert sum(sum(series) for series in daily['series'].values()) == sum(counts.values())
+
+
+def test_histogram_grows_in_both_directions():
+    stats = TagStats([1, 2])
+    stats.change_text('2025-03-10', (), [1])
+    stats.change_text('2025-01-01', (), [1, 2])
+    stats.change_text('2025-06-30', (), [2])
+    assert stats.last_day() == date(2025, 6, 30)
+
+    daily = stats.daily('2024-12-31', '2025-01-02', tag_ids=[1, 2, 99])
+    assert daily['dates'] == ['2024-12-31', '2025-01-01', '2025-01-02']
+    assert daily['series'] == {1: [0, 1, 0], 2: [0, 1, 0]}
+    assert stats.daily('2030-01-01', '2030-01-01')['series'] == {}
+
+
+def test_removed_tag_columns_are_reused():
+    stats = TagStats([1, 2, 3])
+    stats.change_text('2025-01-01', (), [1, 2, 3])
+    stats.remove_tag(2)
+    assert stats.counts() == {1: 1, 3: 1}
+    assert _pairs(stats) == {(1, 3): 1}
+
+    stats.add_tag(4)
+    assert stats.counts()[4] == 0
+    stats.change_text('2025-01-01', [1, 3], [1, 4])
+    assert _pairs(stats) == {(1, 4): 1}
+
+    # Etiquetas desconhecidas são ignoradas
+    stats.change_text('2025-01-01', (), [99])
+    assert 99 not in stats.counts()
+    for tag_id in range(5, 40):
+        stats.add_tag(tag_id)
+    assert stats.counts()[1] == 1 and int(np.trace(stats._cooccurrence)) == 2
+
+
+def test_stats_route_follows_text_updates(gtex_app):
+    client = gtex_app.app.test_client()
+    work, home = (client.post('/api/tags', json={'name': name, 'color': '#000000'}).get_json()['id']
+                  for name in ('trabalho', 'casa'))
+    text_id = client.post('/api/texts', json={'title': 'a', 'content': 'x', 'tag_ids': [work, home]}).get_json()['id']
+
+    stats = client.get('/api/tags/stats').get_json()
+    assert {tag['name']: tag['text_count'] for tag in stats['tags']}['trabalho'] == 1
+    assert {tuple(pair['tag_ids']): pair['count'] for pair in stats['pairs']}[tuple(sorted((work, home)))] == 1
+
+    client.put(f'/api/texts/{text_id}', json={'title': 'a', 'content': 'x', 'tag_ids': [home]})
+    stats = client.get('/api/tags/stats').get_json()
+    assert {tag['name']: tag['text_count'] for tag in stats['tags']}['trabalho'] == 0
+    assert tuple(sorted((work, home))) not in {tuple(pair['tag_ids']) for pair in stats['pairs']}
+
+    assert client.get('/api/tags/stats?from=2025-02-01&to=2025-01-01').status_code == 400
+    assert client.get('/api/tags/stats?tag_id=x').status_code == 400
@@ -0,0 +1,117 @@
+import os
+import sqlite3
+
+import pytest
+
+from src.utils.tenant_router import TenantEngines, TenantError, TenantRouter, main
+
+SCHEMA = 'CREATE TABLE IF NOT EXISTS texts (id INTEGER PRIMARY KEY, title TEXT NOT NULL);'
+MIGRATIONS = ('ALTER TABLE texts ADD COLUMN content TEXT', 'CREATE INDEX idx_texts_title ON texts (title)')
+
+
+@pytest.fixture
+def router(tmp_path):
+    router = TenantRouter(str(tmp_path / 'tenants'), max_open=2, schema=SCHEMA, migrations=MIGRATIONS,
+                          pragmas=('journal_mode=WAL',))
+    yield router
+    router.close()
+
+
+def _columns(path):
+    conn = sqlite3.connect(path)
+    try:
+        return [row[1] for row in conn.execute('PRAGMA table_info(texts)')], \
+            conn.execute('PRAGMA user_version').fetchone()[0]
+    finally:
+        conn.close()
+
+
+@pytest.mark.parametrize('tenant', ['', '../fora', 'a/b', '-x', 'x' * 65])
+def test_invalid_tenants_are_rejected(router, tenant):
+    with pytest.raises(TenantError):
+        router.path(tenant)
+
+
+def test_databases_are_sharded_and_isolated(router):
+    with router.connection('acme') as conn:
+        conn.execute("INSERT INTO texts (title) VALUES ('a')")
+        conn.commit()
+    with router.connection('globex') as conn:
+        assert conn.execute('SELECT COUNT(*) FROM texts').fetchone()[0] == 0
+        assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+
+    assert len(os.path.basename(os.path.dirname(router.path('acme')))) == 2
+    assert sorted(router.tenants()) == ['acme', 'globex']
+
+
+def test_migrations_follow_user_version(router):
+    router.prepare('acme')
+    assert _columns(router.path('acme')) == (['id', 'title', 'content'], 2)
+
+    newer = TenantRouter(router.base_dir, schema=SCHEMA,
+                         migrations=MIGRATIONS + ('ALTER TABLE texts ADD COLUMN tag TEXT',))
+    assert newer.migrate('acme') == 1
+    assert newer.migrate('acme') == 0
+    assert _columns(router.path('acme')) == (['id', 'title', 'content', 'tag'], 3)
+
+
+def test_lru_closes_least_recently_used_idle_connections(router):
+    first = router.checkout('a')
+    router.checkin(first)
+    assert router.checkout('a') is first
+    router.checkin(first)
+
+    for tenant in ('b', 'c'):
+        router.checkin(router.checkout(tenant))
+    assert router.open_connections() == 2
+    assert router.stats == {'hits': 1, 'misses': 3, 'evicted': 1}
+    with pytest.raises(sqlite3.ProgrammingError):
+        first.execute('SELECT 1')
+
+
+def test_borrowed_connections_are_not_evicted(router):
+    borrowed = [router.checkout(tenant) for tenant in ('a', 'b', 'c')]
+    assert router.open_connections() == 3
+    for conn in borrowed:
+        conn.execute('SELECT 1')
+        router.checkin(conn)
+    assert router.open_connections() == 2
+
+
+def test_checkin_rolls_back_open_transactions(router):
+    conn = router.checkout('acme')
+    conn.execute("INSERT INTO texts (title) VALUES ('perdido')")
+    router.checkin(conn)
+    with router.connection('acme') as conn:
+        assert conn.execute('SELECT COUNT(*) FROM texts').fetchone()[0] == 0
+
+
+def test_release_and_maintenance(router, tmp_path, capsys):
+    with router.connection('acme') as conn:
+        conn.executemany('INSERT INTO texts (title) VALUES (?)', [('x' * 1000,)] * 100)
+        conn.commit()
+        conn.execute('DELETE FROM texts')
+        conn.commit()
+    assert router.release('acme') == 1
+
+    result = router.vacuum('acme')
+    assert result['bytes_after'] < result['bytes_before']
+    snapshot = router.backup('acme', str(tmp_path / 'backups'))
+    assert snapshot and os.path.exists(snapshot)
+
+    assert main([router.base_dir, 'list']) == 0
+    assert 'acme\t' in capsys.readouterr().out
+    assert main([router.base_dir, 'backup', '../fora']) == 1
+
+
+def test_tenant_engines_lru(router):
+    from sqlalchemy import text
+
+    engines = TenantEngines(router, max_engines=1)
+    first = engines.engine('a')
+    assert engines.engine('a') is first
+    with first.connect() as conn:
+        assert conn.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+    engines.engine('b')
+    assert list(engines._engines) == ['b']
+    engines.close()
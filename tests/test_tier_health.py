@@ -0,0 +1,67 @@
+import time
+
+from src.utils.tier_health import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, TierHealthTracker
+
+
+def test_breaker_opens_after_threshold_and_allows_one_trial():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10.0)
+    breaker.record_failure(0.0)
+    assert breaker.state == CLOSED
+    breaker.record_failure(1.0)
+    assert breaker.state == OPEN
+    assert not breaker.allow_request(5.0)
+
+    assert breaker.available(11.0)
+    assert breaker.state == OPEN  # available() não muda o estado
+    assert breaker.allow_request(11.0)
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow_request(11.0)  # uma tentativa por vez
+    breaker.record_failure(12.0)
+    assert breaker.state == OPEN and breaker.opened_at == 12.0
+
+
+def test_order_follows_priority_even_after_fallback_served_data():
+    tracker = TierHealthTracker(['primary', 'local', 'json'])
+    tracker.record('json', 0.001, True)
+    tracker.mark_good('json')
+    tracker.record('primary', 0.5, True)
+    assert tracker.order() == ['primary', 'local', 'json']
+
+
+def test_order_skips_open_breakers_and_puts_half_open_last(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr(time, 'monotonic', lambda: clock[0])
+    tracker = TierHealthTracker(['primary', 'local', 'json'], failure_threshold=1, reset_timeout=5.0)
+    tracker.record('primary', 0.01, False)
+    assert tracker.order() == ['local', 'json']
+
+    clock[0] += 6.0
+    with tracker.attempt('primary') as allowed:
+        assert allowed
+        assert tracker.order() == ['local', 'json']  # tentativa do meio-aberto ocupada
+    assert tracker.order() == ['local', 'json', 'primary']
+    tracker.record('primary', 0.01, True)
+    assert tracker.order() == ['primary', 'local', 'json']
+
+
+def test_order_does_not_consume_half_open_trial(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr(time, 'monotonic', lambda: clock[0])
+    tracker = TierHealthTracker(['primary'], failure_threshold=1, reset_timeout=1.0)
+    tracker.record('primary', None, False)
+    clock[0] = 2.0
+    for _ in range(3):
+        assert tracker.order() == ['primary']
+    with tracker.attempt('primary') as allowed:
+        assert allowed
+
+
+def test_latency_and_last_good_only_break_ties_within_a_priority():
+    tracker = TierHealthTracker(['a', 'b', 'c'], priorities={'a': 0, 'b': 1, 'c': 1})
+    tracker.record('b', 0.5, True)
+    tracker.record('c', 0.1, True)
+    assert tracker.order() == ['a', 'c', 'b']
+    tracker.mark_good('b')
+    assert tracker.order() == ['a', 'b', 'c']
+    tracker.record('b', 0.1, False)  # falha tira a marca de última boa
+    assert tracker.snapshot()['b']['last_good'] is False
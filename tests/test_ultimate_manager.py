@@ -0,0 +1,172 @@
+import threading
+import time
+
+import pytest
+
+from src.utils.ultimate_manager import LocalPostgreSQLManager, UltimateDataManager
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    monkeypatch.delenv('GTEX_SUPABASE_DSN', raising=False)
+    manager = UltimateDataManager(str(tmp_path / 'local.db'), quorum=('local',))
+    yield manager
+    manager.close()
+
+
+def test_save_does_not_wait_for_queued_background_tier(manager, monkeypatch):
+    release = threading.Event()
+    saved = []
+
+    def slow_json(texts, tags, changed):
+        release.wait(5)
+        saved.append([text['title'] for text in texts])
+        return True
+
+    original = manager._tier_function
+    monkeypatch.setattr(manager, '_tier_function', lambda tier: slow_json if tier == 'json' else original(tier))
+
+    for title in ('a', 'b', 'c'):
+        started = time.monotonic()
+        assert manager.save_data([{'id': 1, 'title': title, 'content': 'x', 'tags': []}], [])
+        assert time.monotonic() - started < 0.5
+
+    release.set()
+    assert manager.flush(timeout=5)
+    # A primeira gravação estava em andamento; as duas seguintes viraram uma só, com o snapshot mais novo
+    assert saved == [['a'], ['c']]
+    assert manager.get_metrics()['json']['calls'] == 2
+    assert manager.get_metrics()['json']['failures'] == 0
+
+
+def test_save_runs_inline_after_executors_shut_down(manager):
+    for executor in manager._executors.values():
+        executor.shutdown(wait=True)
+    assert manager.save_data([{'id': 1, 'title': 'a', 'content': 'x', 'tags': []}], [])
+    assert manager.local_db.load_data()[0][0]['title'] == 'a'
+
+
+def test_save_and_load_round_trip(manager):
+    tags = [{'name': 'ideia', 'color': '#ff0000'}]
+    assert manager.save_data([{'id': 7, 'title': 'Nota', 'content': 'corpo', 'tags': ['ideia']}], tags)
+    assert manager.flush(timeout=5)
+    texts, loaded_tags = manager.load_data()
+    assert [(t['id'], t['title'], t['content'], t['tags']) for t in texts] == [(7, 'Nota', 'corpo', ['ideia'])]
+    assert [(t['name'], t['color']) for t in loaded_tags] == [('ideia', '#ff0000')]
+
+
+def _stored(local):
+    import sqlite3
+    conn = sqlite3.connect(local.db_path)
+    try:
+        return conn.execute("SELECT id, title, content_hash FROM texts ORDER BY id").fetchall()
+    finally:
+        conn.close()
+
+
+def test_local_save_applies_only_the_difference(tmp_path, capsys):
+    local = LocalPostgreSQLManager(str(tmp_path / 'local.db'))
+    local.init_database()
+    tags = [{'name': 'a', 'color': '#000000'}]
+    texts = [{'id': i, 'title': f't{i}', 'content': 'x', 'tags': ['a']} for i in (3, 5)]
+    texts.append({'title': 'sem id', 'content': 'y', 'tags': []})
+    assert local.save_data(texts, tags)
+    # O texto sem id recebe um id depois dos explícitos
+    assert [row[:2] for row in _stored(local)] == [(3, 't3'), (5, 't5'), (6, 'sem id')]
+
+    capsys.readouterr()
+    texts[0] = dict(texts[0], title='mudou')
+    assert local.save_data(texts[:1] + texts[2:], tags)
+    assert '0 inseridos, 1 atualizados, 1 removidos' in capsys.readouterr().out
+    assert [row[:2] for row in _stored(local)] == [(3, 'mudou'), (6, 'sem id')]
+
+
+def test_import_stream_hashes_each_batch(tmp_path, capsys):
+    from src.utils.streaming_backup import iter_dataset_records, write_ndjson
+
+    tags = [{'name': 'a', 'color': '#000000'}, {'name': 'b', 'color': '#ffffff'}]
+    texts = [{'id': i, 'title': f't{i}', 'content': 'x' * i, 'tags': ['a', 'b'][:i % 3]} for i in range(1, 26)]
+    path = str(tmp_path / 'backup.ndjson.gz')
+    write_ndjson(path, iter_dataset_records(texts, tags))
+
+    local = LocalPostgreSQLManager(str(tmp_path / 'local.db'))
+    local.init_database()
+    assert local.import_stream(path, batch_size=4) == {'texts': 25, 'tags': 2}
+    imported = _stored(local)
+    assert all(content_hash for _, _, content_hash in imported)
+
+    # Os hashes gravados na importação batem com os do salvamento: nada a reescrever
+    capsys.readouterr()
+    assert local.save_data(texts, tags)
+    assert '0 inseridos, 0 atualizados, 0 removidos' in capsys.readouterr().out
+    assert _stored(local) == imported
+
+
+def test_backfill_hashes_in_batches(tmp_path):
+    import sqlite3
+
+    local = LocalPostgreSQLManager(str(tmp_path / 'local.db'))
+    local.init_database()
+    local.save_data([{'id': i, 'title': f't{i}', 'content': 'x', 'tags': []} for i in range(1, 8)], [])
+    expected = _stored(local)
+    conn = sqlite3.connect(local.db_path)
+    conn.execute("UPDATE texts SET content_hash = NULL")
+    local._backfill_hashes(conn.cursor(), batch_size=3)
+    conn.commit()
+    conn.close()
+    assert _stored(local) == expected
+
+
+def test_oplog_receives_changed_ids_and_compares_everything_after_a_failure(tmp_path, monkeypatch):
+    monkeypatch.delenv('GTEX_SUPABASE_DSN', raising=False)
+    manager = UltimateDataManager(str(tmp_path / 'local.db'), use_oplog=True)
+    try:
+        calls = []
+        original = manager.oplog.apply
+
+        def apply(texts, tags, changed=None):
+            calls.append(changed)
+            if len(calls) == 2:
+                raise OSError('disco cheio')
+            return original(texts, tags, changed)
+
+        monkeypatch.setattr(manager.oplog, 'apply', apply)
+        texts = [{'id': 1, 'title': 'a', 'content': 'x', 'tags': []}]
+        for changed in ({1}, {1}, {1}):
+            manager.save_data(texts, [], changed=changed)
+            assert manager.flush(timeout=5)
+        assert calls == [frozenset({1}), frozenset({1}), None]
+    finally:
+        manager.close()
+
+
+def test_load_compact_streams_from_the_selected_tier(tmp_path, monkeypatch):
+    monkeypatch.delenv('GTEX_SUPABASE_DSN', raising=False)
+    manager = UltimateDataManager(str(tmp_path / 'local.db'), use_oplog=True)
+    try:
+        tags = [{'name': 'a', 'color': '#000000'}, {'name': 'b', 'color': '#ffffff'}]
+        texts = [{'id': i, 'title': f't{i}', 'content': 'x', 'tags': ['a', 'b'][:i % 3]} for i in range(1, 20)]
+        assert manager.save_data(texts, tags)
+        assert manager.flush(timeout=5)
+        manager.oplog.compact()
+
+        def no_dicts(*args, **kwargs):
+            raise AssertionError('load_compact não deve montar a lista de dicionários')
+
+        monkeypatch.setattr(manager, 'load_data', no_dicts)
+        monkeypatch.setattr(manager.local_db, 'load_data', no_dicts)
+        monkeypatch.setattr(manager.oplog, 'load', no_dicts)
+
+        def simplified(dataset):
+            return sorted((text['id'], text['title'], sorted(text['tags'])) for text in dataset.to_dicts()[0])
+
+        expected = sorted((text['id'], text['title'], sorted(text['tags'])) for text in texts)
+        assert simplified(manager.load_compact()) == expected
+
+        # Banco local indisponível: o log de operações responde
+        monkeypatch.setattr(manager.local_db, 'load_compact', lambda: (_ for _ in ()).throw(OSError('disco')))
+        dataset = manager.load_compact()
+        assert simplified(dataset) == expected
+        assert sorted(tag['name'] for tag in dataset.to_dicts()[1]) == ['a', 'b']
+    finally:
+        manager.close()
@@ -0,0 +1,198 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """Disjuntor clássico: fechado -> aberto após falhas seguidas -> meio-aberto após o tempo de espera"""
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+
+    def available(self, now: float) -> bool:
+        """Se uma chamada seria permitida agora, sem ocupar a tentativa do meio-aberto"""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN:
+            return now - self.opened_at >= self.reset_timeout
+        return not self._trial_in_flight
+
+    def allow_request(self, now: float) -> bool:
+        if self.state == OPEN and now - self.opened_at >= self.reset_timeout:
+            self.state = HALF_OPEN
+            self._trial_in_flight = False
+        if self.state == CLOSED:
+            return True
+        if self.state == HALF_OPEN and not self._trial_in_flight:
+            # Apenas uma tentativa de teste por vez no estado meio-aberto
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def release_trial(self):
+        """Liberar a tentativa do meio-aberto quando a chamada não chegou a registrar resultado"""
+        self._trial_in_flight = False
+
+    def record_success(self):
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self._trial_in_flight = False
+
+    def record_failure(self, now: float):
+        self.consecutive_failures += 1
+        self._trial_in_flight = False
+        if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self.state = OPEN
+            self.opened_at = now
+
+
+class TierHealth:
+    """Histórico de sucesso e latência de uma camada de armazenamento"""
+
+    def __init__(self, name: str, priority: int, failure_threshold: int, reset_timeout: float, history: int):
+        self.name = name
+        self.priority = priority
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.latencies = deque(maxlen=history)
+        self.outcomes = deque(maxlen=history)
+        self.last_success_at = None
+        self.last_failure_at = None
+        self.probing = False
+
+    @property
+    def avg_latency(self) -> Optional[float]:
+        return sum(self.latencies) / len(self.latencies) if self.latencies else None
+
+    @property
+    def success_rate(self) -> Optional[float]:
+        return sum(self.outcomes) / len(self.outcomes) if self.outcomes else None
+
+    def to_dict(self) -> Dict:
+        return {
+            'state': self.breaker.state,
+            'consecutive_failures': self.breaker.consecutive_failures,
+            'avg_latency': self.avg_latency,
+            'success_rate': self.success_rate,
+            'last_success_at': self.last_success_at,
+            'last_failure_at': self.last_failure_at
+        }
+
+
+class TierHealthTracker:
+    """Saúde e disjuntores de um conjunto ordenado de camadas.
+
+    `order()` devolve as camadas que vale a pena tentar: as de disjuntor
+    fechado antes das meio-abertas e, dentro disso, pela prioridade
+    configurada (a ordem de `tiers`, ou `priorities`). Entre camadas de
+    mesma prioridade vem primeiro a última que retornou dados bons, depois a
+    mais rápida. Camadas com disjuntor aberto ficam de fora e são testadas
+    em segundo plano por `probe()`.
+
+    `order()` não altera os disjuntores; cada chamada real passa por
+    `attempt()`, que ocupa a tentativa do meio-aberto só para a camada que
+    vai de fato ser chamada e a libera ao sair.
+    """
+
+    def __init__(self, tiers: Iterable[str], failure_threshold: int = 3,
+                 reset_timeout: float = 30.0, history: int = 50, priorities: Optional[Dict[str, int]] = None):
+        self._lock = threading.Lock()
+        self.tiers = {
+            name: TierHealth(name, priorities[name] if priorities else position,
+                             failure_threshold, reset_timeout, history)
+            for position, name in enumerate(tiers)
+        }
+        self.last_good = None
+
+    def order(self) -> List[str]:
+        now = time.monotonic()
+        with self._lock:
+            candidates = [t for t in self.tiers.values() if t.breaker.available(now)]
+
+            def key(tier):
+                # Uma camada de fallback que já respondeu não passa na frente da principal recuperada
+                latency = tier.avg_latency
+                return (tier.breaker.state != CLOSED, tier.priority, tier.name != self.last_good,
+                        latency is None, latency or 0.0)
+
+            return [t.name for t in sorted(candidates, key=key)]
+
+    @contextmanager
+    def attempt(self, tier: str):
+        """Ocupar a vaga de chamada de uma camada; devolve False se o disjuntor não permite"""
+        with self._lock:
+            breaker = self.tiers[tier].breaker
+            allowed = breaker.allow_request(time.monotonic())
+        try:
+            yield allowed
+        finally:
+            if allowed:
+                with self._lock:
+                    breaker.release_trial()
+
+    def record(self, tier: str, latency: Optional[float], success: bool):
+        """Registrar o resultado de uma chamada; latency=None não entra no histórico de latência"""
+        now = time.monotonic()
+        with self._lock:
+            health = self.tiers[tier]
+            health.outcomes.append(1 if success else 0)
+            if success:
+                if latency is not None:
+                    health.latencies.append(latency)
+                health.last_success_at = time.time()
+                health.breaker.record_success()
+            else:
+                health.last_failure_at = time.time()
+                health.breaker.record_failure(now)
+                if self.last_good == tier:
+                    self.last_good = None
+
+    def mark_good(self, tier: str):
+        """Registrar que esta camada devolveu dados válidos"""
+        with self._lock:
+            self.last_good = tier
+
+    def is_open(self, tier: str) -> bool:
+        with self._lock:
+            return self.tiers[tier].breaker.state == OPEN
+
+    def probe(self, tier: str, check: Callable[[], object]):
+        """Testar em segundo plano uma camada com disjuntor aberto, após o tempo de espera"""
+        with self._lock:
+            health = self.tiers[tier]
+            if health.probing or health.breaker.state != OPEN:
+                return
+            health.probing = True
+            delay = max(0.0, health.breaker.opened_at + health.breaker.reset_timeout - time.monotonic())
+
+        def run():
+            time.sleep(delay)
+            with self.attempt(tier) as allowed:
+                if allowed:
+                    try:
+                        success = bool(check())
+                    except Exception:
+                        success = False
+                    # A verificação é mais barata que uma leitura real; não entra na latência
+                    self.record(tier, None, success)
+            with self._lock:
+                health.probing = False
+
+        threading.Thread(target=run, name=f'gtex-probe-{tier}', daemon=True).start()
+
+    def snapshot(self) -> Dict[str, Dict]:
+        with self._lock:
+            data = {name: tier.to_dict() for name, tier in self.tiers.items()}
+            for name in data:
+                data[name]['last_good'] = name == self.last_good
+            return data